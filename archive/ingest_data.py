@@ -1,12 +1,20 @@
+import numpy as np
 import pandas as pd
 import psycopg2
-from psycopg2 import extras
 import os
-import re
+import sys
+import time
 from dotenv import load_dotenv
 
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from db_loader import bulk_upsert
+from phones import clean_phone_column
+from trade_directory import ClientListSource, load_trade_directory
+
 load_dotenv()
 
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+
 # Database configuration - credentials from environment variables
 DB_CONFIG = {
     'host': os.getenv('DB_HOST', 'kmc.tequila-ai.com'),
@@ -17,6 +25,15 @@ DB_CONFIG = {
     'sslmode': os.getenv('DB_SSLMODE', 'require')
 }
 
+# Columns read as text, so phone numbers and IDs aren't parsed as floats
+CALL_LOG_TEXT = {
+    'Call ID': str, 'from_number': str, 'to_number': str, 'directions': str,
+    'statuses': str, 'customer_type': str, 'call_activity_details': str,
+}
+ABANDONED_TEXT = {
+    'Caller ID': str, 'customer_type': str, 'Waiting Time': str, 'Agent State': str, 'Queue': str,
+}
+
 def get_db_connection():
     try:
         conn = psycopg2.connect(**DB_CONFIG)
@@ -25,32 +42,16 @@ def get_db_connection():
         print(f"Error connecting to database: {e}")
         return None
 
-def clean_phone_number(phone):
-    """Remove spaces and non-digit characters from phone number."""
-    if pd.isna(phone):
-        return None
-    # Convert to string and remove .0 if present (though CSV load might handle this)
-    s = str(phone).replace('.0', '')
-    # Remove non-digits
-    cleaned = re.sub(r'\D', '', s)
-    return cleaned
-
 def get_trade_numbers(conn):
-    """Fetch all phone numbers from clientlist table."""
-    print("Fetching client list from database...")
-    query = "SELECT account_telephone_number, sales_telephone_number, mobile_number FROM clientlist"
-    df = pd.read_sql(query, conn)
-    
-    trade_numbers = set()
-    for col in df.columns:
-        # Clean and add non-empty numbers
-        cleaned = df[col].apply(clean_phone_number)
-        trade_numbers.update(cleaned.dropna().loc[cleaned != ''].tolist())
-    
-    # Remove '0' if it exists (common placeholder)
-    trade_numbers.discard('0')
-    print(f"Found {len(trade_numbers)} unique trade phone numbers.")
-    return trade_numbers
+    """
+    Normalised phone numbers from the clientlist table (same match key as
+    the report pipeline, phones.py), as a hashed Index. Served from the
+    local trade directory snapshot; clientlist is only fetched again when
+    its checksum changes (see trade_directory.py).
+    """
+    directory = load_trade_directory(DATA_DIR, ClientListSource(conn))
+    print(f"Found {len(directory)} unique trade phone numbers.")
+    return directory.index
 
 def create_tables(conn):
     """Create call_logs and abandoned_calls tables."""
@@ -98,174 +99,94 @@ def create_tables(conn):
     cursor.close()
     print("Tables created (if not existed).")
 
-def ingest_call_logs(conn, trade_numbers):
+def resolve_customer_types(phones, customer_type, trade_numbers):
+    """
+    'trade' where the cleaned phone is in trade_numbers or the row is
+    already marked as trade (e.g. by name), 'retail' otherwise.
+    """
+    is_trade = phones.isin(trade_numbers) | customer_type.astype(str).str.lower().eq('trade')
+    return pd.Series(np.where(is_trade, 'trade', 'retail'), index=phones.index)
+
+def _int_column(s):
+    """Integers with missing or unparseable values as 0."""
+    return pd.to_numeric(s, errors='coerce').fillna(0).astype('int64')
+
+def _text_column(s):
+    """Strings with missing values as None (NULL)."""
+    return s.astype(object).where(s.notna(), None)
+
+def _load(conn, df, table, key):
+    """Bulk upsert df (see db_loader.py), commit and report the throughput."""
+    stats = bulk_upsert(conn, df, table, key)
+    conn.commit()
+    rate = stats['rows'] / stats['seconds'] if stats['seconds'] else float('inf')
+    print(f"Upserted {stats['rows']} rows into {table} ({stats['inserted']} new, {stats['updated']} updated) "
+          f"in {stats['seconds']:.2f}s ({rate:,.0f} rows/s).")
+    if len(df) > stats['rows']:
+        print(f"Skipped {len(df) - stats['rows']} rows repeating a {' + '.join(key)} already in the file (last one kept).")
+    return stats
+
+def ingest_call_logs(conn, trade_numbers, path='reports/call_logs_cleaned.csv'):
     """Ingest cleaned call logs."""
     print("\nProcessing Call Logs...")
+    start = time.perf_counter()
     try:
-        df = pd.read_csv('reports/call_logs_cleaned.csv')
+        df = pd.read_csv(path, dtype=CALL_LOG_TEXT)
     except FileNotFoundError:
-        print("reports/call_logs_cleaned.csv not found.")
+        print(f"{path} not found.")
         return
 
-    # Clean from_number for matching
-    df['clean_from'] = df['from_number'].apply(clean_phone_number)
-    
-    # Update customer type
-    # If number is in trade_numbers OR already marked as trade (e.g. by name), set to trade
-    # Otherwise retail
-    def resolve_type(row):
-        if row['clean_from'] in trade_numbers:
-            return 'trade'
-        if str(row['customer_type']).lower() == 'trade':
-            return 'trade'
-        return 'retail'
-    
-    df['final_customer_type'] = df.apply(resolve_type, axis=1)
-    
-    # Prepare for insertion
-    # Map DataFrame columns to Table columns
+    # Whole columns coerced to the table's types
     # Table: call_id, week, call_start, from_number, to_number, direction, status, ringing_sec, talking_sec, customer_type, journey_details, is_answered, is_abandoned
-    
-    insert_data = []
-    for _, row in df.iterrows():
-        week_val = row.get('week')
-        week = int(week_val) if pd.notna(week_val) else 0
-        
-        ringing_val = row.get('ringing_total_sec')
-        ringing = int(ringing_val) if pd.notna(ringing_val) else 0
-        
-        talking_val = row.get('talking_total_sec')
-        talking = int(talking_val) if pd.notna(talking_val) else 0
-
-        call_start = row.get('call_start')
-        if pd.isna(call_start):
-            call_start = None
-
-        from_num = row.get('from_number')
-        from_num = str(from_num) if pd.notna(from_num) else None
-
-        to_num = row.get('to_number')
-        to_num = str(to_num) if pd.notna(to_num) else None
-
-        direction = row.get('directions')
-        direction = str(direction) if pd.notna(direction) else None
-
-        status = row.get('statuses')
-        status = str(status) if pd.notna(status) else None
-
-        journey = row.get('call_activity_details')
-        journey = str(journey) if pd.notna(journey) else None
-
-        insert_data.append((
-            str(row['Call ID']),
-            week,
-            call_start,
-            from_num,
-            to_num,
-            direction,
-            status,
-            ringing,
-            talking,
-            row['final_customer_type'],
-            journey,
-            bool(row['is_answered']),
-            bool(row['is_abandoned'])
-        ))
-    
-    cursor = conn.cursor()
-    # Use upsert (ON CONFLICT DO UPDATE) to handle re-runs
-    query = """
-        INSERT INTO call_logs (
-            call_id, week, call_start, from_number, to_number, direction, status, 
-            ringing_sec, talking_sec, customer_type, journey_details, is_answered, is_abandoned
-        ) VALUES %s
-        ON CONFLICT (call_id) DO UPDATE SET
-            week = EXCLUDED.week,
-            customer_type = EXCLUDED.customer_type,
-            journey_details = EXCLUDED.journey_details;
-    """
-    
-    extras.execute_values(cursor, query, insert_data)
-    conn.commit()
-    cursor.close()
-    print(f"Upserted {len(insert_data)} rows into call_logs.")
-
-def ingest_abandoned_logs(conn, trade_numbers):
+    rows = pd.DataFrame({
+        'call_id': df['Call ID'],
+        'week': _int_column(df['week']),
+        'call_start': pd.to_datetime(df['call_start'], errors='coerce'),
+        'from_number': _text_column(df['from_number']),
+        'to_number': _text_column(df['to_number']),
+        'direction': _text_column(df['directions']),
+        'status': _text_column(df['statuses']),
+        'ringing_sec': _int_column(df['ringing_total_sec']),
+        'talking_sec': _int_column(df['talking_total_sec']),
+        # Clean from_number for matching against the trade set
+        'customer_type': resolve_customer_types(clean_phone_column(df['from_number']), df['customer_type'], trade_numbers),
+        'journey_details': _text_column(df['call_activity_details']),
+        'is_answered': df['is_answered'].astype(bool),
+        'is_abandoned': df['is_abandoned'].astype(bool),
+    })
+    prepared = time.perf_counter() - start
+    print(f"Prepared {len(rows)} call log rows in {prepared:.2f}s ({len(rows) / max(prepared, 1e-9):,.0f} rows/s).")
+
+    # Upsert handles re-runs
+    return _load(conn, rows, 'call_logs', ['call_id'])
+
+def ingest_abandoned_logs(conn, trade_numbers, path='reports/abandoned_logs_cleaned.csv'):
     """Ingest cleaned abandoned logs."""
     print("\nProcessing Abandoned Logs...")
+    start = time.perf_counter()
     try:
-        df = pd.read_csv('reports/abandoned_logs_cleaned.csv')
+        df = pd.read_csv(path, dtype=ABANDONED_TEXT)
     except FileNotFoundError:
-        print("reports/abandoned_logs_cleaned.csv not found.")
+        print(f"{path} not found.")
         return
 
-    # Clean caller_id for matching
-    df['clean_caller'] = df['Caller ID'].apply(clean_phone_number)
-    
-    # Update customer type
-    def resolve_type(row):
-        if row['clean_caller'] in trade_numbers:
-            return 'trade'
-        # Abandoned logs don't have names, so rely on phone match or existing logic
-        if str(row['customer_type']).lower() == 'trade':
-            return 'trade'
-        return 'retail'
-    
-    df['final_customer_type'] = df.apply(resolve_type, axis=1)
-    
-    # Prepare for insertion
     # Table: week, call_time, caller_id, customer_type, waiting_time, agent_state, polling_attempts, queue
-    
-    insert_data = []
-    for _, row in df.iterrows():
-        week_val = row.get('week')
-        week = int(week_val) if pd.notna(week_val) else 0
-        
-        polling_val = row.get('Polling Attempts')
-        polling = int(polling_val) if pd.notna(polling_val) else 0
-        
-        call_time = row.get('Call Time')
-        if pd.isna(call_time):
-            call_time = None
-
-        caller_id = row.get('Caller ID')
-        caller_id = str(caller_id) if pd.notna(caller_id) else None
-
-        waiting_time = row.get('Waiting Time')
-        waiting_time = str(waiting_time) if pd.notna(waiting_time) else None
-
-        agent_state = row.get('Agent State')
-        agent_state = str(agent_state) if pd.notna(agent_state) else None
-
-        queue = row.get('Queue')
-        queue = str(queue) if pd.notna(queue) else None
-
-        insert_data.append((
-            week,
-            call_time,
-            caller_id,
-            row['final_customer_type'],
-            waiting_time,
-            agent_state,
-            polling,
-            queue
-        ))
-    
-    cursor = conn.cursor()
-    # Truncate and replace for abandoned logs since we don't have a stable ID in the CSV (dedup happens in pandas)
-    # Or we can just insert. Let's truncate to avoid duplicates on re-run.
-    cursor.execute("TRUNCATE TABLE abandoned_calls;")
-    
-    query = """
-        INSERT INTO abandoned_calls (
-            week, call_time, caller_id, customer_type, waiting_time, agent_state, polling_attempts, queue
-        ) VALUES %s
-    """
-    
-    extras.execute_values(cursor, query, insert_data)
-    conn.commit()
-    cursor.close()
-    print(f"Inserted {len(insert_data)} rows into abandoned_calls.")
+    # Abandoned logs don't have names, so rely on phone match or existing logic
+    rows = pd.DataFrame({
+        'week': _int_column(df['week']),
+        'call_time': pd.to_datetime(df['Call Time'], errors='coerce'),
+        'caller_id': _text_column(df['Caller ID']),
+        'customer_type': resolve_customer_types(clean_phone_column(df['Caller ID']), df['customer_type'], trade_numbers),
+        'waiting_time': _text_column(df['Waiting Time']),
+        'agent_state': _text_column(df['Agent State']),
+        'polling_attempts': _int_column(df['Polling Attempts']),
+        'queue': _text_column(df['Queue']),
+    })
+    prepared = time.perf_counter() - start
+    print(f"Prepared {len(rows)} abandoned rows in {prepared:.2f}s ({len(rows) / max(prepared, 1e-9):,.0f} rows/s).")
+
+    # No stable ID in the CSV: caller + call time keys the upsert, so re-runs update rows instead of duplicating them
+    return _load(conn, rows, 'abandoned_calls', ['call_time', 'caller_id'])
 
 def main():
     conn = get_db_connection()
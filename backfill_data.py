@@ -1,7 +1,9 @@
 import os
 import re
 import glob
-from weekly_data_manager import save_week_data, initialize_db
+import time
+from call_dataset import CallDataset
+from weekly_data_manager import DATA_DIR, save_week_data, save_weeks, initialize_db
 
 REPORTS_DIR = 'reports'
 
@@ -99,7 +101,31 @@ def extract_metrics_from_report(report_path):
         
     return results
 
-def main():
+def main(start_date=None, end_date=None, dataset=None):
+    """
+    Rebuild the weekly store from the raw exports. Every Monday-Sunday
+    week ending between start_date and end_date (default: all weeks in
+    the data) is counted in one pass (CallDataset.weekly_metrics) and
+    saved in one write. Pass an already loaded CallDataset to reuse it.
+    """
+    print("Starting backfill process...")
+    start = time.perf_counter()
+    if dataset is None:
+        dataset = CallDataset.load(DATA_DIR)
+
+    weeks = dataset.weekly_metrics(start_date, end_date)
+    for week in weeks.itertuples():
+        print(f"  {week.week_start} - {week.week_end}: Total {week.total_calls} "
+              f"(R: {week.retail_calls}, T: {week.trade_calls}, Abd: {week.abandoned_total})")
+    save_weeks(weeks)
+
+    print(f"\nBackfill complete. {len(weeks)} weeks in {time.perf_counter() - start:.2f}s.")
+
+def backfill_from_reports():
+    """
+    Recover weeks from old HTML reports (This Week / Last Week narrative),
+    for weeks whose raw exports are no longer in data/.
+    """
     print("Starting backfill process...")
     initialize_db()
     
@@ -0,0 +1,147 @@
+"""
+Business Hours
+One calendar of opening hours shared by every operating-hours check.
+
+The weekly hours default to Mon-Fri 8am-8pm, Sat 8am-6pm, Sun 10am-4pm.
+Both the weekly hours and single dates (bank holidays, Christmas hours)
+can be overridden with an optional data/business_hours.csv:
+
+    day,open,close
+    Saturday,09:00,17:00
+    2025-12-25,,
+    2025-12-24,08:00,14:00
+
+day is a weekday name or a YYYY-MM-DD date; leave open/close empty for
+a day the business is closed.
+
+Calls are classified with a lookup into a 7 x 1440 (weekday x minute of
+day) table, so whole columns are classified at once: BEFORE_OPENING,
+OPEN or AFTER_CLOSING, and UNKNOWN for missing timestamps. Every call on
+a closed day counts as AFTER_CLOSING.
+"""
+import os
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+UNKNOWN, BEFORE_OPENING, OPEN, AFTER_CLOSING = -1, 0, 1, 2
+
+MINUTES_PER_DAY = 24 * 60
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+# weekday (0 = Monday) -> (open, close) in minutes since midnight
+DEFAULT_HOURS = {
+    **{day: (8 * 60, 20 * 60) for day in range(5)},
+    5: (8 * 60, 18 * 60),
+    6: (10 * 60, 16 * 60),
+}
+
+
+def _day_row(hours):
+    """Per-minute classification of one day with (open, close) hours, or None if closed."""
+    row = np.full(MINUTES_PER_DAY, AFTER_CLOSING, dtype=np.int8)
+    if hours is not None:
+        open_at, close_at = hours
+        row[:open_at] = BEFORE_OPENING
+        row[open_at:close_at] = OPEN
+    return row
+
+
+def _parse_minutes(value):
+    """'HH:MM' -> minutes since midnight ('24:00' is the end of the day)."""
+    hours, minutes = str(value).strip().split(':')[:2]
+    total = int(hours) * 60 + int(minutes)
+    if not 0 <= total <= MINUTES_PER_DAY:
+        raise ValueError(f"Invalid time of day: {value!r}")
+    return total
+
+
+def _format_minutes(total):
+    hour, minute = divmod(total, 60)
+    suffix = 'am' if hour % 24 < 12 else 'pm'
+    hour = hour % 12 or 12
+    return f"{hour}{suffix}" if minute == 0 else f"{hour}:{minute:02d}{suffix}"
+
+
+@dataclass
+class BusinessCalendar:
+    # weekday (0 = Monday) -> (open, close) minutes since midnight, None = closed
+    hours: dict = field(default_factory=lambda: dict(DEFAULT_HOURS))
+    # Date overrides: normalised Timestamp -> (open, close) or None = closed
+    holidays: dict = field(default_factory=dict)
+    week_table: np.ndarray = field(init=False, repr=False)
+    holiday_dates: pd.DatetimeIndex = field(init=False, repr=False)
+    holiday_table: np.ndarray = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.week_table = np.stack([_day_row(self.hours.get(day)) for day in range(7)])
+        dates = sorted(self.holidays)
+        self.holiday_dates = pd.DatetimeIndex(dates)
+        self.holiday_table = (
+            np.stack([_day_row(self.holidays[d]) for d in dates])
+            if dates else np.empty((0, MINUTES_PER_DAY), dtype=np.int8)
+        )
+
+    def classify(self, times):
+        """
+        int8 array of BEFORE_OPENING / OPEN / AFTER_CLOSING per timestamp
+        (UNKNOWN where it's missing), from the weekday x minute table and
+        the date overrides.
+        """
+        times = pd.to_datetime(pd.Series(times), errors='coerce')
+        valid = times.notna().to_numpy()
+        codes = np.full(len(times), UNKNOWN, dtype=np.int8)
+        if not valid.any():
+            return codes
+
+        times = times[valid]
+        weekday = times.dt.dayofweek.to_numpy()
+        minute = (times.dt.hour * 60 + times.dt.minute).to_numpy()
+        found = self.week_table[weekday, minute]
+
+        if len(self.holiday_dates):
+            override = self.holiday_dates.get_indexer(times.dt.normalize())
+            on_holiday = override >= 0
+            found[on_holiday] = self.holiday_table[override[on_holiday], minute[on_holiday]]
+
+        codes[valid] = found
+        return codes
+
+    def describe(self):
+        """Weekly hours as text, e.g. 'Mon-Fri 8am-8pm, Sat 8am-6pm, Sun 10am-4pm'."""
+        parts = []
+        day = 0
+        while day < 7:
+            last = day
+            while last + 1 < 7 and self.hours.get(last + 1) == self.hours.get(day):
+                last += 1
+            days = WEEKDAYS[day][:3] if last == day else f"{WEEKDAYS[day][:3]}-{WEEKDAYS[last][:3]}"
+            hours = self.hours.get(day)
+            parts.append(f"{days} closed" if hours is None
+                         else f"{days} {_format_minutes(hours[0])}-{_format_minutes(hours[1])}")
+            day = last + 1
+        return ', '.join(parts)
+
+
+def load_calendar(data_dir='data'):
+    """The default calendar with any overrides from data_dir/business_hours.csv."""
+    path = os.path.join(data_dir, 'business_hours.csv')
+    if not os.path.exists(path):
+        return BusinessCalendar()
+
+    hours = dict(DEFAULT_HOURS)
+    holidays = {}
+    overrides = pd.read_csv(path, dtype=str, keep_default_na=False)
+    for row in overrides.to_dict('records'):
+        day = row['day'].strip()
+        opening = (_parse_minutes(row['open']), _parse_minutes(row['close'])) if row['open'].strip() else None
+        if day.title() in WEEKDAYS:
+            hours[WEEKDAYS.index(day.title())] = opening
+        else:
+            holidays[pd.Timestamp(day).normalize()] = opening
+    print(f"Business hours: {len(overrides)} overrides from {path}")
+    return BusinessCalendar(hours, holidays)
+
+
+DEFAULT_CALENDAR = BusinessCalendar()
@@ -19,6 +19,9 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import plotly.express as px
 
+from durations import hms_to_seconds_column
+from weeks import assign_weeks, monday_week_anchor
+
 
 # =============================================================================
 # CONFIGURATION
@@ -211,39 +214,17 @@ def add_week_label(df, date_col="Call Time", out_col="week"):
             inplace=True, errors="ignore")
 
     # Convert time columns to seconds
-    df["Talking"] = pd.to_numeric(df["Talking"].apply(hms_to_seconds), errors="coerce")
-    df["Ringing"] = pd.to_numeric(df["Ringing"].apply(hms_to_seconds), errors="coerce")
+    df["Talking"] = hms_to_seconds_column(df["Talking"], default=None, allow_mmss=True, numeric_as_seconds=True)
+    df["Ringing"] = hms_to_seconds_column(df["Ringing"], default=None, allow_mmss=True, numeric_as_seconds=True)
 
     # Filter out admin calls
     df = df[~df["Caller ID"].str.contains("Admin Main DID|Admin Divert", na=False)]
 
     # Calculate week labels based on Monday-to-Monday boundaries
+    # If max_date is a Monday, the PREVIOUS complete week is Week 1;
+    # otherwise the week containing max_date is Week 1
     dt = pd.to_datetime(df[date_col], errors="coerce")
-    max_date = dt.max()
-
-    # Find the Monday at or before max_date (0 = Monday, 6 = Sunday)
-    days_since_monday = max_date.weekday()
-    most_recent_monday = max_date - pd.Timedelta(days=days_since_monday)
-
-    # If max_date is a Monday, we want the PREVIOUS complete week to be Week 1
-    # Otherwise, the week containing max_date (up to the most recent Monday) is Week 1
-    if days_since_monday == 0:
-        # Max date is Monday - use previous week as Week 1
-        week1_start = most_recent_monday - pd.Timedelta(days=7)
-        week1_end = most_recent_monday
-    else:
-        # Max date is Tue-Sun - week containing max_date is Week 1
-        week1_start = most_recent_monday
-        week1_end = most_recent_monday + pd.Timedelta(days=7)
-
-    # Week 2: Previous Monday through Sunday
-    week2_start = week1_start - pd.Timedelta(days=7)
-    week2_end = week1_start
-
-    # Assign week labels
-    labels = np.full(len(df), 3, dtype=int)  # Default to week 3 (older)
-    labels[(dt >= week1_start) & (dt < week1_end)] = 1  # Most recent week (Monday-Sunday)
-    labels[(dt >= week2_start) & (dt < week2_end)] = 2  # Previous week (Monday-Sunday)
+    labels = assign_weeks(dt, monday_week_anchor(dt.max()), n_weeks=2, closed='left')
 
     df[out_col] = labels
     return df
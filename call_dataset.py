@@ -0,0 +1,221 @@
+"""
+Call Dataset
+The cleaned call-level and abandoned frames for a data folder, loaded
+once and shared by every report built from them:
+
+    dataset = CallDataset.load('data')
+    this_week = dataset.report_for()              # weeks ending at the latest call
+    last_week = dataset.report_for('2026-02-01')  # 7 calendar days ending on that date
+    history = dataset.weekly_metrics()            # weekly store rows for every week
+
+Loading goes through the ingest cache and the call store (see
+ingest_cache.py, call_store.py) and builds the indices every report
+needs: normalised phones for both frames, when each number was first
+seen as trade, and the trade directory (trade_directory.py: the client
+list's numbers and names, which count as trade from the start). report_for only
+re-buckets weeks and recomputes metrics, so any number of reports
+cost one load. Loading also refreshes the rollup cube (rollup_cube.py),
+and weekly_metrics reads every Monday-Sunday week from it for
+backfilling the weekly store.
+"""
+import glob
+import os
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+import call_store
+from business_hours import BusinessCalendar, load_calendar
+from call_log_analyzer import build_report, load_abandoned_calls
+from cleaning import clean_files
+from ingest_cache import load_call_levels
+from phones import clean_phone_column
+from readers import CALL_LOG
+from rollup_cube import refresh_cube, rollup
+from trade_directory import TradeDirectory, listed_since, load_trade_directory
+from weeks import WEEK, assign_weeks, day_end_anchor, week_start_of
+
+# Columns of weekly_data_manager's store that weekly_metrics fills in
+WEEKLY_COUNTS = [
+    'total_calls', 'retail_calls', 'trade_calls',
+    'abandoned_total', 'retail_abandoned', 'trade_abandoned',
+]
+
+
+@dataclass
+class CallDataset:
+    data_dir: str
+    # One row per Call ID; 'week' depends on the report, so it's left out
+    calls: pd.DataFrame
+    # Abandoned log rows with a parsed Call Time and week_start
+    abandoned: pd.DataFrame
+    # Normalised from_number / Caller ID (phones.clean_phone_column), row-aligned
+    call_phones: pd.Series
+    abandoned_phones: pd.Series
+    # Normalised phone -> earliest call_start classified as trade
+    # (Timestamp.min for numbers in the trade directory)
+    trade_since: pd.Series
+    # Known trade customers' numbers and names (see trade_directory.py)
+    trade_directory: TradeDirectory
+    # Weekly rollup cube of the call store (see rollup_cube.py)
+    cube: pd.DataFrame
+    # Opening hours for out-of-hours stats (see business_hours.py)
+    calendar: BusinessCalendar
+
+    @classmethod
+    def load(cls, data_dir='data', use_cache=True, jobs=1, chunksize=None):
+        """
+        Clean and load every export in data_dir. Options are the same as
+        analyze_calls: use_cache reads unchanged files from the ingest
+        cache, jobs > 1 cleans in parallel, chunksize streams each export.
+        """
+        print("Cleaning and loading main call logs...")
+        files = sorted(glob.glob(os.path.join(data_dir, CALL_LOG.pattern)))
+        if use_cache:
+            dfs = load_call_levels(files, data_dir, jobs=jobs, chunksize=chunksize)
+        else:
+            dfs = [r.call_level_df for r in clean_files(files, jobs=jobs, chunksize=chunksize) if r.call_level_df is not None]
+
+        if dfs:
+            calls = pd.concat(dfs, ignore_index=True)
+            # Deduplicate Main Log (in case of file overlap)
+            calls = calls.drop_duplicates(subset=['Call ID'])
+            print(f"Total Main Log Calls (Unique): {len(calls)}")
+            added = call_store.append(calls, call_store.CALLS, data_dir)
+            print(f"Call store: {added} new or refreshed calls stored")
+            # cleaning.py buckets weeks per file; reports re-bucket them
+            calls = calls.drop(columns='week')
+            call_phones = clean_phone_column(calls['from_number'])
+        else:
+            print("No main call logs found!")
+            calls = pd.DataFrame()
+            call_phones = pd.Series(dtype=object)
+
+        print("Loading abandoned calls files...")
+        abandoned = load_abandoned_calls(data_dir)
+        if not abandoned.empty:
+            abandoned['week_start'] = week_start_of(abandoned['Call Time'])
+            abandoned_phones = clean_phone_column(abandoned['Caller ID'])
+        else:
+            abandoned_phones = pd.Series(dtype=object)
+
+        # Known trade numbers from the main log (anonymous/empty never count)
+        if not calls.empty:
+            is_trade = ((calls['customer_type'] == 'trade') & ~call_phones.isin(['anonymous', ''])).to_numpy()
+            trade_since = calls.loc[is_trade, 'call_start'].groupby(call_phones[is_trade].to_numpy()).min()
+        else:
+            trade_since = pd.Series(dtype='datetime64[ns]')
+        trade_directory = load_trade_directory(data_dir)
+        trade_since = listed_since(trade_since, trade_directory)
+
+        return cls(
+            data_dir=data_dir,
+            calls=calls,
+            abandoned=abandoned,
+            call_phones=call_phones,
+            abandoned_phones=abandoned_phones,
+            trade_since=trade_since,
+            trade_directory=trade_directory,
+            cube=refresh_cube(trade_since, data_dir, trade_directory.etag),
+            calendar=load_calendar(data_dir),
+        )
+
+    @property
+    def max_date(self):
+        """Timestamp of the latest call in the main log."""
+        return self.calls['call_start'].max()
+
+    def trade_numbers(self, as_of_date=None):
+        """Normalised phones with a trade call up to the end of as_of_date (None = ever)."""
+        if as_of_date is None:
+            return set(self.trade_since.index)
+        cutoff = day_end_anchor(as_of_date)
+        return set(self.trade_since.index[(self.trade_since < cutoff).to_numpy()])
+
+    def report_for(self, as_of_date=None):
+        """
+        Report results (the dict analyze_calls returns) for This Week and
+        Last Week ending at as_of_date.
+
+        None is the weekly report: rolling weeks ending at the latest call.
+        A date gives the 7 calendar days ending on it and the 7 before;
+        later calls are left out, and an abandoned caller only counts as
+        trade if their number had a trade call by then.
+        """
+        if self.calls.empty:
+            return {}
+
+        if as_of_date is None:
+            max_date = self.max_date
+            anchor, closed = max_date, 'right'
+            calls = self.calls
+            abandoned = self.abandoned
+            abandoned_trade = self.abandoned_phones.isin(self.trade_since.index)
+            print(f"Global Max Date: {max_date}")
+        else:
+            max_date = pd.Timestamp(as_of_date).normalize()
+            anchor, closed = day_end_anchor(max_date), 'left'
+            calls = self.calls[self.calls['call_start'] < anchor]
+            in_range = (self.abandoned['Call Time'] < anchor) if not self.abandoned.empty else slice(None)
+            abandoned = self.abandoned[in_range]
+            since = self.abandoned_phones[in_range].map(self.trade_since)
+            abandoned_trade = since < anchor
+            print(f"Report Target Date: {max_date.date()}")
+
+        df = calls.copy()
+        df.insert(df.columns.get_loc('week_start'), 'week', assign_weeks(df['call_start'], anchor, closed=closed))
+        print(f"Week distribution: {df['week'].value_counts().to_dict()}")
+
+        abandoned = abandoned.copy()
+        if not abandoned.empty:
+            at = abandoned.columns.get_loc('week_start')
+            abandoned.insert(at, 'customer_type', np.where(abandoned_trade.to_numpy(), 'trade', 'retail'))
+            abandoned.insert(at + 1, 'week', assign_weeks(abandoned['Call Time'], anchor, closed=closed))
+            print(f"Abandoned calls week distribution: {abandoned['week'].value_counts().sort_index().to_dict()}")
+
+        return build_report(df, abandoned, max_date, self.trade_directory, self.calendar)
+
+    def weekly_metrics(self, start_date=None, end_date=None):
+        """
+        Weekly store rows (week_start, week_end and WEEKLY_COUNTS) for
+        every Monday-Sunday week ending between start_date and end_date
+        (default: every week up to the last Sunday in the data).
+
+        Counts come from the rollup cube, and each row matches week 1 of
+        report_for(<that Sunday>): retail/trade count main-log calls, and
+        an abandoned caller is trade if their number had a trade call by
+        the end of that week.
+        """
+        if self.calls.empty:
+            return pd.DataFrame(columns=['week_start', 'week_end'] + WEEKLY_COUNTS)
+
+        counts_by = rollup(self.cube, ['week_start', 'outcome', 'customer_type'])['calls']
+        is_abandoned = counts_by.index.get_level_values('outcome') == 'abandoned'
+        main = counts_by[~is_abandoned].groupby(level=['week_start', 'customer_type']).sum().unstack(fill_value=0)
+        abandoned = counts_by[is_abandoned].droplevel('outcome').unstack(fill_value=0)
+
+        # Sundays within the range, clipped to the data: a week is included
+        # once its Sunday is on or before the latest call's day
+        first_day = self.calls['call_start'].min().normalize()
+        last_day = self.max_date.normalize()
+        if start_date is not None:
+            first_day = max(first_day, pd.Timestamp(start_date).normalize())
+        if end_date is not None:
+            last_day = min(last_day, pd.Timestamp(end_date).normalize())
+        first = first_day - pd.Timedelta(days=first_day.weekday())
+        last = last_day - pd.Timedelta(days=(last_day.weekday() + 1) % 7) - pd.Timedelta(days=6)
+        weeks = pd.date_range(first, last, freq='7D')
+
+        counts = pd.DataFrame(index=weeks)
+        for table, suffix in ((main, 'calls'), (abandoned, 'abandoned')):
+            for ctype in ('retail', 'trade'):
+                col = table[ctype] if ctype in table.columns else pd.Series(dtype='int64')
+                counts[f'{ctype}_{suffix}'] = col.reindex(weeks, fill_value=0).astype('int64')
+        counts['abandoned_total'] = counts['retail_abandoned'] + counts['trade_abandoned']
+        counts['total_calls'] = counts['retail_calls'] + counts['trade_calls'] + counts['abandoned_total']
+
+        counts.insert(0, 'week_start', weeks.strftime('%Y-%m-%d'))
+        counts.insert(1, 'week_end', (weeks + pd.Timedelta(days=6)).strftime('%Y-%m-%d'))
+        return counts[['week_start', 'week_end'] + WEEKLY_COUNTS].reset_index(drop=True)
+
@@ -0,0 +1,123 @@
+"""
+Call Index
+Compact, persistent set of record keys for deduplicating new exports
+against everything stored before, without reloading history.
+
+Each key is 16 bytes (numpy 'S16'), kept sorted so membership is a
+single searchsorted:
+- Call IDs are 3CX UUIDs ('00000000-01dc-939f-a622-32ba00005967'), so
+  the 128-bit value is parsed straight from the hex digits.
+- Other keys (e.g. abandoned calls' Caller ID + Call Time) are two
+  independent 64-bit hashes of the key columns.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+KEY_DTYPE = 'S16'
+_UUID_LEN = 36
+_DASH_POS = [8, 13, 18, 23]
+_HEX_POS = [i for i in range(_UUID_LEN) if i not in _DASH_POS]
+
+# Byte value -> nibble, 255 for anything else. Upper-case hex isn't
+# accepted, so 'ABC...' and 'abc...' stay distinct keys (as strings are).
+_NIBBLE = np.full(256, 255, dtype=np.uint8)
+for _i, _c in enumerate(b'0123456789abcdef'):
+    _NIBBLE[_c] = _i
+
+# hash_pandas_object keys must be 16 characters
+_HASH_KEYS = ('call-index-key-1', 'call-index-key-2')
+
+
+def _pack(hi, lo):
+    """Two uint64 arrays -> 16-byte big-endian keys (so byte order == numeric order)."""
+    pairs = np.empty((len(hi), 2), dtype='>u8')
+    pairs[:, 0] = hi
+    pairs[:, 1] = lo
+    return pairs.view(KEY_DTYPE).ravel()
+
+
+def row_keys(df, columns):
+    """128-bit keys for arbitrary key columns (two 64-bit hashes)."""
+    cols = df[list(columns)]
+    hi, lo = (
+        pd.util.hash_pandas_object(cols, index=False, hash_key=k).to_numpy(dtype=np.uint64)
+        for k in _HASH_KEYS
+    )
+    return _pack(hi, lo)
+
+
+def call_id_keys(values):
+    """
+    128-bit keys for Call IDs. UUID-shaped IDs are parsed from their hex
+    digits in one numpy pass; anything else falls back to row_keys.
+    """
+    ids = pd.Series(values, dtype=object).astype(str).reset_index(drop=True)
+    n = len(ids)
+    keys = np.empty(n, dtype=KEY_DTYPE)
+    if n == 0:
+        return keys
+
+    try:
+        raw = ids.to_numpy().astype(f'S{_UUID_LEN}')
+    except UnicodeEncodeError:
+        raw = None
+    if raw is not None:
+        b = raw.view(np.uint8).reshape(n, _UUID_LEN)
+        nibbles = _NIBBLE[b[:, _HEX_POS]]
+        ok = (
+            (ids.str.len() == _UUID_LEN).to_numpy()
+            & (b[:, _DASH_POS] == ord('-')).all(axis=1)
+            & (nibbles < 16).all(axis=1)
+        )
+        packed = (nibbles[:, 0::2] << 4) | nibbles[:, 1::2]
+        keys[ok] = np.ascontiguousarray(packed[ok]).view(KEY_DTYPE).ravel()
+    else:
+        ok = np.zeros(n, dtype=bool)
+
+    if not ok.all():
+        keys[~ok] = row_keys(ids[~ok].to_frame('Call ID'), ['Call ID'])
+    return keys
+
+
+def load_index(path):
+    """Sorted unique keys, or None if the index hasn't been built yet."""
+    if not os.path.exists(path):
+        return None
+    return np.load(path, allow_pickle=False)
+
+
+def save_index(path, index):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp.npy'
+    np.save(tmp_path, index, allow_pickle=False)
+    os.replace(tmp_path, path)
+
+
+def build_index(keys):
+    return np.unique(np.asarray(keys, dtype=KEY_DTYPE))
+
+
+def contains(index, keys):
+    """Boolean mask: which keys are already in the index."""
+    if index is None or len(index) == 0:
+        return np.zeros(len(keys), dtype=bool)
+    pos = np.searchsorted(index, keys)
+    pos[pos == len(index)] = 0
+    return index[pos] == keys
+
+
+def new_key_mask(index, keys):
+    """Keys not in the index, keeping only the first of any repeats."""
+    fresh = ~contains(index, keys)
+    _, first = np.unique(keys, return_index=True)
+    is_first = np.zeros(len(keys), dtype=bool)
+    is_first[first] = True
+    return fresh & is_first
+
+
+def add_keys(index, keys):
+    if index is None:
+        return build_index(keys)
+    return np.union1d(index, keys)
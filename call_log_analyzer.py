@@ -2,67 +2,45 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
-import psycopg2
-from psycopg2.extras import execute_values
 import os
-from cleaning import run_cleaning
+from functools import partial
+import call_store
+from durations import hms_to_seconds_column
+from phones import clean_phone_column
+from readers import ABANDONED_CALLS, CALL_LOG, concat_raw_exports, parse_call_time, read_export
+from ingest_cache import file_hash
+import db_sync
+from db_session import UnitOfWork
+from plot_payload import figure_to_html
+from business_hours import AFTER_CLOSING, BEFORE_OPENING, DEFAULT_CALENDAR, OPEN
+from cleaning import JOURNEY_COLUMNS, extract_journey_events
 import glob
 
-# Database Configuration
-DB_CONFIG = {
-    'host': os.getenv('DB_HOST', 'kmc.tequila-ai.com'),
-    'port': os.getenv('DB_PORT', '5432'),
-    'database': os.getenv('DB_NAME', 'tequila_ai_reporting'),
-    'user': os.getenv('DB_USER', 'james'),
-    'password': os.getenv('DB_PASSWORD', ']dT1H-{ekquGfn^6'),
-    'sslmode': os.getenv('DB_SSLMODE', 'require')
-}
+def _sync_rows(conn, rows, table, full):
+    stats = db_sync.sync_table(conn, rows, table, full=full)
+    print(f"Synced '{table.name}': shipped {stats['shipped']} rows "
+          f"({stats['inserted']} new, {stats['updated']} updated), skipped {stats['skipped']} "
+          f"in {stats['seconds']:.1f}s (watermark {stats['watermark']}, "
+          f"{'full compare' if full else f'{db_sync.LOOKBACK.days}-day lookback'}).")
 
-def save_to_database(df, table_name='call_logs'):
-    """Save DataFrame to PostgreSQL database."""
-    try:
-        print(f"Connecting to database to save {len(df)} rows...")
-        conn = psycopg2.connect(**DB_CONFIG)
-        cursor = conn.cursor()
-        
-        # Create table if not exists (simplified schema)
-        # We'll drop and recreate for this weekly job to ensure schema matches
-        cursor.execute(f"DROP TABLE IF EXISTS {table_name} CASCADE;")
-        
-        # Generate CREATE TABLE statement based on DataFrame columns
-        cols = []
-        for col in df.columns:
-            dtype = df[col].dtype
-            if pd.api.types.is_integer_dtype(dtype):
-                sql_type = 'INTEGER'
-            elif pd.api.types.is_float_dtype(dtype):
-                sql_type = 'NUMERIC'
-            elif pd.api.types.is_bool_dtype(dtype):
-                sql_type = 'BOOLEAN'
-            elif pd.api.types.is_datetime64_any_dtype(dtype):
-                sql_type = 'TIMESTAMP'
-            else:
-                sql_type = 'TEXT'
-            cols.append(f'"{col}" {sql_type}')
-        
-        create_sql = f"CREATE TABLE {table_name} (id SERIAL PRIMARY KEY, {', '.join(cols)});"
-        cursor.execute(create_sql)
-        
-        # Insert data
-        columns = [f'"{col}"' for col in df.columns]
-        values = [tuple(x) for x in df.to_numpy()]
-        
-        insert_sql = f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES %s"
-        execute_values(cursor, insert_sql, values)
-        
-        conn.commit()
-        print(f"Successfully saved data to table '{table_name}'.")
-        
-    except Exception as e:
-        print(f"Error saving to database: {e}")
-    finally:
-        if 'conn' in locals():
-            conn.close()
+def save_to_database(df, abandoned_df=None, full=False, run=None):
+    """
+    Sync call-level rows to 'call_logs' and abandoned rows to
+    'abandoned_calls'. Only rows after each table's high-watermark (less
+    a lookback for late corrections) that are new or changed are shipped;
+    full=True compares all of history (see db_sync.py).
+
+    With run (a db_session.UnitOfWork) the syncs are queued to commit
+    with the report's other writes; without one they're committed now.
+    """
+    queue = run if run is not None else UnitOfWork()
+    queue.add(db_sync.CALL_LOGS.name, partial(_sync_rows, rows=df, table=db_sync.CALL_LOGS, full=full))
+    if abandoned_df is not None and not abandoned_df.empty:
+        queue.add(db_sync.ABANDONED_CALLS.name,
+                  partial(_sync_rows, rows=abandoned_df, table=db_sync.ABANDONED_CALLS, full=full))
+    if run is None:
+        print(f"Syncing {len(df)} calls to the database...")
+        queue.commit()
 
 def calculate_mode(series):
     """Calculate mode of a series, handling empty cases."""
@@ -90,6 +68,89 @@ def get_week_date_label(week_num, max_date):
     
     return week_start.strftime('%d/%m/%Y')
 
+CHART_WEEKS = [1, 2]
+CHART_DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+CUSTOMER_TYPE_LABELS = {'retail': 'Retail', 'trade': 'Trade Customer'}
+
+def chart_tables(df, abandoned_df):
+    """
+    The small tables behind the report charts, each from one groupby over
+    This Week and Last Week (every week/type or week/day appears):
+
+    by_type: (week, customer type label) -> avg_wait_time, avg_talk_time
+        (seconds) and call_count of main-log calls
+    by_day: (week, weekday 0-6) -> abandoned count, wait_min / wait_mean /
+        wait_max of abandoned calls, main_calls and answered
+    abandoned_by_week: week -> abandoned, retail, trade and wait_mean
+
+    by_day and abandoned_by_week are None without abandoned calls.
+    """
+    recent = df[df['week'].isin(CHART_WEEKS) & df['customer_type'].isin(list(CUSTOMER_TYPE_LABELS))]
+    by_type = recent.groupby(['week', recent['customer_type'].map(CUSTOMER_TYPE_LABELS)]).agg(
+        avg_wait_time=('ringing_total_sec', 'mean'),
+        avg_talk_time=('talking_total_sec', 'mean'),
+        call_count=('ringing_total_sec', 'count'),
+    )
+    type_grid = pd.MultiIndex.from_product([CHART_WEEKS, list(CUSTOMER_TYPE_LABELS.values())], names=['week', 'customer_type'])
+    by_type = by_type.reindex(type_grid)
+    by_type['call_count'] = by_type['call_count'].fillna(0).astype(int)
+    tables = {'by_type': by_type, 'by_day': None, 'abandoned_by_week': None}
+    if abandoned_df.empty:
+        return tables
+
+    abd = abandoned_df[abandoned_df['week'].isin(CHART_WEEKS)]
+    abd_rows = pd.DataFrame({
+        'week': abd['week'].to_numpy(),
+        'day': pd.to_datetime(abd['Call Time'], errors='coerce').dt.dayofweek.to_numpy(),
+        'wait': hms_to_seconds_column(abd['Waiting Time']).to_numpy(),
+        'customer_type': abd['customer_type'].to_numpy(),
+    })
+    by_week = abd_rows.groupby('week').agg(abandoned=('wait', 'size'), wait_mean=('wait', 'mean'))
+    by_week = by_week.join(abd_rows.groupby(['week', 'customer_type']).size().unstack(fill_value=0))
+    by_week = by_week.reindex(index=CHART_WEEKS, columns=['abandoned', 'retail', 'trade', 'wait_mean'])
+    by_week[['abandoned', 'retail', 'trade']] = by_week[['abandoned', 'retail', 'trade']].fillna(0).astype(int)
+
+    # Calls with no parsable time count for the week but not for any day
+    abd_rows = abd_rows[abd_rows['day'].notna()].astype({'day': int})
+    main = df[df['week'].isin(CHART_WEEKS)]
+    day_grid = pd.MultiIndex.from_product([CHART_WEEKS, range(7)], names=['week', 'day'])
+    by_day = abd_rows.groupby(['week', 'day']).agg(
+        abandoned=('wait', 'size'),
+        wait_min=('wait', 'min'),
+        wait_mean=('wait', 'mean'),
+        wait_max=('wait', 'max'),
+    ).join(
+        main.groupby(['week', main['call_start'].dt.dayofweek.rename('day')]).agg(
+            main_calls=('is_answered', 'size'),
+            answered=('is_answered', 'sum'),
+        ),
+        how='outer',
+    ).reindex(day_grid).fillna(0)
+    tables.update(by_day=by_day, abandoned_by_week=by_week)
+    return tables
+
+def plot_metrics_from_tables(tables):
+    """The "Bottom Up" week1_/week2_ counts shown on the data cards, from chart_tables."""
+    metrics = {}
+    counts = tables['by_type']['call_count']
+    for week in CHART_WEEKS:
+        for ctype, label in CUSTOMER_TYPE_LABELS.items():
+            metrics[f"week{week}_{ctype}_calls"] = int(counts.loc[(week, label)])
+            metrics[f"week{week}_{ctype}_total"] = int(counts.loc[(week, label)])
+    by_week = tables['abandoned_by_week']
+    if by_week is not None:
+        for week in CHART_WEEKS:
+            prefix = f"week{week}"
+            metrics[f"{prefix}_abandoned_total"] = int(by_week.loc[week, 'abandoned'])
+            metrics[f"{prefix}_retail_abandoned"] = int(by_week.loc[week, 'retail'])
+            metrics[f"{prefix}_trade_abandoned"] = int(by_week.loc[week, 'trade'])
+            # Total Calls = Retail + Trade + Abandoned
+            metrics[f"{prefix}_calls"] = (
+                metrics[f"{prefix}_retail_total"] + metrics[f"{prefix}_trade_total"]
+                + metrics[f"{prefix}_abandoned_total"]
+            )
+    return metrics
+
 def generate_plots(df, abandoned_df):
     """Generate combined Plotly HTML with three subplots."""
     from plotly.subplots import make_subplots
@@ -104,25 +165,6 @@ def generate_plots(df, abandoned_df):
         s = int(seconds % 60)
         return f"{m}m {s}s"
 
-    # --- Prepare Data for Charts 1 & 2 (Wait/Talk Time) ---
-    # Filter for Week 1 and 2, and exclude 'unknown' customer type
-    df_recent = df[df['week'].isin([1, 2])].copy()
-    df_recent = df_recent[df_recent['customer_type'].isin(['retail', 'trade'])]
-    
-    # Normalize customer type labels for display
-    df_recent['customer_type_display'] = df_recent['customer_type'].map({
-        'retail': 'Retail',
-        'trade': 'Trade Customer'
-    })
-    
-    # Group by Week and Customer Type
-    # Using MEAN as requested ("Average Talking Time")
-    grouped = df_recent.groupby(['week', 'customer_type_display']).agg(
-        avg_wait_time=('ringing_total_sec', 'mean'),
-        avg_talk_time=('talking_total_sec', 'mean'),
-        call_count=('ringing_total_sec', 'count')
-    ).reset_index()
-    
     # Define colors: This Week (blue), Last Week (orange)
     color_map = {1: '#2391DC', 2: '#DC6E23'}
     
@@ -140,222 +182,72 @@ def generate_plots(df, abandoned_df):
         else:
             return f"Week {week}"
     
-    # Chart 1: Average Wait Time
-    fig_waiting = go.Figure()
-    customer_types = ['Retail', 'Trade Customer']
+    if not abandoned_df.empty and 'week' not in abandoned_df.columns:
+        print("Warning: 'week' column missing in abandoned_df passed to generate_plots")
+        return ""
     
+    # Every chart input comes from these small tables (see chart_tables)
+    tables = chart_tables(df, abandoned_df)
+    by_type = tables['by_type']
     # NEW: Capture metrics from plot data for "Bottom Up" consistency
-    plot_derived_metrics = {}
+    plot_derived_metrics = plot_metrics_from_tables(tables)
+    customer_types = list(CUSTOMER_TYPE_LABELS.values())
     
-    # Loop order: Week 1 (This Week) then Week 2 (Last Week) for consistent legend ordering if needed
-    # Or keep [2, 1] if we want "Last Week" on left/top? Usually "This Week" is first or second.
-    # Let's use [1, 2] to process This Week first.
-    for week in [1, 2]:
-        week_data = grouped[grouped['week'] == week]
-        y_vals = []
-        call_counts = []
-        hover_texts = []
-        
-        # Determine metric prefix
-        # Week 1 = "This Week" -> metrics['week1_...']
-        # Week 2 = "Last Week" -> metrics['week2_...']
-        metric_week = f"week{week}"
-        
-        for ctype in customer_types:
-            row = week_data[week_data['customer_type_display'] == ctype]
-            if len(row) > 0:
-                val = row['avg_wait_time'].values[0]
-                count = int(row['call_count'].values[0])
-                y_vals.append(val) # Plot in seconds
-                call_counts.append(count)
-                hover_texts.append(format_time_hover(val))
-                
-                # Capture count for metrics
-                metric_key = f"{metric_week}_{ctype.lower().split()[0]}_calls" # week1_retail_calls
-                plot_derived_metrics[metric_key] = count
-                
-                # Also capture 'total' key for consistency
-                total_key = f"{metric_week}_{ctype.lower().split()[0]}_total"
-                plot_derived_metrics[total_key] = count
-            else:
-                y_vals.append(0)
-                call_counts.append(0)
-                hover_texts.append("0s")
-                
-                # Capture 0 count
-                metric_key = f"{metric_week}_{ctype.lower().split()[0]}_calls"
-                plot_derived_metrics[metric_key] = 0
-                total_key = f"{metric_week}_{ctype.lower().split()[0]}_total"
-                plot_derived_metrics[total_key] = 0
-        
-        week_label = get_week_label_display(week)
-        
-        fig_waiting.add_trace(go.Bar(
-            name=week_label,
-            x=customer_types,
-            y=y_vals,
-            marker_color=color_map[week],
-            text=[week_label] * len(customer_types),  # Add label inside bar
-            textposition='auto',
-            customdata=np.array(list(zip(call_counts, hover_texts))),
-            hovertemplate=(
-                "Type: %{x}<br>"
-                f"{week_label}<br>"
-                "Avg Waiting Time: %{customdata[1]}<br>"
-                "Total Calls: %{customdata[0]}<extra></extra>"
-            )
-        ))
-
-    # Chart 2: Average Talk Time
+    # Charts 1 & 2: Average Wait Time (seconds) and Average Talk Time (minutes)
+    fig_waiting = go.Figure()
     fig_talk = go.Figure()
-    
-    for week in [1, 2]:
-        week_data = grouped[grouped['week'] == week]
-        y_vals = []
-        call_counts = []
-        hover_texts = []
-        
-        for ctype in customer_types:
-            row = week_data[week_data['customer_type_display'] == ctype]
-            if len(row) > 0:
-                val = row['avg_talk_time'].values[0]
-                count = int(row['call_count'].values[0])
-                y_vals.append(val / 60) # Plot in minutes
-                call_counts.append(count)
-                hover_texts.append(format_time_hover(val))
-            else:
-                y_vals.append(0)
-                call_counts.append(0)
-                hover_texts.append("0s")
-        
-        week_label = get_week_label_display(week)
-        
-        fig_talk.add_trace(go.Bar(
-            name=week_label,
-            x=customer_types,
-            y=y_vals,
-            marker_color=color_map[week],
-            text=[week_label] * len(customer_types),  # Add label inside bar
-            textposition='auto',
-            customdata=np.array(list(zip(call_counts, hover_texts))),
-            hovertemplate=(
-                "Type: %{x}<br>"
-                f"{week_label}<br>"
-                "Avg Talk Time: %{customdata[1]}<br>"
-                "Total Calls: %{customdata[0]}<extra></extra>"
-            )
-        ))
+    for fig, column, scale, label in (
+        (fig_waiting, 'avg_wait_time', 1, 'Avg Waiting Time'),
+        (fig_talk, 'avg_talk_time', 60, 'Avg Talk Time'),
+    ):
+        for week in CHART_WEEKS:
+            week_data = by_type.loc[week]
+            call_counts = week_data['call_count'].astype(int).tolist()
+            y_vals = [val / scale if count else 0 for val, count in zip(week_data[column], call_counts)]
+            hover_texts = [format_time_hover(val) if count else "0s" for val, count in zip(week_data[column], call_counts)]
+            week_label = get_week_label_display(week)
+            
+            fig.add_trace(go.Bar(
+                name=week_label,
+                x=customer_types,
+                y=y_vals,
+                marker_color=color_map[week],
+                text=[week_label] * len(customer_types),  # Add label inside bar
+                textposition='auto',
+                customdata=np.array(list(zip(call_counts, hover_texts))),
+                hovertemplate=(
+                    "Type: %{x}<br>"
+                    f"{week_label}<br>"
+                    f"{label}: %{{customdata[1]}}<br>"
+                    "Total Calls: %{customdata[0]}<extra></extra>"
+                )
+            ))
 
-    # --- Prepare Data for Chart 3 (Abandoned by Day) ---
+    # Chart 3: Abandoned by Day
     fig_abandoned = go.Figure()
-    day_counts = pd.DataFrame()
-    
-    if not abandoned_df.empty:
-        # Process abandoned data
-        abd = abandoned_df.copy()
-        # Robust datetime parsing
-        abd['Call Time'] = pd.to_datetime(abd['Call Time'], errors='coerce')
-        
-        # Week is already calculated in analyze_calls, so we just use it!
-        # Ensure week column exists
-        if 'week' not in abd.columns:
-             print("Warning: 'week' column missing in abandoned_df passed to generate_plots")
-             return ""
-
-        # Filter weeks 1 & 2
-        abd = abd[abd['week'].isin([1, 2])].copy()
-        abd['day_of_week'] = abd['Call Time'].dt.day_name()
-        
-        # Parse Waiting Time to seconds for stats
-        def parse_wait(x):
-            try:
-                if pd.isna(x): return 0
-                parts = str(x).split(':')
-                if len(parts) == 3: return int(parts[0])*3600 + int(parts[1])*60 + int(parts[2])
-                return 0
-            except: return 0
-        abd['wait_sec'] = abd['Waiting Time'].apply(parse_wait)
-        
-        # Prepare main df for total/answered stats
-        main_df = df[df['week'].isin([1, 2])].copy()
-        main_df['day_of_week'] = main_df['call_start'].dt.day_name()
-        
-        days_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-        
-        for week in [1, 2]:
-            # Main Data
-            week_main = main_df[main_df['week'] == week]
-            
-            # Abandoned Data - Use same week!
-            week_abd = abd[abd['week'] == week]
-            
-            # Capture abandoned metrics for "Bottom Up" consistency
-            # Determine metric prefix
-            metric_week = f"week{week}"
-            
-            # Total abandoned for this week
-            total_abd_count = len(week_abd)
-            plot_derived_metrics[f"{metric_week}_abandoned_total"] = total_abd_count
-            
-            # Calculate retail/trade split for metrics update
-            retail_abd = len(week_abd[week_abd['customer_type'] == 'retail'])
-            trade_abd = len(week_abd[week_abd['customer_type'] == 'trade'])
-            
-            plot_derived_metrics[f"{metric_week}_retail_abandoned"] = retail_abd
-            plot_derived_metrics[f"{metric_week}_trade_abandoned"] = trade_abd
-            
-            # Update Total Calls Metric = Retail + Trade + Abandoned
-            current_retail = plot_derived_metrics.get(f"{metric_week}_retail_total", 0)
-            current_trade = plot_derived_metrics.get(f"{metric_week}_trade_total", 0)
-            plot_derived_metrics[f"{metric_week}_calls"] = current_retail + current_trade + total_abd_count
-            
-            y_vals = []
-            custom_data = []
-            
-            for day in days_order:
-                # Abandoned stats
-                day_abd = week_abd[week_abd['day_of_week'] == day]
-                abd_count = len(day_abd)
-                y_vals.append(abd_count)
-                
-                # Wait time stats
-                if not day_abd.empty:
-                    min_w = day_abd['wait_sec'].min()
-                    avg_w = day_abd['wait_sec'].mean()
-                    max_w = day_abd['wait_sec'].max()
-                else:
-                    min_w = avg_w = max_w = 0
-                
-                # Main call stats
-                day_main = week_main[week_main['day_of_week'] == day]
-                
-                # Count ALL main log calls (not just answered) to match executive summary
-                main_calls_count = len(day_main)
-                answered_calls = day_main['is_answered'].sum()
-                
-                # Total = All Main Log Calls + Abandoned
-                # This matches the executive summary formula: Retail + Trade + Abandoned = Total
-                total_calls = main_calls_count + abd_count
-                
-                # Voicemail/Other = Total Main - Answered (calls in main log but not answered)
-                voicemail_other = main_calls_count - int(answered_calls)
-                
-                custom_data.append([
-                    total_calls,                # 0 - Main calls + Abandoned
-                    int(answered_calls),        # 1 - Answered calls only
-                    abd_count,                  # 2 - Abandoned
-                    format_time_hover(min_w),   # 3
-                    format_time_hover(avg_w),   # 4
-                    format_time_hover(max_w),   # 5
-                    voicemail_other             # 6 - Voicemail/Other
-                ])
-            
+    by_day = tables['by_day']
+    
+    if by_day is not None:
+        for week in CHART_WEEKS:
+            week_days = by_day.loc[week]
+            y_vals = week_days['abandoned'].astype(int).tolist()
+            custom_data = [
+                [
+                    int(day['main_calls'] + day['abandoned']),  # 0 - Main calls + Abandoned
+                    int(day['answered']),                       # 1 - Answered calls only
+                    int(day['abandoned']),                      # 2 - Abandoned
+                    format_time_hover(day['wait_min']),         # 3
+                    format_time_hover(day['wait_mean']),        # 4
+                    format_time_hover(day['wait_max']),         # 5
+                    int(day['main_calls'] - day['answered']),   # 6 - Voicemail/Other
+                ]
+                for day in week_days.to_dict('records')
+            ]
             week_label = get_week_label_display(week)
-            all_calls_df = df # For the conditional check in the template string
             
             fig_abandoned.add_trace(go.Bar(
                 name=week_label,
-                x=days_order,
+                x=CHART_DAYS,
                 y=y_vals,
                 marker_color=color_map[week],
                 customdata=custom_data,
@@ -363,19 +255,14 @@ def generate_plots(df, abandoned_df):
                     "Day: %{x}<br>"
                     f"{week_label}<br>"
                     "Abandoned Calls: %{y}<br>"
-                    + ("Answered Calls: %{customdata[1]}<br>" if all_calls_df is not None else "") +
-                    ("Voicemail/Other: %{customdata[6]}<br>" if all_calls_df is not None else "") +
-                    ("Total Calls: %{customdata[0]}<br>" if all_calls_df is not None else "") +
+                    "Answered Calls: %{customdata[1]}<br>"
+                    "Voicemail/Other: %{customdata[6]}<br>"
+                    "Total Calls: %{customdata[0]}<br>"
                     "Min Wait: %{customdata[3]}<br>"
                     "Average Wait: %{customdata[4]}<br>"
                     "Max Wait: %{customdata[5]}<extra></extra>"
                 )
             ))
-            
-            # Store for annotation calculation
-            if week == 1: week1_abd_data = week_abd
-            if week == 2: week2_abd_data = week_abd
-            if week == 1 or week == 2: day_counts = pd.concat([day_counts, week_abd])
 
     # --- Combine Plots ---
     combined_fig = make_subplots(
@@ -403,24 +290,16 @@ def generate_plots(df, abandoned_df):
         combined_fig.add_trace(trace, row=3, col=1)
         
     # --- Annotation ---
-    if not abandoned_df.empty:
-        # Recalculate global stats for annotation
-        w1_mean = week1_abd_data['wait_sec'].mean() if 'week1_abd_data' in locals() and not week1_abd_data.empty else 0
-        w2_mean = week2_abd_data['wait_sec'].mean() if 'week2_abd_data' in locals() and not week2_abd_data.empty else 0
-        w1_count = len(week1_abd_data) if 'week1_abd_data' in locals() else 0
-        w2_count = len(week2_abd_data) if 'week2_abd_data' in locals() else 0
+    if by_day is not None:
+        by_week = tables['abandoned_by_week']
         
-        # Dynamic Y
-        max_y = 10
-        if not day_counts.empty:
-             # Group by week/day to find max bar height
-             cts = day_counts.groupby(['week', 'day_of_week']).size()
-             if not cts.empty: max_y = cts.max()
+        # Dynamic Y: tallest abandoned bar
+        max_y = by_day['abandoned'].max() if by_day['abandoned'].any() else 10
         
         annotation_text = (
             f"<b>Avg Time to Abandon:</b><br>"
-            f"Week {get_week_date_label(1, max_date)}: {format_time_hover(w1_mean)} ({w1_count} calls)<br>"
-            f"Week {get_week_date_label(2, max_date)}: {format_time_hover(w2_mean)} ({w2_count} calls)"
+            f"Week {get_week_date_label(1, max_date)}: {format_time_hover(by_week.loc[1, 'wait_mean'])} ({by_week.loc[1, 'abandoned']} calls)<br>"
+            f"Week {get_week_date_label(2, max_date)}: {format_time_hover(by_week.loc[2, 'wait_mean'])} ({by_week.loc[2, 'abandoned']} calls)"
         )
         
         combined_fig.add_annotation(
@@ -459,45 +338,69 @@ def generate_plots(df, abandoned_df):
         margin=dict(l=20, r=20, t=60, b=50)
     )
     
+    # Rounded, typed-array payload (see plot_payload.py); sizes go in the verification summary
+    combined_plot, payload = figure_to_html(
+        combined_fig,
+        full_html=False, 
+        include_plotlyjs='cdn',
+        config={'responsive': True, 'displayModeBar': False}
+    )
     return {
-        'combined_plot': combined_fig.to_html(
-            full_html=False, 
-            include_plotlyjs='cdn',
-            config={'responsive': True, 'displayModeBar': False}
-        )
+        'combined_plot': combined_plot,
+        'payload': payload
     }, plot_derived_metrics
 
+# Abandoned calls already loaded in this process: data_dir -> (files, frame)
+_abandoned_cache = {}
+
+def _file_signature(files):
+    return tuple((f, os.path.getsize(f), os.path.getmtime(f)) for f in files)
+
 def load_abandoned_calls(data_dir='data'):
-    """Load all abandoned calls CSV files."""
-    files = glob.glob(os.path.join(data_dir, 'AbandonedCalls*.csv'))
-    dfs = []
+    """
+    Load abandoned calls from the call store (see call_store.py).
+
+    Only AbandonedCalls exports not ingested before (by content hash) are
+    read; their rows are deduplicated on Caller ID + Call Time against
+    everything stored and appended. Calling it again in the same process
+    returns a copy of the cached frame unless the exports changed.
+    """
+    files = sorted(glob.glob(os.path.join(data_dir, ABANDONED_CALLS.pattern)))
+    cache_key = os.path.abspath(data_dir)
+    signature = _file_signature(files)
+    cached = _abandoned_cache.get(cache_key)
+    if cached is not None and cached[0] == signature:
+        print(f"Using abandoned calls already loaded ({len(cached[1])} rows)")
+        return cached[1].copy()
+
+    sources = call_store.ingested_sources(call_store.ABANDONED, data_dir)
+    new_files = added = 0
     for f in files:
         try:
-            df = pd.read_csv(f)
-            dfs.append(df)
+            digest = file_hash(f)
+            if digest in sources:
+                continue
+            df = read_export(f, ABANDONED_CALLS)
         except Exception as e:
             print(f"Error reading {f}: {e}")
-    
-    if dfs:
-        combined_df = pd.concat(dfs, ignore_index=True)
-        
-        # Clean Caller ID immediately to remove .0 suffix globally
-        if 'Caller ID' in combined_df.columns:
-            combined_df['Caller ID'] = combined_df['Caller ID'].astype(str).apply(
-                lambda x: x[:-2] if x.endswith('.0') else x
-            )
-            
-        # Deduplicate based on Caller ID and Call Time
-        before_dedup = len(combined_df)
-        combined_df = combined_df.drop_duplicates(subset=['Caller ID', 'Call Time'])
-        print(f"Deduplicated abandoned logs: {before_dedup} -> {len(combined_df)}")
-            
-        # Save combined file
-        output_path = os.path.join(data_dir, 'combined_abandoned_call_logs.csv')
-        combined_df.to_csv(output_path, index=False)
-        print(f"Saved combined abandoned calls to {output_path}")
-        return combined_df
-    return pd.DataFrame()
+            continue
+
+        # Clean Caller ID immediately to remove .0 suffix
+        df['Caller ID'] = df['Caller ID'].astype(str).str.replace(r'\.0$', '', regex=True)
+        df['Call Time'] = parse_call_time(df['Call Time'])
+
+        # Deduplicated on Caller ID + Call Time against everything stored
+        rows = call_store.append(df, call_store.ABANDONED, data_dir)
+        call_store.record_source(call_store.ABANDONED, digest, f, rows, data_dir)
+        new_files += 1
+        added += rows
+    print(f"Abandoned calls: {new_files} new of {len(files)} files, {added} new rows stored")
+
+    combined_df = call_store.read(call_store.ABANDONED, data_dir=data_dir)
+    if combined_df.empty:
+        combined_df = pd.DataFrame()
+    _abandoned_cache[cache_key] = (signature, combined_df)
+    return combined_df.copy()
 
 def analyze_abandoned_calls(abandoned_df, main_df):
     """Analyze abandoned calls with customer type mapping."""
@@ -527,53 +430,25 @@ def analyze_abandoned_calls(abandoned_df, main_df):
     
     return metrics
 
-import re
-
-def analyze_journey(main_df, abandoned_df):
-    """Analyze caller journey including Queue, Voicemail, OOO, and Termination."""
+def analyze_journey(main_df, abandoned_df, calendar=DEFAULT_CALENDAR):
+    """
+    Analyze caller journey including Queue, Voicemail, OOO, and Termination.
+    Logged-out abandoned calls are split by the business calendar's hours.
+    """
     journey_stats = {}
     
     # --- 1. Main Log Analysis (Answered/Processed Calls) ---
-    # Group by Call ID to get full journey details
-    # Fill NA in Call Activity Details
-    if 'call_activity_details' not in main_df.columns:
-        # Fallback if cleaning didn't add it (should not happen if cleaning.py is updated)
-        main_df['call_activity_details'] = ''
-        
-    main_df['call_activity_details'] = main_df['call_activity_details'].fillna('')
-    
-    # Main DF is already aggregated by Call ID from cleaning.py, so we don't need to group again
-    # But we need to ensure we are working with the right structure.
-    journey_df = main_df.copy()
-    
-    # Queue Usage
-    journey_stats['queue_calls'] = len(journey_df[journey_df['call_activity_details'].str.contains('Queue', case=False)])
-    
-    # Out of Hours (Explicit OOO)
-    journey_stats['ooo_calls'] = len(journey_df[journey_df['call_activity_details'].str.contains('Out of office', case=False)])
-    
-    # Voicemail (Voice Agent)
-    journey_stats['voicemail_calls'] = len(journey_df[journey_df['call_activity_details'].str.contains('Voice Agent', case=False)])
-    
-    # Termination Analysis
-    def extract_terminator(details):
-        if 'Ended by Voice Agent' in details: return 'System'
-        if 'Ended by' in details:
-            # Check if ended by a known agent name (usually contains comma or 'Sales')
-            # Or if ended by a number (likely customer)
-            # Heuristic: If "Ended by [Number]", it's customer. If "Ended by [Name]", it's agent.
-            # But names can be complex. Let's look for digits in the terminator.
-            m = re.search(r'Ended by ([^:|]+)', details)
-            if m:
-                terminator = m.group(1).strip()
-                # If terminator contains digits and looks like a phone number, it's customer
-                if any(char.isdigit() for char in terminator) and len(terminator) > 5:
-                    return 'Customer'
-                return 'Agent'
-        return 'Unknown'
-        
-    journey_df['Terminator'] = journey_df['call_activity_details'].apply(extract_terminator)
-    term_counts = journey_df['Terminator'].value_counts()
+    # Journey events are parsed once at cleaning time (cleaning.extract_journey_events),
+    # so these are column reductions; older frames without them are parsed here
+    if not set(JOURNEY_COLUMNS).issubset(main_df.columns):
+        details = main_df.get('call_activity_details', pd.Series('', index=main_df.index))
+        main_df = main_df.drop(columns=JOURNEY_COLUMNS, errors='ignore').join(extract_journey_events(details))
+
+    journey_stats['queue_calls'] = int(main_df['queue_visited'].sum())
+    journey_stats['ooo_calls'] = int(main_df['ooo_ivr_hit'].sum())
+    journey_stats['voicemail_calls'] = int(main_df['voice_agent_hit'].sum())
+
+    term_counts = main_df['terminator_type'].value_counts()
     journey_stats['ended_by_agent'] = term_counts.get('Agent', 0)
     journey_stats['ended_by_customer'] = term_counts.get('Customer', 0)
     journey_stats['ended_by_system'] = term_counts.get('System', 0)
@@ -588,48 +463,10 @@ def analyze_journey(main_df, abandoned_df):
             
             # Time breakdown for agents logged out calls
             if not logged_out_df.empty and 'Call Time' in logged_out_df.columns:
-                logged_out_df['Call Time'] = pd.to_datetime(logged_out_df['Call Time'], errors='coerce')
-                logged_out_df['hour'] = logged_out_df['Call Time'].dt.hour
-                logged_out_df['day_of_week'] = logged_out_df['Call Time'].dt.dayofweek
-                
-                # Count calls before and after operating hours
-                before_hours = 0
-                after_hours = 0
-                during_hours = 0
-                
-                for idx, row in logged_out_df.iterrows():
-                    day = row['day_of_week']
-                    hour = row['hour']
-                    
-                    if pd.isna(day) or pd.isna(hour):
-                        continue
-                        
-                    # Operating hours check
-                    if day <= 4:  # Monday-Friday
-                        if hour < 8:
-                            before_hours += 1
-                        elif hour >= 20:
-                            after_hours += 1
-                        else:
-                            during_hours += 1
-                    elif day == 5:  # Saturday
-                        if hour < 8:
-                            before_hours += 1
-                        elif hour >= 18:
-                            after_hours += 1
-                        else:
-                            during_hours += 1
-                    elif day == 6:  # Sunday
-                        if hour < 10:
-                            before_hours += 1
-                        elif hour >= 16:
-                            after_hours += 1
-                        else:
-                            during_hours += 1
-                
-                journey_stats['abd_logged_out_before_hours'] = before_hours
-                journey_stats['abd_logged_out_after_hours'] = after_hours
-                journey_stats['abd_logged_out_during_hours'] = during_hours
+                hours = calendar.classify(logged_out_df['Call Time'])
+                journey_stats['abd_logged_out_before_hours'] = int((hours == BEFORE_OPENING).sum())
+                journey_stats['abd_logged_out_after_hours'] = int((hours == AFTER_CLOSING).sum())
+                journey_stats['abd_logged_out_during_hours'] = int((hours == OPEN).sum())
             else:
                 journey_stats['abd_logged_out_before_hours'] = 0
                 journey_stats['abd_logged_out_after_hours'] = 0
@@ -653,183 +490,40 @@ def analyze_journey(main_df, abandoned_df):
         
     return journey_stats
 
-def analyze_out_of_hours(main_df, abandoned_df):
-    """Analyze calls received outside operating hours with time breakdowns."""
-    import pandas as pd
-    
+def analyze_out_of_hours(main_df, abandoned_df, calendar=DEFAULT_CALENDAR):
+    """Analyze calls received outside the business calendar's hours with time breakdowns."""
     # Combine all calls for OOH analysis
     all_calls = []
     
     if not main_df.empty:
-        main_calls = main_df[['call_start']].copy()
-        all_calls.append(main_calls)
+        all_calls.append(main_df['call_start'])
     
     if not abandoned_df.empty:
-        abd_calls = abandoned_df[['Call Time']].copy()
-        abd_calls.columns = ['call_start']
-        all_calls.append(abd_calls)
+        all_calls.append(abandoned_df['Call Time'])
     
     if not all_calls:
         return {'ooh_total': 0, 'ooh_before_opening': 0, 'ooh_after_closing': 0}
     
-    combined = pd.concat(all_calls, ignore_index=True)
-    combined['call_start'] = pd.to_datetime(combined['call_start'])
-    combined['hour'] = combined['call_start'].dt.hour
-    combined['day_of_week'] = combined['call_start'].dt.dayofweek
-    
-    # Define operating hours check
-    def is_out_of_hours(row):
-        day = row['day_of_week']
-        hour = row['hour']
-        # Mon-Fri (0-4): 8am-8pm
-        if day <= 4:
-            return hour < 8 or hour >= 20
-        # Sat (5): 8am-6pm
-        elif day == 5:
-            return hour < 8 or hour >= 18
-        # Sun (6): 10am-4pm
-        elif day == 6:
-            return hour < 10 or hour >= 16
-        return False
-    
-    def categorize_ooh(row):
-        day = row['day_of_week']
-        hour = row['hour']
-        if day <= 4:  # Mon-Fri
-            return 'before' if hour < 8 else 'after'
-        elif day == 5:  # Sat
-            return 'before' if hour < 8 else 'after'
-        elif day == 6:  # Sun
-            return 'before' if hour < 10 else 'after'
-        return 'during'
-    
-    combined['is_ooh'] = combined.apply(is_out_of_hours, axis=1)
-    combined['ooh_category'] = combined.apply(categorize_ooh, axis=1)
-    
-    ooh_calls = combined[combined['is_ooh']]
+    hours = calendar.classify(pd.concat(all_calls, ignore_index=True))
+    before = int((hours == BEFORE_OPENING).sum())
+    after = int((hours == AFTER_CLOSING).sum())
     
     return {
-        'ooh_total': len(ooh_calls),
-        'ooh_before_opening': len(ooh_calls[ooh_calls['ooh_category'] == 'before']),
-        'ooh_after_closing': len(ooh_calls[ooh_calls['ooh_category'] == 'after'])
+        'ooh_total': before + after,
+        'ooh_before_opening': before,
+        'ooh_after_closing': after
     }
 
-def analyze_calls(data_dir='data'):
-    """Main analysis function. Loads all CallLog files in data_dir."""
-    # 1. Clean and Load Data (Multiple Files)
-    print("Cleaning and loading main call logs...")
-    files = glob.glob(os.path.join(data_dir, 'CallLogLastWeek_*.csv'))
-    dfs = []
-    for f in files:
-        print(f"Processing {f}...")
-        try:
-            cleaned = run_cleaning(f)
-            dfs.append(cleaned.call_level_df)
-        except Exception as e:
-            print(f"Error processing {f}: {e}")
-            
-    if not dfs:
-        print("No main call logs found!")
-        return {}
-        
-    df = pd.concat(dfs, ignore_index=True)
-    # Deduplicate Main Log (in case of file overlap)
-    df = df.drop_duplicates(subset=['Call ID'])
-    print(f"Total Main Log Calls (Unique): {len(df)}")
-
-    # RE-CALCULATE WEEKS based on GLOBAL max date
-    # This is necessary because cleaning.py calculates weeks per-file
-    max_date = df['call_start'].max()
-    print(f"Global Max Date: {max_date}")
-    
-    # Week 1: From (max_date - 7 days) up to and including max_date
-    week1_start = max_date - pd.Timedelta(days=7)
-    week1_end = max_date
-    
-    # Week 2: 7 days before Week 1
-    week2_start = week1_start - pd.Timedelta(days=7)
-    week2_end = week1_start
-    
-    def assign_week_global(dt):
-        if dt > week1_start and dt <= week1_end:
-            return 1
-        elif dt > week2_start and dt <= week2_end:
-            return 2
-        else:
-            return 3
-            
-    df['week'] = df['call_start'].apply(assign_week_global)
-    print("Re-calculated weeks based on global max date")
-    print(f"Week distribution: {df['week'].value_counts().to_dict()}")
-
-    # 2. Save to Database
-    save_to_database(df)
-    
-    # 3. Analyze Abandoned Calls (Load first to combine metrics)
-    print("Analyzing abandoned calls files...")
-    abandoned_df = load_abandoned_calls()
-    
-    # 3a. Assign customer type to abandoned_df BEFORE calculating weekly metrics
-    if not abandoned_df.empty:
-        # Helper to clean phone numbers for matching
-        def clean_phone_for_match(phone):
-            s = str(phone).strip()
-            # Remove formatting chars first
-            s = s.replace(' ', '').replace('-', '').replace('.', '').replace('(', '').replace(')', '')
-            
-            # Handle prefixes
-            if s.startswith('+353'): s = s[4:]
-            elif s.startswith('00353'): s = s[5:]
-            elif s.startswith('353'): s = s[3:]
-            
-            # Strip leading zero to ensure match between int (87...) and str (087...)
-            if s.startswith('0'): s = s[1:]
-            
-            return s
+def build_report(df, abandoned_df, max_date, trade_directory=None, calendar=DEFAULT_CALENDAR):
+    """
+    Metrics, plots and narrative for weeks 1 and 2 of an already loaded
+    dataset. df and abandoned_df must carry a 'week' column (and
+    abandoned_df a 'customer_type'); max_date is the end of This Week.
+    trade_directory (trade_directory.TradeDirectory) names the abandoned
+    trade customers, and calendar is the business_hours.BusinessCalendar
+    for out-of-hours stats.
+    """
 
-        # Get set of known trade numbers from main log (cleaned)
-        # Filter out anonymous and empty strings
-        trade_numbers = set(
-            df[df['customer_type'] == 'trade']['from_number']
-            .apply(clean_phone_for_match)
-            .unique()
-        )
-        if 'anonymous' in trade_numbers: trade_numbers.remove('anonymous')
-        if '' in trade_numbers: trade_numbers.remove('')
-        
-        # Apply mapping to abandoned calls (cleaning caller ID first)
-        abandoned_df['customer_type'] = abandoned_df['Caller ID'].apply(
-            lambda x: 'trade' if clean_phone_for_match(x) in trade_numbers else 'retail'
-        )
-        
-        # USER REQUEST: Ensure any 'unknown' customer types are classified as retail, not trade
-        # This handles edge cases where customer_type might be set to 'unknown' elsewhere
-        if 'customer_type' in abandoned_df.columns:
-            abandoned_df.loc[abandoned_df['customer_type'].str.lower() == 'unknown', 'customer_type'] = 'retail'
-            print(f"Reclassified any 'unknown' abandoned calls to 'retail'")
-        
-        # Add week calculation to abandoned_df using same logic as cleaning.py
-        # Use the max date from MAIN log to align weeks
-        abandoned_df['Call Time'] = pd.to_datetime(abandoned_df['Call Time'], errors='coerce')
-        
-        # Week assignment based on max date (already calculated above)
-        def assign_week_abd(dt):
-            if dt > week1_start and dt <= week1_end:
-                return 1
-            elif dt > week2_start and dt <= week2_end:
-                return 2
-            else:
-                return 3
-        
-        abandoned_df['week'] = abandoned_df['Call Time'].apply(assign_week_abd)
-        
-        # Keep week_start for compatibility
-        abandoned_df['week_start'] = abandoned_df['Call Time'].dt.normalize() - pd.to_timedelta(
-            abandoned_df['Call Time'].dt.dayofweek, unit='D'
-        )
-        
-        print(f"Abandoned calls week distribution: {abandoned_df['week'].value_counts().sort_index().to_dict()}")
-    
     # 4. Calculate Combined Metrics
     # CRITICAL: Filter to ONLY Week 1 and 2 for ALL calculations
     # This ensures consistency across metrics, plots, and day-of-week charts
@@ -1001,94 +695,35 @@ def analyze_calls(data_dir='data'):
     abandoned_with_week = abandoned_week12.copy() if not abandoned_week12.empty else pd.DataFrame()
 
     # 6. Analyze Journey (Already using filtered week12 data)
-    journey_stats = analyze_journey(df_week12, abandoned_week12)
+    journey_stats = analyze_journey(df_week12, abandoned_week12, calendar)
     metrics.update(journey_stats)
     
     # 6b. Extract Abandoned Trade Customers by Week
     abandoned_trade_customers = {'week1': [], 'week2': []}
-    if not abandoned_week12.empty:
-        # Load trade customer names if available
-        trade_names_path = os.path.join(data_dir, 'trade_customer_numbers.csv')
-        trade_names_map = {}
-        if os.path.exists(trade_names_path):
-            try:
-                trade_df = pd.read_csv(trade_names_path)
-                if 'phone_number' in trade_df.columns and 'customer_name' in trade_df.columns:
-                    # Clean phone numbers for matching
-                    def clean_phone_for_match(phone):
-                        s = str(phone).strip()
-                        s = s.replace(' ', '').replace('-', '').replace('.', '').replace('(', '').replace(')', '')
-                        if s.startswith('+353'): s = s[4:]
-                        elif s.startswith('00353'): s = s[5:]
-                        elif s.startswith('353'): s = s[3:]
-                        if s.startswith('0'): s = s[1:]
-                        return s
-                    
-                    for _, row in trade_df.iterrows():
-                        cleaned_num = clean_phone_for_match(row['phone_number'])
-                        trade_names_map[cleaned_num] = row['customer_name']
-            except Exception as e:
-                print(f"Could not load trade customer names: {e}")
-        
-        # Get abandoned trade customers for each week
+    if not abandoned_week12.empty and trade_directory is not None:
+        # Each abandoned call individually (don't group), named from the trade directory
+        trade_abandoned = abandoned_week12[abandoned_week12['customer_type'] == 'trade']
+        names = trade_directory.lookup(clean_phone_column(trade_abandoned['Caller ID']))['customer_name']
+        listed = trade_abandoned.assign(name=names.to_numpy())
+
+        # USER REQUEST: Skip entries with Unknown/missing names
+        # These are not verified trade customers and should be treated as retail
+        named = listed['name'].notna() & listed['name'].fillna('').str.strip().str.upper().ne('UNKNOWN')
+        # Most recent first (calls without a time last)
+        listed = listed[named].sort_values('Call Time', ascending=False, kind='stable', na_position='last')
+        call_times = pd.to_datetime(listed['Call Time'], errors='coerce').dt.strftime('%d/%m/%Y %H:%M').fillna('N/A')
+
         for week_num in [1, 2]:
-            week_key = f'week{week_num}'
-            week_abandoned = abandoned_df[
-                (abandoned_df['week'] == week_num) & 
-                (abandoned_df['customer_type'] == 'trade')
-            ].copy()
-            
-            if not week_abandoned.empty:
-                # Clean phone numbers for matching
-                week_abandoned['cleaned_phone'] = week_abandoned['Caller ID'].apply(
-                    lambda x: clean_phone_for_match(x)
-                )
-                
-                # Process each abandoned call individually (don't group)
-                for _, row in week_abandoned.iterrows():
-                    phone = row['Caller ID']
-                    cleaned = row['cleaned_phone']
-                    call_time = row['Call Time']
-                    
-                    # Get customer name if available
-                    customer_name = trade_names_map.get(cleaned, None)
-                    
-                    # USER REQUEST: Skip entries with Unknown/missing names
-                    # These are not verified trade customers and should be treated as retail
-                    if customer_name is None or customer_name.strip().upper() == 'UNKNOWN':
-                        continue  # Skip - not a verified trade customer
-                    
-                    customer_name = customer_name.upper()
-                    
-                    # Format the call time
-                    if pd.notnull(call_time):
-                        if isinstance(call_time, str):
-                            call_time = pd.to_datetime(call_time, errors='coerce')
-                        call_time_str = call_time.strftime('%d/%m/%Y %H:%M') if pd.notnull(call_time) else 'N/A'
-                        sort_time = call_time if pd.notnull(call_time) else pd.Timestamp.min
-                    else:
-                        call_time_str = 'N/A'
-                        sort_time = pd.Timestamp.min
-                    
-                    abandoned_trade_customers[week_key].append({
-                        'name': customer_name,
-                        'phone': phone,
-                        'call_time': call_time_str,
-                        'sort_time': sort_time
-                    })
-                
-                # Sort by call time (most recent first)
-                abandoned_trade_customers[week_key].sort(
-                    key=lambda x: x['sort_time'], 
-                    reverse=True
+            in_week = (listed['week'] == week_num).to_numpy()
+            abandoned_trade_customers[f'week{week_num}'] = [
+                {'name': name, 'phone': phone, 'call_time': call_time}
+                for name, phone, call_time in zip(
+                    listed['name'][in_week].str.upper(), listed['Caller ID'][in_week], call_times[in_week]
                 )
-                
-                # Remove sort_time field before returning (not needed in template)
-                for item in abandoned_trade_customers[week_key]:
-                    del item['sort_time']
+            ]
     
     # 6a. Analyze Out of Hours (Enhanced) - Week 1 and Week 2 only
-    ooh_stats = analyze_out_of_hours(df_week12, abandoned_week12)
+    ooh_stats = analyze_out_of_hours(df_week12, abandoned_week12, calendar)
     metrics.update(ooh_stats)
     
     # 7. Generate Plots & Get Bottom-Up Metrics
@@ -1102,39 +737,6 @@ def analyze_calls(data_dir='data'):
     # (Retail Main + Trade Main + Abandoned Total)
     metrics['total_calls'] = metrics['week1_calls'] + metrics['week2_calls']
     
-    # 8. Export Datasets for Download
-    print("Exporting datasets for download...")
-    try:
-        # Export cleaned call logs
-        df.to_csv('reports/call_logs_cleaned.csv', index=False)
-        print("Exported cleaned call logs to reports/call_logs_cleaned.csv")
-        
-        # Export original/raw call logs (combine all raw files)
-        raw_files = glob.glob(os.path.join(data_dir, 'CallLogLastWeek_*.csv'))
-        raw_dfs = []
-        for f in raw_files:
-            raw_dfs.append(pd.read_csv(f))
-        raw_combined = pd.concat(raw_dfs, ignore_index=True)
-        raw_combined.to_csv('reports/call_logs_original.csv', index=False)
-        print("Exported original call logs to reports/call_logs_original.csv")
-        
-        # Export cleaned abandoned logs
-        if not abandoned_df.empty:
-            abandoned_df.to_csv('reports/abandoned_logs_cleaned.csv', index=False)
-            print("Exported cleaned abandoned logs to reports/abandoned_logs_cleaned.csv")
-        
-        # Export original abandoned logs
-        abd_files = glob.glob(os.path.join(data_dir, 'AbandonedCalls*.csv'))
-        if abd_files:
-            abd_raw_dfs = []
-            for f in abd_files:
-                abd_raw_dfs.append(pd.read_csv(f))
-            abd_raw_combined = pd.concat(abd_raw_dfs, ignore_index=True)
-            abd_raw_combined.to_csv('reports/abandoned_logs_original.csv', index=False)
-            print("Exported original abandoned logs to reports/abandoned_logs_original.csv")
-    except Exception as e:
-        print(f"Error exporting datasets: {e}")
-    
     # 10. Generate Narrative
     # Calculate week date ranges for narrative
     week1_start_date = (max_date - pd.Timedelta(days=6)).strftime('%d/%m/%Y')
@@ -1165,7 +767,7 @@ def analyze_calls(data_dir='data'):
     <br><br>
     <b>Out of Hours Analysis:</b>
     <br>
-    Operating Hours: Mon-Fri 8am-8pm, Sat 8am-6pm, Sun 10am-4pm
+    Operating Hours: {calendar.describe()}
     <br>
     - <b>Total OOH Calls:</b> {metrics.get('ooh_total', 0):,} calls received outside operating hours
     <br>
@@ -1193,9 +795,70 @@ def analyze_calls(data_dir='data'):
         'abandoned_all_weeks': abandoned_all_weeks,  # Keep full data for audit
         'max_date': max_date.strftime('%d/%m/%Y') if pd.notnull(max_date) else "N/A",
         'max_date_obj': max_date if pd.notnull(max_date) else None,  # Add datetime object for filename
-        'abandoned_trade_customers': abandoned_trade_customers
+        'abandoned_trade_customers': abandoned_trade_customers,
+        'operating_hours': calendar.describe()
     }
 
+def analyze_calls(data_dir='data', use_cache=True, jobs=1, chunksize=None, dataset=None, run=None):
+    """Main analysis function. Loads all CallLog files in data_dir.
+
+    With use_cache, unchanged files are loaded from the ingest cache
+    instead of being re-cleaned (see ingest_cache.py). jobs > 1 cleans
+    files in parallel across that many processes. chunksize streams
+    each export in chunks of that many rows (for monthly/quarterly
+    exports that don't fit in memory).
+
+    Pass an already loaded CallDataset (see call_dataset.py) as dataset
+    to skip loading; its data_dir is used for the raw exports and the
+    cache/jobs/chunksize options are ignored.
+
+    Pass a db_session.UnitOfWork as run to queue the database sync with
+    the caller's other writes instead of committing it here.
+    """
+    from call_dataset import CallDataset
+
+    # 1. Clean and Load Data (Multiple Files)
+    if dataset is None:
+        dataset = CallDataset.load(data_dir, use_cache=use_cache, jobs=jobs, chunksize=chunksize)
+    if dataset.calls.empty:
+        return {}
+    data_dir = dataset.data_dir
+
+    # 2-7, 10. Weeks ending at the latest call, metrics, plots, narrative
+    results = dataset.report_for()
+    df = results['raw_data_all_weeks']
+    abandoned_df = results['abandoned_all_weeks']
+
+    # Sync new and changed rows to the database
+    save_to_database(df, abandoned_df, run=run)
+    
+    # 8. Export Datasets for Download
+    print("Exporting datasets for download...")
+    try:
+        # Export cleaned call logs
+        df.to_csv('reports/call_logs_cleaned.csv', index=False)
+        print("Exported cleaned call logs to reports/call_logs_cleaned.csv")
+        
+        # Export original/raw call logs (raw files concatenated as-is, no parsing)
+        raw_files = sorted(glob.glob(os.path.join(data_dir, CALL_LOG.pattern)))
+        concat_raw_exports(raw_files, 'reports/call_logs_original.csv')
+        print("Exported original call logs to reports/call_logs_original.csv")
+        
+        # Export cleaned abandoned logs
+        if not abandoned_df.empty:
+            abandoned_df.to_csv('reports/abandoned_logs_cleaned.csv', index=False)
+            print("Exported cleaned abandoned logs to reports/abandoned_logs_cleaned.csv")
+        
+        # Export original abandoned logs
+        abd_files = sorted(glob.glob(os.path.join(data_dir, ABANDONED_CALLS.pattern)))
+        if abd_files:
+            concat_raw_exports(abd_files, 'reports/abandoned_logs_original.csv')
+            print("Exported original abandoned logs to reports/abandoned_logs_original.csv")
+    except Exception as e:
+        print(f"Error exporting datasets: {e}")
+
+    return results
+
 if __name__ == "__main__":
     results = analyze_calls('data')
     print("Analysis complete.")
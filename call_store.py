@@ -0,0 +1,334 @@
+"""
+Call Store
+Persistent columnar store of deduplicated call-level and abandoned
+records, partitioned by week (Monday week_start):
+
+    data/store/<table>/week_start=YYYY-MM-DD/part-00000.parquet
+    data/store/<table>/keys.npy   (call_index keys of every stored row)
+    data/store/<table>/manifest.json   (source files already appended)
+    data/store/<table>/versions.json   (week_start -> version its rows were written by)
+
+Appends check new rows against the key index and write them as a new
+part file in each week they touch, so existing partitions are never
+re-read. A table with a version (calls: cleaning.CLEANING_VERSION)
+records which version wrote each partition; after a bump, incoming rows
+whose key is already stored in an older-version partition replace the
+stored ones, and that partition is rewritten as one part under the new
+version (rows no append brings again, e.g. from exports since removed,
+keep their old columns). append_call_log streams an export into the
+calls table part by part, in memory bounded by the chunk size (see
+cleaning.stream_call_level).
+
+Reads keep the last stored row per key, so a part written again after a
+crash (before the index was saved) is never counted twice. Reads with a
+date range only open the partitions that overlap it. Files are parquet
+when pyarrow is installed, pickle otherwise (same as the ingest cache).
+"""
+import glob
+import json
+import os
+from dataclasses import dataclass
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import call_index
+from cleaning import CHUNK_ROWS, CLEANING_VERSION, merge_calls, stream_call_level
+from ingest_cache import CACHE_FORMAT, load_manifest, read_frame, save_manifest, write_frame
+from weeks import WEEK, week_start_of
+
+PARTITION_PREFIX = 'week_start='
+INDEX_NAME = 'keys.npy'
+VERSIONS_NAME = 'versions.json'
+
+
+@dataclass(frozen=True)
+class StoreTable:
+    name: str
+    time_col: str
+    key: tuple
+    # Version of the code that produces the rows (None: rows never change)
+    version: str = None
+
+
+# Call-level rows from cleaning.py, minus the run-relative 'week'
+CALLS = StoreTable('calls', 'call_start', ('Call ID',), CLEANING_VERSION)
+# Abandoned log rows with a parsed Call Time (one row per polled agent,
+# deduplicated the same way as load_abandoned_calls)
+ABANDONED = StoreTable('abandoned', 'Call Time', ('Caller ID', 'Call Time'))
+
+
+def get_store_dir(data_dir='data'):
+    return os.path.join(data_dir, 'store')
+
+
+def _table_dir(table, data_dir):
+    return os.path.join(get_store_dir(data_dir), table.name)
+
+
+def _partition_dir(table, week_start, data_dir):
+    return os.path.join(_table_dir(table, data_dir), f"{PARTITION_PREFIX}{week_start:%Y-%m-%d}")
+
+
+def _part_files(partition_dir):
+    parts = glob.glob(os.path.join(partition_dir, 'part*.*'))
+    return sorted(p for p in parts if not p.endswith('.tmp'))
+
+
+def _part_number(path):
+    return int(os.path.basename(path).split('.')[0][len('part-'):])
+
+
+def _index_path(table, data_dir):
+    return os.path.join(_table_dir(table, data_dir), INDEX_NAME)
+
+
+def partition_versions(table, data_dir='data'):
+    """'YYYY-MM-DD' week_start -> version that wrote the partition's rows."""
+    path = os.path.join(_table_dir(table, data_dir), VERSIONS_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _save_partition_versions(table, versions, data_dir):
+    path = os.path.join(_table_dir(table, data_dir), VERSIONS_NAME)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(versions, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def ingested_sources(table, data_dir='data'):
+    """Source files already appended to the table: content hash -> entry."""
+    return load_manifest(_table_dir(table, data_dir))
+
+
+def record_source(table, digest, path, rows, data_dir='data'):
+    sources = ingested_sources(table, data_dir)
+    sources[digest] = {
+        'source': os.path.basename(path),
+        'rows': int(rows),
+        'ingested': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+    }
+    save_manifest(_table_dir(table, data_dir), sources)
+
+
+def list_partitions(table, data_dir='data'):
+    """Sorted week_start of every stored partition."""
+    weeks = []
+    for d in glob.glob(os.path.join(_table_dir(table, data_dir), PARTITION_PREFIX + '*')):
+        if _part_files(d):
+            weeks.append(pd.Timestamp(os.path.basename(d)[len(PARTITION_PREFIX):]))
+    return sorted(weeks)
+
+
+def part_counts(table, data_dir='data'):
+    """week_start -> number of parts ever written to the week. Part numbers
+    are never reused, so the count grows whenever an append adds or
+    replaces rows in the week and works as a cheap change marker."""
+    return {
+        week_start: _part_number(_part_files(_partition_dir(table, week_start, data_dir))[-1]) + 1
+        for week_start in list_partitions(table, data_dir)
+    }
+
+
+def table_keys(df, table):
+    """128-bit keys for the table's key columns (see call_index.py)."""
+    if table.key == ('Call ID',):
+        return call_index.call_id_keys(df['Call ID'])
+    return call_index.row_keys(df, table.key)
+
+
+def load_keys(table, data_dir='data'):
+    """The table's key index, rebuilt from the stored rows if it's missing."""
+    path = _index_path(table, data_dir)
+    index = call_index.load_index(path)
+    if index is None and list_partitions(table, data_dir):
+        stored = read(table, columns=list(table.key), data_dir=data_dir)
+        index = call_index.build_index(table_keys(stored, table))
+        call_index.save_index(path, index)
+    return index
+
+
+def _write_part(part, partition_dir):
+    """Write part as the partition's next part file (numbers are never reused)."""
+    os.makedirs(partition_dir, exist_ok=True)
+    existing = _part_files(partition_dir)
+    number = _part_number(existing[-1]) + 1 if existing else 0
+    path = os.path.join(partition_dir, f"part-{number:05d}.{CACHE_FORMAT}")
+    tmp_path = path + '.tmp'
+    write_frame(part.reset_index(drop=True), tmp_path)
+    os.replace(tmp_path, path)
+    return existing
+
+
+def _replace_rows(table, week_start, part, keys, data_dir):
+    """Rewrite a partition as one part: its stored rows whose key is in keys are replaced by part."""
+    partition_dir = _partition_dir(table, week_start, data_dir)
+    stored = read(table, week_start, week_start + WEEK, data_dir=data_dir)
+    kept = stored[~np.isin(table_keys(stored, table), keys)]
+    merged = pd.concat([kept, part], ignore_index=True) if len(kept) else part
+    # The new part is written before the old ones are removed; until then
+    # reads keep its rows (the last per key)
+    for path in _write_part(merged, partition_dir):
+        os.remove(path)
+
+
+def append(df, table, data_dir='data'):
+    """
+    Add rows to the store, skipping any whose key is already stored (or
+    repeated earlier in df) unless the stored row is in a partition
+    written by an older table.version, in which case it is replaced.
+    Rows without a valid timestamp are not stored. Returns the number of
+    rows added or replaced.
+    """
+    return int(_append(df, table, data_dir).sum())
+
+
+def _append(df, table, data_dir):
+    """append, returning a mask of the df rows that were stored."""
+    valid = df[table.time_col].notna().to_numpy()
+    stored = np.zeros(len(df), dtype=bool)
+    df = df[valid]
+    if 'week' in df.columns:
+        df = df.drop(columns='week')
+
+    index = load_keys(table, data_dir)
+    keys = table_keys(df, table)
+    fresh = call_index.new_key_mask(index, keys)
+    weeks = week_start_of(df[table.time_col])
+
+    versions = partition_versions(table, data_dir) if table.version is not None else {}
+    stored_weeks = {f'{w:%Y-%m-%d}' for w in list_partitions(table, data_dir)}
+    stale_weeks = {w for w in stored_weeks if versions.get(w) != table.version} if table.version is not None else set()
+    in_stale = weeks.dt.strftime('%Y-%m-%d').isin(stale_weeks).to_numpy()
+    first = ~pd.Series(keys).duplicated().to_numpy()
+    replace = ~fresh & in_stale & first
+    take = fresh | replace
+    stored[valid] = take
+    if not take.any():
+        return stored
+    rows = df[take].copy()
+    for col in rows.columns[rows.dtypes == 'category']:
+        rows[col] = rows[col].cat.remove_unused_categories()
+    row_keys = keys[take]
+    for week_start, part in rows.groupby(weeks[take].to_numpy(), sort=True):
+        week = f'{pd.Timestamp(week_start):%Y-%m-%d}'
+        if week in stale_weeks:
+            _replace_rows(table, pd.Timestamp(week_start), part, row_keys, data_dir)
+        else:
+            _write_part(part, _partition_dir(table, week_start, data_dir))
+        if table.version is not None:
+            versions[week] = table.version
+
+    if table.version is not None:
+        _save_partition_versions(table, versions, data_dir)
+    # Index last: a crash before this line makes a rerun write the rows
+    # again, which read drops (it keeps one row per key)
+    call_index.save_index(_index_path(table, data_dir), call_index.add_keys(index, keys[fresh]))
+    return stored
+
+
+def _merge_late(late, stored_by_week, data_dir):
+    """
+    Merge calls that came out again in a later part of the same export
+    with the rows stored for them (stored_by_week: week_start -> sorted
+    keys of the export's stored calls, kept up to date).
+    """
+    keys = table_keys(late, CALLS)
+    found = [w for w, week_keys in stored_by_week.items() if call_index.contains(week_keys, keys).any()]
+    stored = []
+    for week_start in found:
+        rows = read(CALLS, week_start, week_start + WEEK, data_dir=data_dir)
+        stored.append(rows[np.isin(table_keys(rows, CALLS), keys)])
+    merged = merge_calls(pd.concat(stored + [late], ignore_index=True))
+
+    # The merged row can start in an earlier week than the stored one
+    weeks = week_start_of(merged[CALLS.time_col])
+    merged['week_start'] = weeks
+    targets = set(weeks)
+    versions = partition_versions(CALLS, data_dir)
+    for week_start in sorted(targets | set(found)):
+        _replace_rows(CALLS, week_start, merged[(weeks == week_start).to_numpy()], keys, data_dir)
+        versions[f'{week_start:%Y-%m-%d}'] = CALLS.version
+    _save_partition_versions(CALLS, versions, data_dir)
+
+    for week_start in list(stored_by_week):
+        week_keys = stored_by_week[week_start]
+        stored_by_week[week_start] = week_keys[~call_index.contains(np.sort(keys), week_keys)]
+    for week_start in targets:
+        moved = np.sort(keys[(weeks == week_start).to_numpy()])
+        stored_by_week[week_start] = call_index.add_keys(stored_by_week.get(week_start), moved)
+
+
+def append_call_log(call_log_path, data_dir='data', chunksize=CHUNK_ROWS):
+    """
+    Clean a CallLog export and store its calls part by part as they
+    complete (cleaning.stream_call_level), so memory is bounded by the
+    chunk size, not the export. A call whose legs are further apart than
+    the carry window comes out again in a later part; it is merged with
+    the row this export stored (cleaning.merge_calls) and replaces it.
+    Calls already stored from other exports are skipped, as in append.
+    Returns the number of calls stored.
+    """
+    stored_by_week = {}
+    added = 0
+    for part in stream_call_level(call_log_path, chunksize=chunksize):
+        part['week_start'] = week_start_of(part[CALLS.time_col])
+        keys = table_keys(part, CALLS)
+        late = np.zeros(len(part), dtype=bool)
+        for week_keys in stored_by_week.values():
+            late |= call_index.contains(week_keys, keys)
+        if late.any():
+            _merge_late(part[late], stored_by_week, data_dir)
+
+        rows = part[~late]
+        taken = _append(rows, CALLS, data_dir)
+        taken_keys = keys[~late][taken]
+        weeks = week_start_of(rows[CALLS.time_col])[taken]
+        for week_start in set(weeks):
+            new = np.sort(taken_keys[(weeks == week_start).to_numpy()])
+            stored_by_week[week_start] = call_index.add_keys(stored_by_week.get(week_start), new)
+        added += int(taken.sum())
+    return added
+
+
+def read(table, start=None, end=None, columns=None, data_dir='data'):
+    """
+    Stored rows with start <= time < end (either bound may be None).
+    Only partitions whose week overlaps the range are opened, and only
+    the requested columns are loaded (plus the time and key columns for
+    filtering). Rows stored more than once keep the last part's copy.
+    """
+    start = pd.Timestamp(start) if start is not None else None
+    end = pd.Timestamp(end) if end is not None else None
+    load_columns = None
+    if columns is not None:
+        load_columns = list(dict.fromkeys(list(columns) + [table.time_col] + list(table.key)))
+
+    frames = []
+    for week_start in list_partitions(table, data_dir):
+        if start is not None and week_start + WEEK <= start:
+            continue
+        if end is not None and week_start >= end:
+            continue
+        for path in _part_files(_partition_dir(table, week_start, data_dir)):
+            if path.endswith('.parquet'):
+                frames.append(pd.read_parquet(path, columns=load_columns))
+            else:
+                frames.append(read_frame(path) if load_columns is None else read_frame(path)[load_columns])
+
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    df = pd.concat(frames, ignore_index=True)
+    df = df.drop_duplicates(subset=list(table.key), keep='last')
+    if start is not None:
+        df = df[df[table.time_col] >= start]
+    if end is not None:
+        df = df[df[table.time_col] < end]
+    if columns is not None:
+        df = df[list(columns)]
+    return df.reset_index(drop=True)
@@ -1,24 +1,29 @@
 # cleaning.py
 from __future__ import annotations
+import os
 import re
+import time
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
-from typing import Tuple
+from functools import partial
+from itertools import chain
+from typing import Iterator, Tuple
 
 import numpy as np
 import pandas as pd
 
+from durations import hms_to_seconds_column, parse_hms_to_seconds
+from readers import CALL_LOG, parse_call_time, read_export
+from weeks import assign_weeks, week_start_of
 
-def parse_hms_to_seconds(s: str) -> int:
-    """Convert 'HH:MM:SS' to seconds. Non-parsable values -> 0."""
-    try:
-        parts = str(s).split(":")
-        if len(parts) != 3:
-            return 0
-        h, m, sec = map(int, parts)
-        return h * 3600 + m * 60 + sec
-    except Exception:
-        return 0
+# Bump whenever the cleaned output changes, so cached frames are rebuilt
+CLEANING_VERSION = "6"
+
+# Streaming mode: legs read per chunk, and how many trailing rows of each
+# chunk are held back because their call may continue in the next one
+CHUNK_ROWS = 100_000
+CARRY_ROWS = 200
 
 
 def classify_customer_from_activity(activity: str) -> str | None:
@@ -45,6 +50,89 @@ def classify_customer_from_activity(activity: str) -> str | None:
         return "trade"
 
 
+# Only the first non-space character after 'Inbound:' decides the type.
+# Without line breaks this is exactly what classify_customer_from_activity
+# sees (its lazy token always reaches the end-of-string alternative).
+_INBOUND_FIRST_CHAR = re.compile(r"Inbound:\s*(\S)")
+CUSTOMER_TYPE_LEG_DTYPE = pd.CategoricalDtype(["retail", "trade"])
+
+
+def classify_customer_column(activity: pd.Series) -> pd.Series:
+    """
+    Column-wise classify_customer_from_activity, returning a categorical
+    of 'retail' / 'trade' / NaN. Rows containing a line break go through
+    the scalar function, since the original regex can't cross them.
+    """
+    text = activity.astype(object)
+    first = text.str.extract(_INBOUND_FIRST_CHAR, expand=False)
+
+    leg_type = pd.Series(
+        np.where(first.fillna("").str.isdigit(), "retail", "trade"),
+        index=activity.index,
+        dtype=object,
+    ).where(first.notna())
+
+    multiline = text.str.contains("\n", regex=False, na=False)
+    if multiline.any():
+        leg_type[multiline] = text[multiline].map(classify_customer_from_activity)
+
+    return leg_type.astype(CUSTOMER_TYPE_LEG_DTYPE)
+
+
+# Journey events in the joined activity text, found in one pass. Each match
+# consumes only the first character of a queue / out-of-office / voice agent
+# mention (any case) or an 'Ended by <who>' segment and checks the rest in a
+# lookahead, so tokens never swallow one another. The leading character
+# class lets the regex engine skip straight to candidate positions.
+_JOURNEY_TOKENS = re.compile(
+    r"[QqOoVvE](?:(?i:(?<=q)(?=(ueue))|(?<=o)(?=(ut of office))|(?<=v)(?=(oice agent)))"
+    r"|(?<=E)(?=nded by ([^:|]+)))"
+)
+JOURNEY_COLUMNS = ["queue_visited", "ooo_ivr_hit", "voice_agent_hit", "terminator_type", "terminator"]
+
+
+def extract_journey_events(details: pd.Series) -> pd.DataFrame:
+    """
+    Parse call_activity_details into journey event columns (row-aligned):
+
+    queue_visited / ooo_ivr_hit / voice_agent_hit
+        The text mentions 'Queue', 'Out of office' or 'Voice Agent' (any case).
+    terminator
+        Who the first 'Ended by ...' segment names (None if there isn't one).
+    terminator_type
+        'System' if any segment is 'Ended by Voice Agent', else 'Customer'
+        for a terminator with digits longer than 5 characters (a number),
+        'Agent' for any other terminator, 'Unknown' without one.
+    """
+    n = len(details)
+    found = [_JOURNEY_TOKENS.findall(text) for text in details.fillna("").astype(str)]
+    row = np.repeat(np.arange(n), [len(tokens) for tokens in found])
+    # One row per token; a group that didn't take part is ''
+    tokens = np.array(list(chain.from_iterable(found)), dtype=object).reshape(-1, 4)
+
+    events = pd.DataFrame(index=details.index)
+    for i, col in enumerate(["queue_visited", "ooo_ivr_hit", "voice_agent_hit"]):
+        hit = np.zeros(n, dtype=bool)
+        hit[row[tokens[:, i] != ""]] = True
+        events[col] = hit
+
+    is_ended = tokens[:, 3] != ""
+    ended_row, ended_by = row[is_ended], pd.Series(tokens[is_ended, 3], dtype=object)
+    system = np.zeros(n, dtype=bool)
+    system[ended_row[ended_by.str.startswith("Voice Agent").to_numpy(dtype=bool)]] = True
+    first_row, first = np.unique(ended_row, return_index=True)
+    terminator = np.full(n, None, dtype=object)
+    terminator[first_row] = ended_by.iloc[first].str.strip().to_numpy()
+
+    named = pd.Series(terminator, dtype=object)
+    is_number = (named.str.contains(r"\d", na=False) & (named.str.len() > 5)).to_numpy()
+    events["terminator_type"] = np.select(
+        [system, is_number, named.notna().to_numpy()], ["System", "Customer", "Agent"], "Unknown"
+    ).astype(object)
+    events["terminator"] = terminator
+    return events
+
+
 @dataclass
 class CleanedData:
     raw_call_df: pd.DataFrame
@@ -53,20 +141,21 @@ class CleanedData:
 
 def clean_call_log(call_log_path: str) -> pd.DataFrame:
     """Load and clean the raw call log."""
-    df = pd.read_csv(call_log_path)
+    return _clean_legs(read_export(call_log_path, CALL_LOG))
 
+
+def _clean_legs(df: pd.DataFrame) -> pd.DataFrame:
+    """Row-wise cleaning of raw legs (so it gives the same rows chunk by chunk)."""
     # Drop the 'Totals' row (or any non-date value in Call Time)
-    df["Call Time dt"] = pd.to_datetime(df["Call Time"], errors="coerce")
+    df["Call Time dt"] = parse_call_time(df["Call Time"])
     df = df[~df["Call Time dt"].isna()].copy()
 
     # Convert durations to seconds
-    df["Ringing_sec"] = df["Ringing"].apply(parse_hms_to_seconds)
-    df["Talking_sec"] = df["Talking"].apply(parse_hms_to_seconds)
+    df["Ringing_sec"] = hms_to_seconds_column(df["Ringing"])
+    df["Talking_sec"] = hms_to_seconds_column(df["Talking"])
 
     # Classify legs as trade / retail / None
-    df["customer_type_leg"] = df["Call Activity Details"].apply(
-        classify_customer_from_activity
-    )
+    df["customer_type_leg"] = classify_customer_column(df["Call Activity Details"])
 
     # Restrict to inbound directions
     inbound_mask = df["Direction"].isin(["Inbound", "Inbound Queue"])
@@ -75,34 +164,153 @@ def clean_call_log(call_log_path: str) -> pd.DataFrame:
     return df
 
 
+def _group_bounds(group_ids: np.ndarray) -> np.ndarray:
+    """Start offset of each run in an array of sorted group ids."""
+    if len(group_ids) == 0:
+        return np.zeros(0, dtype=np.intp)
+    return np.flatnonzero(np.r_[True, group_ids[1:] != group_ids[:-1]])
+
+
+def _flag_sets(group_ids: np.ndarray, values: pd.Series, n_groups: int) -> pd.Series:
+    """
+    Per-group ",".join(sorted(set(values))) via bitmask flags.
+    Each category is one bit; masks are OR-reduced per group and the
+    joined string is only built once per distinct mask.
+    """
+    codes, categories = pd.factorize(values, sort=True)
+    if len(categories) > 62:
+        # Too many distinct values for an int64 mask
+        joined = values.groupby(group_ids).agg(lambda x: ",".join(sorted(set(x))))
+        return joined.reindex(range(n_groups)).reset_index(drop=True)
+
+    present = codes >= 0
+    bits = np.left_shift(np.int64(1), codes[present].astype(np.int64))
+    masks = np.zeros(n_groups, dtype=np.int64)
+    np.bitwise_or.at(masks, group_ids[present], bits)
+
+    labels = {
+        m: ",".join(c for i, c in enumerate(categories) if m >> i & 1)
+        for m in np.unique(masks)
+    }
+    return pd.Series(masks).map(labels)
+
+
+def _join_unique_sorted(group_ids: np.ndarray, values: pd.Series, n_groups: int, sep: str) -> np.ndarray:
+    """Per-group sep.join(sorted(set(values.dropna().astype(str))))."""
+    present = values.notna().to_numpy()
+    ids = group_ids[present]
+    codes, uniques = pd.factorize(values[present].astype(str), sort=True)
+
+    # Sort by (group, value) and keep each pair once
+    order = np.lexsort((codes, ids))
+    ids, codes = ids[order], codes[order]
+    keep = np.r_[True, (ids[1:] != ids[:-1]) | (codes[1:] != codes[:-1])] if len(ids) else np.zeros(0, dtype=bool)
+    ids, codes = ids[keep], codes[keep]
+
+    starts = _group_bounds(ids)
+    pieces = np.asarray(uniques, dtype=object)[codes]
+    if len(pieces):
+        not_first = np.ones(len(pieces), dtype=bool)
+        not_first[starts] = False
+        pieces[not_first] = sep + pieces[not_first]
+
+    joined = np.full(n_groups, "", dtype=object)
+    if len(starts):
+        joined[ids[starts]] = np.add.reduceat(pieces, starts)
+    return joined
+
+
 def aggregate_to_call_level(df: pd.DataFrame) -> pd.DataFrame:
     """Aggregate leg-level rows to one row per Call ID."""
-    def resolve_customer_type(series: pd.Series) -> str:
-        """Resolve customer type from multiple legs, defaulting to retail if unclear."""
-        vals = set(v for v in series if isinstance(v, str))
-        if "trade" in vals:
-            return "trade"
-        if "retail" in vals:
-            return "retail"
-        # Default to retail for any unknown cases (better than leaving unclassified)
-        return "retail"
+    return _add_weeks(_aggregate_calls(df))
+
+
+def _aggregate_calls(df: pd.DataFrame) -> pd.DataFrame:
+    """Per-call aggregation; everything except the dataset-relative week."""
+    legs = df[df["Call ID"].notna()]
+    group_ids, _ = pd.factorize(legs["Call ID"], sort=True)
 
     grouped = (
-        df
+        legs
         .groupby("Call ID")
         .agg(
             call_start=("Call Time dt", "min"),
             from_number=("From", "first"),
             to_number=("To", "first"),
-            directions=("Direction", lambda x: ",".join(sorted(set(x)))),
-            statuses=("Status", lambda x: ",".join(sorted(set(x)))),
             ringing_total_sec=("Ringing_sec", "sum"),
             talking_total_sec=("Talking_sec", "sum"),
-            customer_type=("customer_type_leg", resolve_customer_type),
-            call_activity_details=("Call Activity Details", lambda x: " | ".join(sorted(set(x.dropna().astype(str))))),
         )
         .reset_index()
     )
+    n_groups = len(grouped)
+
+    grouped["directions"] = _flag_sets(group_ids, legs["Direction"], n_groups)
+    grouped["statuses"] = _flag_sets(group_ids, legs["Status"], n_groups)
+
+    # Customer type: any trade leg wins, otherwise retail
+    # (unknown legs default to retail - better than leaving unclassified)
+    is_trade = (legs["customer_type_leg"] == "trade").to_numpy()
+    has_trade = np.zeros(n_groups, dtype=bool)
+    has_trade[group_ids[is_trade]] = True
+    grouped["customer_type"] = np.where(has_trade, "trade", "retail").astype(object)
+
+    grouped["call_activity_details"] = _join_unique_sorted(
+        group_ids, legs["Call Activity Details"], n_groups, " | "
+    )
+    return _finish_calls(grouped)
+
+
+def _split_pieces(group_ids: np.ndarray, joined: pd.Series, sep: str) -> Tuple[np.ndarray, pd.Series]:
+    """Group id and value of every non-empty piece of sep-joined strings."""
+    pieces = pd.Series(joined.to_numpy(dtype=object), index=group_ids).str.split(sep, regex=False).explode()
+    pieces = pieces[pieces.notna() & (pieces != "")]
+    return pieces.index.to_numpy(), pieces.reset_index(drop=True)
+
+
+def merge_calls(calls: pd.DataFrame) -> pd.DataFrame:
+    """
+    Combine call-level rows that share a Call ID (in file order) into the
+    row aggregating all their legs would give. Streaming emits a call
+    more than once when its legs are further apart than the carry window.
+    """
+    group_ids, _ = pd.factorize(calls["Call ID"], sort=True)
+    grouped = (
+        calls
+        .groupby("Call ID")
+        .agg(
+            call_start=("call_start", "min"),
+            from_number=("from_number", "first"),
+            to_number=("to_number", "first"),
+            ringing_total_sec=("ringing_total_sec", "sum"),
+            talking_total_sec=("talking_total_sec", "sum"),
+        )
+        .reset_index()
+    )
+    n_groups = len(grouped)
+
+    for col in ("directions", "statuses"):
+        grouped[col] = _flag_sets(*_split_pieces(group_ids, calls[col], ","), n_groups)
+
+    has_trade = np.zeros(n_groups, dtype=bool)
+    has_trade[group_ids[(calls["customer_type"] == "trade").to_numpy()]] = True
+    grouped["customer_type"] = np.where(has_trade, "trade", "retail").astype(object)
+
+    grouped["call_activity_details"] = _join_unique_sorted(
+        *_split_pieces(group_ids, calls["call_activity_details"], " | "), n_groups, " | "
+    )
+    return _finish_calls(grouped)
+
+
+def _finish_calls(grouped: pd.DataFrame) -> pd.DataFrame:
+    """Column order and the columns derived from the aggregates."""
+    grouped = grouped[[
+        "Call ID", "call_start", "from_number", "to_number", "directions",
+        "statuses", "ringing_total_sec", "talking_total_sec", "customer_type",
+        "call_activity_details",
+    ]].copy()
+
+    # Journey events, parsed once here so reports only reduce columns
+    grouped[JOURNEY_COLUMNS] = extract_journey_events(grouped["call_activity_details"])
 
     grouped["is_answered"] = grouped["talking_total_sec"] > 0
     grouped["is_abandoned"] = (grouped["talking_total_sec"] == 0) & (
@@ -112,36 +320,19 @@ def aggregate_to_call_level(df: pd.DataFrame) -> pd.DataFrame:
     # Date / week helpers
     grouped["date"] = grouped["call_start"].dt.date
     grouped["day_name"] = grouped["call_start"].dt.day_name()
+    return grouped
 
+
+def _add_weeks(grouped: pd.DataFrame) -> pd.DataFrame:
     # Week assignment based on max date in dataset
     # Week 1 = max_date going back 7 days
     # Week 2 = 7 days before Week 1
     # Week 3+ = everything older
     max_date = grouped["call_start"].max()
-    
-    # Week 1: From (max_date - 7 days) up to and including max_date
-    week1_start = max_date - pd.Timedelta(days=7)
-    week1_end = max_date
-    
-    # Week 2: 7 days before Week 1
-    week2_start = week1_start - pd.Timedelta(days=7)
-    week2_end = week1_start
-    
-    # Assign week labels
-    def assign_week(dt):
-        if dt > week1_start and dt <= week1_end:
-            return 1
-        elif dt > week2_start and dt <= week2_end:
-            return 2
-        else:
-            return 3
-    
-    grouped["week"] = grouped["call_start"].apply(assign_week)
+    grouped["week"] = assign_weeks(grouped["call_start"], max_date)
     
     # Keep week_start for compatibility
-    grouped["week_start"] = grouped["call_start"].dt.normalize() - pd.to_timedelta(
-        grouped["call_start"].dt.dayofweek, unit="D"
-    )
+    grouped["week_start"] = week_start_of(grouped["call_start"])
 
     return grouped
 
@@ -153,3 +344,104 @@ def run_cleaning(call_log_path: str,) -> CleanedData:
         raw_call_df=raw_call_df,
         call_level_df=call_level_df,
     )
+
+
+def stream_call_level(
+    call_log_path: str,
+    chunksize: int = CHUNK_ROWS,
+    carry_rows: int = CARRY_ROWS,
+) -> Iterator[pd.DataFrame]:
+    """
+    Read a CallLog export in chunks and yield call-level rows (without
+    'week') as calls complete. Legs of one call sit next to each other
+    in 3CX exports, so any Call ID seen in the last carry_rows rows of a
+    chunk is carried into the next chunk instead of being aggregated.
+    Memory is bounded by the chunk size, not the file size. A call whose
+    legs are further apart is yielded once per part it falls in; the
+    consumer combines them with merge_calls (see run_cleaning_chunked,
+    call_store.append_call_log).
+    """
+    carry = None
+    for chunk in read_export(call_log_path, CALL_LOG, chunksize=chunksize):
+        open_ids = chunk["Call ID"].iloc[-carry_rows:].dropna().unique()
+        legs = _clean_legs(chunk)
+        if carry is not None and len(carry):
+            legs = pd.concat([carry, legs])
+
+        held = legs["Call ID"].isin(open_ids).to_numpy()
+        carry = legs[held]
+        if not held.all():
+            yield _aggregate_calls(legs[~held])
+
+    if carry is not None and len(carry):
+        yield _aggregate_calls(carry)
+
+
+def run_cleaning_chunked(call_log_path: str, chunksize: int = CHUNK_ROWS) -> pd.DataFrame:
+    """
+    Streaming equivalent of run_cleaning(...).call_level_df, returned as
+    one frame (call_store.append_call_log streams into the store
+    instead). Calls whose legs are further apart than the carry window
+    (a Call ID emitted twice) are merged from their parts.
+    """
+    parts = list(stream_call_level(call_log_path, chunksize=chunksize))
+    if not parts:
+        return run_cleaning(call_log_path).call_level_df
+
+    calls = pd.concat(parts)
+    del parts
+    split = calls["Call ID"].duplicated(keep=False).to_numpy()
+    if split.any():
+        merged = merge_calls(calls[split])
+        print(f"Legs of {len(merged)} calls in {call_log_path} are not adjacent; merged their parts")
+        calls = pd.concat([calls[~split], merged])
+    calls = calls.sort_values("Call ID", kind="stable").reset_index(drop=True)
+    return _add_weeks(calls)
+
+
+@dataclass
+class FileCleanResult:
+    path: str
+    call_level_df: pd.DataFrame | None
+    seconds: float
+    error: str | None = None
+
+
+def _clean_file(call_log_path: str, chunksize: int | None = None) -> FileCleanResult:
+    """Worker for clean_files: only the call-level frame is sent back."""
+    start = time.perf_counter()
+    try:
+        if chunksize:
+            call_level_df = run_cleaning_chunked(call_log_path, chunksize)
+        else:
+            call_level_df = run_cleaning(call_log_path).call_level_df
+        return FileCleanResult(call_log_path, call_level_df, time.perf_counter() - start)
+    except Exception as e:
+        return FileCleanResult(call_log_path, None, time.perf_counter() - start, str(e))
+
+
+def clean_files(
+    call_log_paths: list[str],
+    jobs: int = 1,
+    chunksize: int | None = None,
+) -> list[FileCleanResult]:
+    """
+    Clean several CallLog exports, optionally across a process pool.
+    Results come back in the same order as call_log_paths, so a later
+    drop_duplicates(subset=['Call ID']) keeps the same rows for any jobs.
+    chunksize streams each file (see run_cleaning_chunked).
+    """
+    worker = partial(_clean_file, chunksize=chunksize)
+    workers = min(jobs, len(call_log_paths), os.cpu_count() or 1)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(worker, call_log_paths))
+    else:
+        results = [worker(p) for p in call_log_paths]
+
+    for r in results:
+        if r.error:
+            print(f"Error processing {r.path}: {r.error}")
+        else:
+            print(f"Cleaned {r.path} in {r.seconds:.2f}s ({len(r.call_level_df)} calls)")
+    return results
@@ -6,7 +6,7 @@ from datetime import datetime
 def cleanup_data_folder():
     """
     Move processed files from 'data/' to 'archive/'.
-    Keeps persistent files like 'combined_call_logs.csv' and reference CSVs.
+    Keeps persistent files like the call store (data/store/) and reference CSVs.
     """
     data_dir = 'data'
     archive_dir = 'archive'
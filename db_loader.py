@@ -0,0 +1,144 @@
+"""
+Database Loader
+Bulk upserts of report frames into keyed tables, without dropping them:
+
+    stats = bulk_upsert(conn, calls, 'call_logs', ['Call ID'])
+    conn.commit()
+
+The frame is loaded into a temporary staging table and then merged with
+INSERT ... ON CONFLICT (key) DO UPDATE, so rows already in the table are
+updated in place and everything else is kept. On PostgreSQL (psycopg2)
+the staging table is filled with COPY FROM STDIN from CSV buffers of
+COPY_CHUNK_ROWS rows at a time; on SQLite, which stands in for Postgres
+in the sanity checks, it is filled with executemany from the columns.
+
+The target table is created on first use from the frame's dtypes, with a
+unique index on the key. Columns that the table doesn't have yet are
+added. The caller owns the transaction: bulk_upsert doesn't commit.
+"""
+import io
+import sqlite3
+import time
+
+import pandas as pd
+
+COPY_CHUNK_ROWS = 100_000
+
+
+def quote(name):
+    """SQL identifier quoting (column names like "Call ID" have spaces)."""
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def sql_type(dtype):
+    if pd.api.types.is_bool_dtype(dtype):
+        return 'BOOLEAN'
+    if pd.api.types.is_integer_dtype(dtype):
+        return 'INTEGER'
+    if pd.api.types.is_float_dtype(dtype):
+        return 'NUMERIC'
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return 'TIMESTAMP'
+    return 'TEXT'
+
+
+def is_sqlite(conn):
+    return isinstance(conn, sqlite3.Connection)
+
+
+def ensure_table(cursor, df, table, key):
+    """Create table with a unique index on key if needed, and add any new columns of df."""
+    columns = ', '.join(f'{quote(c)} {sql_type(df[c].dtype)}' for c in df.columns)
+    cursor.execute(f'CREATE TABLE IF NOT EXISTS {quote(table)} ({columns})')
+    cursor.execute(f'SELECT * FROM {quote(table)} LIMIT 0')
+    existing = {d[0] for d in cursor.description}
+    for c in df.columns:
+        if c not in existing:
+            cursor.execute(f'ALTER TABLE {quote(table)} ADD COLUMN {quote(c)} {sql_type(df[c].dtype)}')
+    cursor.execute(
+        f'CREATE UNIQUE INDEX IF NOT EXISTS {quote(table + "_key")} '
+        f'ON {quote(table)} ({", ".join(map(quote, key))})'
+    )
+
+
+def _copy_rows(cursor, df, stage):
+    """PostgreSQL: stream df into stage with COPY, one CSV buffer per chunk."""
+    sql = (
+        f'COPY {quote(stage)} ({", ".join(map(quote, df.columns))}) '
+        "FROM STDIN WITH (FORMAT csv, NULL '\\N')"
+    )
+    for start in range(0, len(df), COPY_CHUNK_ROWS):
+        buffer = io.StringIO()
+        df.iloc[start:start + COPY_CHUNK_ROWS].to_csv(buffer, index=False, header=False, na_rep='\\N')
+        buffer.seek(0)
+        cursor.copy_expert(sql, buffer)
+
+
+def _sqlite_columns(df):
+    """Columns as lists of values sqlite3 can bind (None for missing)."""
+    columns = []
+    for c in df.columns:
+        s = df[c]
+        if pd.api.types.is_datetime64_any_dtype(s.dtype):
+            values = s.dt.strftime('%Y-%m-%d %H:%M:%S')
+        elif pd.api.types.is_bool_dtype(s.dtype):
+            values = s.astype(int)
+        elif pd.api.types.is_numeric_dtype(s.dtype):
+            values = s.astype(object)
+        else:
+            values = s.astype(str)
+        columns.append(values.astype(object).where(s.notna(), None).tolist())
+    return columns
+
+
+def _insert_rows(cursor, df, stage):
+    """SQLite: fill stage with executemany."""
+    sql = (
+        f'INSERT INTO {quote(stage)} ({", ".join(map(quote, df.columns))}) '
+        f'VALUES ({", ".join("?" * len(df.columns))})'
+    )
+    cursor.executemany(sql, zip(*_sqlite_columns(df)))
+
+
+def bulk_upsert(conn, df, table, key):
+    """
+    Merge df into table on the key columns: new keys are inserted and
+    existing ones updated. Duplicate keys in df keep their last row.
+    Returns {'rows', 'inserted', 'updated', 'seconds'}.
+    """
+    start = time.perf_counter()
+    df = df.drop_duplicates(subset=key, keep='last')
+    cursor = conn.cursor()
+    ensure_table(cursor, df, table, key)
+
+    columns = ', '.join(map(quote, df.columns))
+    stage = f'_stage_{table}'
+    cursor.execute(f'DROP TABLE IF EXISTS {quote(stage)}')
+    cursor.execute(f'CREATE TEMP TABLE {quote(stage)} AS SELECT {columns} FROM {quote(table)} WHERE 1 = 0')
+    if is_sqlite(conn):
+        _insert_rows(cursor, df, stage)
+    else:
+        _copy_rows(cursor, df, stage)
+
+    match = ' AND '.join(f's.{quote(k)} = t.{quote(k)}' for k in key)
+    cursor.execute(f'SELECT COUNT(*) FROM {quote(stage)} s JOIN {quote(table)} t ON {match}')
+    updated = cursor.fetchone()[0]
+
+    others = [c for c in df.columns if c not in key]
+    action = (
+        'DO UPDATE SET ' + ', '.join(f'{quote(c)} = excluded.{quote(c)}' for c in others)
+        if others else 'DO NOTHING'
+    )
+    # 'WHERE true' keeps SQLite from reading ON CONFLICT as a join constraint
+    cursor.execute(
+        f'INSERT INTO {quote(table)} ({columns}) SELECT {columns} FROM {quote(stage)} WHERE true '
+        f'ON CONFLICT ({", ".join(map(quote, key))}) {action}'
+    )
+    cursor.execute(f'DROP TABLE {quote(stage)}')
+    cursor.close()
+    return {
+        'rows': len(df),
+        'inserted': len(df) - updated,
+        'updated': updated,
+        'seconds': time.perf_counter() - start,
+    }
@@ -0,0 +1,107 @@
+"""
+Database Sessions
+Pooled connections to the reporting database, and a unit of work that
+runs all of a report's writes on one connection in one transaction:
+
+    run = UnitOfWork()
+    run.add('call_logs', sync_calls)          # each write is called as write(conn)
+    run.add('report_snapshots', store_snapshot)
+    run.commit()                              # all written, or none
+
+Connections come from a psycopg2 pool configured from DB_CONFIG (the
+DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD and DB_SSLMODE env
+vars), so a run makes one TLS handshake to the remote host instead of
+one per write. Writes are queued and only run at commit, so a report
+that fails validation writes nothing and the connection is held only
+while writing.
+"""
+import atexit
+import os
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from psycopg2 import pool
+
+# Database Configuration
+DB_CONFIG = {
+    'host': os.getenv('DB_HOST', 'kmc.tequila-ai.com'),
+    'port': os.getenv('DB_PORT', '5432'),
+    'database': os.getenv('DB_NAME', 'tequila_ai_reporting'),
+    'user': os.getenv('DB_USER', 'james'),
+    'password': os.getenv('DB_PASSWORD', ']dT1H-{ekquGfn^6'),
+    'sslmode': os.getenv('DB_SSLMODE', 'require')
+}
+POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '4'))
+
+_pool = None
+
+
+def get_pool():
+    """The shared connection pool, created on first use."""
+    global _pool
+    if _pool is None or _pool.closed:
+        _pool = pool.ThreadedConnectionPool(1, POOL_SIZE, **DB_CONFIG)
+    return _pool
+
+
+def close_pool():
+    global _pool
+    if _pool is not None and not _pool.closed:
+        _pool.closeall()
+    _pool = None
+
+
+atexit.register(close_pool)
+
+
+@contextmanager
+def connection():
+    """
+    A connection from the pool, rolled back if the block raises and
+    returned to the pool afterwards (dropped if the server closed it).
+    """
+    shared = get_pool()
+    conn = shared.getconn()
+    try:
+        yield conn
+    except Exception:
+        if not conn.closed:
+            conn.rollback()
+        raise
+    finally:
+        shared.putconn(conn, close=bool(conn.closed))
+
+
+@dataclass
+class UnitOfWork:
+    # Context manager factory for the connection (sqlite3 in the sanity checks)
+    connect: object = connection
+    writes: list = field(default_factory=list)
+
+    def add(self, name, write):
+        """Queue write(conn) to run at commit."""
+        self.writes.append((name, write))
+
+    def commit(self):
+        """
+        Run the queued writes in order on one connection and commit them
+        together. Returns True if they were written; on any error all of
+        them are rolled back and False is returned.
+        """
+        writes, self.writes = self.writes, []
+        if not writes:
+            return True
+        names = ', '.join(name for name, _ in writes)
+        start = time.perf_counter()
+        try:
+            with self.connect() as conn:
+                for _, write in writes:
+                    write(conn)
+                conn.commit()
+        except Exception as e:
+            print(f"Error writing to database ({names}), nothing was saved: {e}")
+            return False
+        print(f"Committed {len(writes)} database writes ({names}) in one transaction "
+              f"in {time.perf_counter() - start:.1f}s.")
+        return True
@@ -0,0 +1,123 @@
+"""
+Database Sync
+Incremental sync of the report's call-level and abandoned rows to the
+reporting database, so a weekly run only writes about a week of rows:
+
+    stats = sync_table(conn, calls, CALL_LOGS)
+    conn.commit()
+
+Each table has a high-watermark row in sync_watermarks: the latest call
+time shipped so far. Rows more than LOOKBACK before the watermark are
+skipped without reading anything back. Rows inside the window are
+fingerprinted (a 128-bit hash of every column, stored in row_hash) and
+compared with the fingerprints already in the table for that window, so
+unchanged rows are skipped and only new rows and late corrections are
+shipped, through db_loader.bulk_upsert. The watermark moves forward in
+the same transaction as the rows.
+
+'week' is left out of the database rows: it is relative to the report
+run (1 = This Week), so it would change every row every week.
+
+full=True compares every row instead of the window: for the first sync
+of an existing table, or after backfilling exports older than the
+lookback.
+"""
+import time
+from dataclasses import dataclass
+
+import pandas as pd
+
+import call_index
+import call_store
+from db_loader import bulk_upsert, ensure_table, quote
+
+WATERMARKS = 'sync_watermarks'
+LOOKBACK = pd.Timedelta(days=7)
+# Report-relative columns that aren't stored
+REPORT_COLUMNS = ['week']
+
+
+@dataclass(frozen=True)
+class SyncTable:
+    name: str
+    time_col: str
+    key: tuple
+
+
+CALL_LOGS = SyncTable('call_logs', call_store.CALLS.time_col, call_store.CALLS.key)
+ABANDONED_CALLS = SyncTable('abandoned_calls', call_store.ABANDONED.time_col, call_store.ABANDONED.key)
+
+
+def _literal(value):
+    """SQL string literal (the same in PostgreSQL and SQLite)."""
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def row_hashes(df):
+    """Hex fingerprint of each row's values (two 64-bit hashes, see call_index.row_keys)."""
+    pairs = call_index.row_keys(df, df.columns).view('>u8').reshape(-1, 2)
+    return [f'{hi:016x}{lo:016x}' for hi, lo in pairs.tolist()]
+
+
+def get_watermark(cursor, table):
+    """Latest call time shipped to table, or None if it was never synced."""
+    empty = pd.DataFrame({
+        'table_name': pd.Series(dtype=object),
+        'watermark': pd.Series(dtype='datetime64[ns]'),
+        'synced_at': pd.Series(dtype='datetime64[ns]'),
+    })
+    ensure_table(cursor, empty, WATERMARKS, ['table_name'])
+    cursor.execute(f'SELECT watermark FROM {quote(WATERMARKS)} WHERE table_name = {_literal(table.name)}')
+    row = cursor.fetchone()
+    return pd.Timestamp(row[0]) if row and row[0] is not None else None
+
+
+def sync_table(conn, df, table, lookback=LOOKBACK, full=False):
+    """
+    Ship the new and changed rows of df to table and move its watermark.
+    Returns {'rows', 'shipped', 'inserted', 'updated', 'skipped',
+    'watermark', 'seconds'}. The caller commits.
+    """
+    start = time.perf_counter()
+    rows = df.drop(columns=[c for c in REPORT_COLUMNS if c in df.columns])
+    cursor = conn.cursor()
+    watermark = get_watermark(cursor, table)
+
+    if full or watermark is None:
+        cutoff = None
+        window = rows
+    else:
+        cutoff = watermark - lookback
+        window = rows[rows[table.time_col] >= cutoff]
+    window = window.assign(row_hash=row_hashes(window))
+
+    # Fingerprints already in the table for the same window
+    ensure_table(cursor, window, table.name, list(table.key))
+    where = f' WHERE {quote(table.time_col)} >= {_literal(cutoff)}' if cutoff is not None else ''
+    cursor.execute(f'SELECT row_hash FROM {quote(table.name)}{where}')
+    stored = {r[0] for r in cursor.fetchall()}
+    cursor.close()
+
+    ship = window[~window['row_hash'].isin(stored)]
+    loaded = bulk_upsert(conn, ship, table.name, list(table.key)) if len(ship) else {'inserted': 0, 'updated': 0}
+
+    latest = rows[table.time_col].max() if len(rows) else None
+    if pd.notna(latest) and (watermark is None or latest > watermark):
+        watermark = latest
+    if watermark is not None:
+        state = pd.DataFrame({
+            'table_name': [table.name],
+            'watermark': [watermark],
+            'synced_at': [pd.Timestamp.now().floor('s')],
+        })
+        bulk_upsert(conn, state, WATERMARKS, ['table_name'])
+
+    return {
+        'rows': len(rows),
+        'shipped': len(ship),
+        'inserted': loaded['inserted'],
+        'updated': loaded['updated'],
+        'skipped': len(rows) - len(ship),
+        'watermark': watermark,
+        'seconds': time.perf_counter() - start,
+    }
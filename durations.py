@@ -0,0 +1,111 @@
+# durations.py
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+# Width used when viewing the column as fixed-size bytes: 'HH:MM:SS' is 8,
+# the two spare bytes tell us the string wasn't longer than that.
+_FIXED_WIDTH = 10
+_DIGIT_POS = [0, 1, 3, 4, 6, 7]
+
+
+def _parse_strict(s) -> int | None:
+    """'HH:MM:SS' -> seconds, or None if it isn't three integer parts."""
+    try:
+        parts = str(s).split(":")
+        if len(parts) != 3:
+            return None
+        h, m, sec = map(int, parts)
+        return h * 3600 + m * 60 + sec
+    except Exception:
+        return None
+
+
+def parse_hms_to_seconds(s: str) -> int:
+    """Convert 'HH:MM:SS' to seconds. Non-parsable values -> 0."""
+    seconds = _parse_strict(s)
+    return 0 if seconds is None else seconds
+
+
+def _parse_flexible(value, allow_mmss: bool, numeric_as_seconds: bool):
+    """Scalar fallback mirroring call_analytics_utils.hms_to_seconds."""
+    try:
+        if pd.isna(value):
+            return None
+        if numeric_as_seconds and isinstance(value, (int, float, np.number)):
+            return value
+        parts = str(value).split(":")
+        if len(parts) == 3:
+            return int(parts[0]) * 3600 + int(parts[1]) * 60 + int(parts[2])
+        if len(parts) == 2 and allow_mmss:
+            return int(parts[0]) * 60 + int(parts[1])
+        if numeric_as_seconds:
+            return float(value)
+        return None
+    except Exception:
+        return None
+
+
+def _fixed_hms(values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Parse strictly 'HH:MM:SS' values in one numpy pass over their bytes.
+    Returns (seconds, ok); rows where ok is False need the scalar fallback.
+    """
+    n = len(values)
+    try:
+        raw = values.astype(f"S{_FIXED_WIDTH}")
+    except (UnicodeEncodeError, ValueError, TypeError):
+        return np.zeros(n, dtype=np.int32), np.zeros(n, dtype=bool)
+
+    b = raw.view(np.uint8).reshape(n, _FIXED_WIDTH)
+    digits = b[:, _DIGIT_POS] - ord("0")  # uint8 wraps, so non-digits become > 9
+    ok = (
+        (digits <= 9).all(axis=1)
+        & (b[:, 2] == ord(":"))
+        & (b[:, 5] == ord(":"))
+        & (b[:, 8] == 0)
+    )
+    d = digits.astype(np.int32)
+    seconds = (
+        (d[:, 0] * 10 + d[:, 1]) * 3600
+        + (d[:, 2] * 10 + d[:, 3]) * 60
+        + d[:, 4] * 10 + d[:, 5]
+    )
+    return np.where(ok, seconds, 0).astype(np.int32), ok
+
+
+def hms_to_seconds_column(
+    values,
+    default: int | None = 0,
+    allow_mmss: bool = False,
+    numeric_as_seconds: bool = False,
+) -> pd.Series:
+    """
+    Vectorized duration parser for a whole column.
+
+    'HH:MM:SS' strings (the 3CX export format) are parsed in a single
+    numpy pass; anything else goes through the scalar rules:
+    - default=0 (cleaning): exactly three integer parts, otherwise 0.
+    - default=None (call_analytics_utils): also 'MM:SS' and numeric
+      seconds when enabled, otherwise NaN.
+    Returns int32 seconds when default is an int, float64 when it is None.
+    """
+    index = values.index if isinstance(values, pd.Series) else None
+    if numeric_as_seconds and default is None and pd.api.types.is_numeric_dtype(values):
+        return pd.Series(values, index=index, dtype=np.float64)
+    arr = np.asarray(values, dtype=object)
+    seconds, ok = _fixed_hms(arr)
+
+    if default is not None:
+        out = seconds
+        for i in np.flatnonzero(~ok):
+            parsed = _parse_strict(arr[i])
+            out[i] = default if parsed is None else parsed
+        return pd.Series(out, index=index, dtype=np.int32)
+
+    out = seconds.astype(np.float64)
+    for i in np.flatnonzero(~ok):
+        parsed = _parse_flexible(arr[i], allow_mmss, numeric_as_seconds)
+        out[i] = np.nan if parsed is None else parsed
+    return pd.Series(out, index=index, dtype=np.float64)
@@ -1,7 +1,9 @@
 import os
 from jinja2 import Environment, FileSystemLoader
+from functools import partial
 from call_log_analyzer import analyze_calls
-from store_snapshot import create_snapshot_table, store_snapshot
+from db_session import UnitOfWork
+from store_snapshot import SNAPSHOT_TABLE, store_snapshot
 
 def validate_metrics_quick(metrics, df, abandoned_df):
     """Quick validation of key metrics."""
@@ -30,13 +32,21 @@ def validate_metrics_quick(metrics, df, abandoned_df):
     
     return errors
 
-def generate_report():
+def generate_report(dataset=None):
+    """
+    Build, validate and save this week's report. Pass an already loaded
+    CallDataset (see call_dataset.py) to reuse it instead of loading the
+    exports again.
+    """
     # 1. Analyze Data
     # Pass the data directory to analyze_calls
     data_dir = os.path.join(os.path.dirname(__file__), 'data')
     
     print("Running analysis...")
-    results = analyze_calls(data_dir)
+    # Every database write of this run (calls, abandoned, weekly metrics,
+    # snapshot) is queued here and committed in one transaction
+    run = UnitOfWork()
+    results = analyze_calls(data_dir, dataset=dataset, run=run)
     
     if not results:
         print("Analysis failed or returned no results.")
@@ -128,6 +138,7 @@ def generate_report():
     }
     
     weekly_data_manager.save_week_data(csv_metrics)
+    run.add(weekly_data_manager.DB_TABLE, partial(weekly_data_manager.store_week, metrics=csv_metrics))
     
     # Compatibility: Also log to old json if needed, or just comment it out.
     # For now, let's keep the old json log as backup if you want, or remove it.
@@ -135,13 +146,11 @@ def generate_report():
     # But I'll leave the old import unused or remove it.
     # Removing old json logging block completely.
 
-    # 4. Store Historical Snapshot (database)
-    print("Storing database snapshot...")
-    try:
-        create_snapshot_table()
-        store_snapshot(results['metrics'])
-    except Exception as e:
-        print(f"Warning: Could not store snapshot: {e}")
+    # 4. Store Historical Snapshot, then write everything to the database
+    print("Writing calls, weekly metrics and snapshot to the database...")
+    run.add(SNAPSHOT_TABLE, partial(store_snapshot, metrics=results['metrics']))
+    if not run.commit():
+        print("Warning: Could not store this run in the database.")
 
     # 5. Setup Jinja2 Environment
     env = Environment(loader=FileSystemLoader('templates'))
@@ -186,7 +195,7 @@ def generate_report():
     <br><br>
     <b>Out of Hours Analysis:</b>
     <br>
-    Operating Hours: Mon-Fri 8am-8pm, Sat 8am-6pm, Sun 10am-4pm
+    Operating Hours: {results['operating_hours']}
     <br>
     - <b>Total OOH Calls:</b> {metrics.get('ooh_total', 0):,} calls received outside operating hours
     <br>
@@ -213,7 +222,8 @@ def generate_report():
         raw_data=results['raw_data'],
         abandoned_logs=results['abandoned_logs'],
         max_date=results.get('max_date', 'N/A'),
-        abandoned_trade_customers=results.get('abandoned_trade_customers', {'week1': [], 'week2': []})
+        abandoned_trade_customers=results.get('abandoned_trade_customers', {'week1': [], 'week2': []}),
+        operating_hours=results['operating_hours']
     )
     
     # Save Report
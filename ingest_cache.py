@@ -0,0 +1,137 @@
+"""
+Ingest Cache
+Content-hash manifest of cleaned call-level frames, so unchanged exports
+are loaded from disk instead of being re-cleaned on every run.
+"""
+import hashlib
+import json
+import os
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from cleaning import CLEANING_VERSION, clean_files
+
+try:
+    import pyarrow  # noqa: F401
+    CACHE_FORMAT = 'parquet'
+except ImportError:
+    # Fall back to pickle if pyarrow isn't installed (still keeps dtypes)
+    CACHE_FORMAT = 'pkl'
+
+MANIFEST_NAME = 'manifest.json'
+
+
+def get_cache_dir(data_dir='data'):
+    return os.path.join(data_dir, '.cache')
+
+
+def file_hash(path, chunk_size=1024 * 1024):
+    """SHA-256 of the raw file contents."""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def load_manifest(cache_dir):
+    path = os.path.join(cache_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Could not read cache manifest, starting fresh: {e}")
+        return {}
+
+
+def save_manifest(cache_dir, manifest):
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, MANIFEST_NAME)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def write_frame(df, path):
+    if CACHE_FORMAT == 'parquet':
+        df.to_parquet(path, index=False)
+    else:
+        df.to_pickle(path)
+
+
+def read_frame(path):
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path)
+    return pd.read_pickle(path)
+
+
+def _add_entry(manifest, cache_dir, digest, path, call_level_df):
+    os.makedirs(cache_dir, exist_ok=True)
+    cache_file = f"{digest}.{CACHE_FORMAT}"
+    write_frame(call_level_df, os.path.join(cache_dir, cache_file))
+    manifest[digest] = {
+        'source': os.path.basename(path),
+        'cleaning_version': CLEANING_VERSION,
+        'cache_file': cache_file,
+        'rows': len(call_level_df),
+        'created': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+    }
+
+
+def _read_entry(manifest, cache_dir, digest, path):
+    """Cached frame for this digest, or None if missing/stale/unreadable."""
+    entry = manifest.get(digest)
+    if not entry or entry.get('cleaning_version') != CLEANING_VERSION:
+        return None
+    cache_path = os.path.join(cache_dir, entry['cache_file'])
+    if not os.path.exists(cache_path):
+        return None
+    try:
+        return read_frame(cache_path)
+    except Exception as e:
+        print(f"Cache entry for {os.path.basename(path)} unreadable, re-cleaning: {e}")
+        return None
+
+
+def load_call_levels(files, data_dir='data', jobs=1, chunksize=None):
+    """
+    Load cleaned call-level frames for a list of CallLog exports.
+
+    The manifest is keyed by each file's content hash; an entry is only
+    reused when it was written by the current CLEANING_VERSION. Misses
+    are cleaned with cleaning.clean_files (jobs > 1 uses a process pool,
+    chunksize streams each file).
+    Frames are returned in sorted file order; files that fail are skipped.
+    """
+    files = sorted(files)
+    cache_dir = get_cache_dir(data_dir)
+    manifest = load_manifest(cache_dir)
+
+    frames = {}
+    digests = {}
+    for f in files:
+        start = time.perf_counter()
+        try:
+            digests[f] = file_hash(f)
+        except Exception as e:
+            print(f"Error processing {f}: {e}")
+            continue
+        cached = _read_entry(manifest, cache_dir, digests[f], f)
+        if cached is not None:
+            frames[f] = cached
+            print(f"Loaded {f} from cache in {time.perf_counter() - start:.2f}s")
+
+    misses = [f for f in files if f in digests and f not in frames]
+    for r in clean_files(misses, jobs=jobs, chunksize=chunksize):
+        if r.call_level_df is not None:
+            frames[r.path] = r.call_level_df
+            _add_entry(manifest, cache_dir, digests[r.path], r.path, r.call_level_df)
+
+    save_manifest(cache_dir, manifest)
+    print(f"Ingest cache: {len(files) - len(misses)} of {len(files)} files loaded from cache")
+    return [frames[f] for f in files if f in frames]
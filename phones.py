@@ -0,0 +1,83 @@
+"""
+Phone Number Normalisation
+One canonical match key for phone numbers across the main log, the
+abandoned log and the trade directory.
+
+Rules (in order):
+- Missing values -> ''
+- Surrounding whitespace and a trailing '.0' (float artefact) are dropped
+- Formatting characters (space, '-', '.', '(', ')') are removed
+- A '+353', '00353' or '353' country prefix is removed
+- One leading '0' is removed, so '087...' and '87...' match
+
+Non-numeric IDs such as 'anonymous' pass through unchanged.
+"""
+import re
+
+import pandas as pd
+
+_FLOAT_SUFFIX = re.compile(r"\.0$")
+_FORMATTING = re.compile(r"[ \-.()]")
+_PREFIX = re.compile(r"^(?:\+353|00353|353)?0?")
+
+# Raw value -> match key, shared by every call in this process.
+# The same few thousand callers recur week after week.
+_KEY_CACHE = {}
+_KEY_CACHE_LIMIT = 500_000
+
+
+def _clean_text(s):
+    s = _FLOAT_SUFFIX.sub("", s.strip())
+    s = _FORMATTING.sub("", s)
+    return _PREFIX.sub("", s)
+
+
+def _make_room(n_new):
+    if len(_KEY_CACHE) + n_new > _KEY_CACHE_LIMIT:
+        _KEY_CACHE.clear()
+
+
+def clean_phone_for_match(phone):
+    """Canonical match key for a single phone number / Caller ID."""
+    if pd.isna(phone):
+        return ''
+    s = str(phone)
+    key = _KEY_CACHE.get(s)
+    if key is None:
+        _make_room(1)
+        key = _KEY_CACHE[s] = _clean_text(s)
+    return key
+
+
+def clean_phone_column(values):
+    """
+    Vectorized clean_phone_for_match for a whole column.
+    Only values not seen before in this process are normalised (with
+    string ops over the new uniques); everything else is a lookup.
+    """
+    values = pd.Series(values, dtype=object)
+    present = values.notna()
+    raw = values[present].astype(str)
+
+    # Keys for this column's uniques, so evicting the shared cache below
+    # can't drop one that is still needed
+    uniques = raw.unique()
+    keys = {v: _KEY_CACHE[v] for v in uniques if v in _KEY_CACHE}
+    missing = [v for v in uniques if v not in keys]
+    if missing:
+        new_keys = (
+            pd.Series(missing, dtype=object)
+            .str.strip()
+            .str.replace(_FLOAT_SUFFIX, "", regex=True)
+            .str.replace(_FORMATTING, "", regex=True)
+            .str.replace(_PREFIX, "", regex=True)
+        )
+        keys.update(zip(missing, new_keys))
+
+    result = pd.Series('', index=values.index, dtype=object)
+    result[present] = raw.map(keys)
+
+    if missing:
+        _make_room(len(missing))
+        _KEY_CACHE.update((v, keys[v]) for v in missing)
+    return result
@@ -0,0 +1,156 @@
+"""
+Plot Payloads
+Serialise report figures compactly before they are embedded in the HTML
+report, which clients often open on mobile:
+
+- numeric trace arrays are rounded to display precision and stored in
+  the smallest dtype that holds them, written as plotly's base64 typed
+  arrays when that is shorter than a plain JSON list
+- customdata keeps only the columns the hover/text templates use;
+  columns with one value across a trace are written into the template
+  once instead of repeated per point, and numbers stored as strings go
+  back to numbers
+- repeated per-point text becomes a single value
+- the layout template only keeps the defaults for trace types and
+  subplot types (geo, polar, ...) the figure has
+
+The figure looks and hovers the same. figure_to_html returns the HTML
+with the JSON sizes before and after, which the verification summary
+reports.
+"""
+import base64
+import json
+import re
+
+import numpy as np
+import plotly.graph_objects as go
+
+DISPLAY_DECIMALS = 2
+
+_CUSTOMDATA_REF = re.compile(r"%\{customdata\[(\d+)\]\}")
+# Layout template sections that only apply to traces drawn on that kind of subplot
+_SUBPLOT_TYPES = {'geo', 'map', 'mapbox', 'polar', 'scene', 'smith', 'ternary'}
+_INT_DTYPES = [np.uint8, np.int8, np.uint16, np.int16, np.uint32, np.int32]
+
+
+def _as_numbers(values):
+    """Float array of values, or None if any isn't a number."""
+    try:
+        numbers = np.asarray(values, dtype=float)
+    except (TypeError, ValueError):
+        return None
+    return numbers if numbers.size else None
+
+
+def _typed_size(array):
+    """Length of plotly's typed-array JSON for array."""
+    shape = f',"shape":"{", ".join(map(str, array.shape))}"' if array.ndim > 1 else ''
+    return len(f'{{"dtype":"{array.dtype.str[1:]}","bdata":""{shape}}}') + len(base64.b64encode(array.tobytes()))
+
+
+def encode_numbers(values, decimals=DISPLAY_DECIMALS):
+    """
+    values rounded to decimals, as whichever is shorter in JSON: a plain
+    list or a numpy array in the smallest dtype that holds them (plotly
+    writes numpy arrays as base64 typed arrays).
+    """
+    rounded = np.round(np.asarray(values, dtype=float), decimals)
+    if np.isfinite(rounded).all() and (rounded == np.round(rounded)).all():
+        typed = rounded.astype(np.int64)
+        for dtype in _INT_DTYPES:
+            info = np.iinfo(dtype)
+            if info.min <= typed.min() and typed.max() <= info.max:
+                typed = typed.astype(dtype)
+                break
+        plain = typed.tolist()
+    else:
+        typed = rounded
+        single = rounded.astype(np.float32)
+        if np.allclose(single, rounded, rtol=0, atol=0.5 * 10 ** -decimals, equal_nan=True):
+            typed = single
+        plain = [None if np.isnan(v) else v for v in rounded.tolist()]
+    return typed if _typed_size(typed) < len(json.dumps(plain, separators=(',', ':'))) else plain
+
+
+def _replace(trace, name, values):
+    # Cleared first: assigning over a numpy array property keeps its old dtype
+    trace[name] = None
+    trace[name] = values
+
+
+def _compact_customdata(trace, decimals):
+    templates = {
+        name: trace[name] for name in ('hovertemplate', 'texttemplate')
+        if name in trace and isinstance(trace[name], str)
+    }
+    data = np.asarray(trace.customdata, dtype=object)
+    if data.ndim == 1:
+        data = data[:, None]
+    used = sorted({int(i) for t in templates.values() for i in _CUSTOMDATA_REF.findall(t)})
+
+    keep = []
+    for i in used:
+        values = data[:, i]
+        numbers = _as_numbers(values)
+        if len(set(map(str, values))) == 1:
+            # Same for every point: write it into the template once
+            templates = {k: t.replace(f"%{{customdata[{i}]}}", str(values[0])) for k, t in templates.items()}
+        else:
+            keep.append((i, values if numbers is None else numbers))
+
+    for new, (old, _) in enumerate(keep):
+        templates = {k: t.replace(f"%{{customdata[{old}]}}", f"%{{customdata[{new}]}}") for k, t in templates.items()}
+    trace.update(templates)
+
+    if not keep:
+        trace.customdata = None
+    elif all(isinstance(values, np.ndarray) and values.dtype == float for _, values in keep):
+        _replace(trace, 'customdata', encode_numbers(np.column_stack([v for _, v in keep]), decimals))
+    else:
+        rows = zip(*(
+            v.tolist() if isinstance(v, np.ndarray) and v.dtype == float else list(v) for _, v in keep
+        ))
+        _replace(trace, 'customdata', [
+            [int(x) if isinstance(x, float) and x.is_integer() else x for x in row] for row in rows
+        ])
+
+
+def compact_figure(fig, decimals=DISPLAY_DECIMALS):
+    """A copy of fig with the compact payload described above."""
+    fig = go.Figure(fig)
+    for trace in fig.data:
+        for axis in ('x', 'y'):
+            values = trace[axis] if axis in trace else None
+            if values is not None and _as_numbers(values) is not None:
+                _replace(trace, axis, encode_numbers(values, decimals))
+        if 'text' in trace and trace.text is not None and not isinstance(trace.text, str):
+            if len(set(trace.text)) == 1:
+                trace.text = trace.text[0]
+        if 'customdata' in trace and trace.customdata is not None:
+            _compact_customdata(trace, decimals)
+
+    trace_types = {trace.type for trace in fig.data}
+    template = fig.layout.template.to_plotly_json()
+    template['data'] = {k: v for k, v in template.get('data', {}).items() if k in trace_types}
+    template['layout'] = {
+        k: v for k, v in template.get('layout', {}).items()
+        if k not in _SUBPLOT_TYPES or any(k in trace for trace in fig.data)
+    }
+    fig.layout.template = template
+    return fig
+
+
+def figure_to_html(fig, decimals=DISPLAY_DECIMALS, **to_html_kwargs):
+    """
+    Compact fig and render it with fig.to_html(**to_html_kwargs).
+    Returns (html, sizes): sizes has the figure JSON bytes before and
+    after compaction and the HTML bytes.
+    """
+    original_bytes = len(fig.to_json().encode('utf-8'))
+    compact = compact_figure(fig, decimals)
+    html = compact.to_html(**to_html_kwargs)
+    return html, {
+        'original_json_bytes': original_bytes,
+        'json_bytes': len(compact.to_json().encode('utf-8')),
+        'html_bytes': len(html.encode('utf-8')),
+    }
@@ -0,0 +1,208 @@
+"""
+3CX Export Readers
+Per-export schemas so each CSV is read with only the columns the
+analysis uses, declared dtypes, and an explicit Call Time format.
+
+The CallLog and InboundCalls exports carry Sentiment / Summary /
+Transcription columns that can be very large; they are never read.
+
+Set CSV_ENGINE=pyarrow to parse with pyarrow's multithreaded reader
+(falls back to the default C engine if pyarrow isn't installed).
+"""
+import csv
+import io
+import os
+import shutil
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# 3CX writes every timestamp as e.g. 2026-02-01T17:24:41
+CALL_TIME_FORMAT = '%Y-%m-%dT%H:%M:%S'
+
+DEFAULT_ENGINE = os.getenv('CSV_ENGINE', 'c')
+
+COPY_BUFFER_BYTES = 4 * 1024 * 1024
+
+
+@dataclass(frozen=True)
+class ExportSchema:
+    name: str
+    pattern: str
+    columns: tuple
+    categories: tuple = ()
+    text: tuple = ()
+
+
+CALL_LOG = ExportSchema(
+    name='CallLog',
+    pattern='CallLogLastWeek_*.csv',
+    columns=(
+        'Call Time', 'Call ID', 'From', 'To', 'Direction', 'Status',
+        'Ringing', 'Talking', 'Call Activity Details',
+    ),
+    categories=('Direction', 'Status'),
+    # Everything else stays text, so a chunk that happens to hold only
+    # numeric From/To values keeps its leading zeros (see chunksize below)
+    text=(
+        'Call Time', 'Call ID', 'From', 'To', 'Ringing', 'Talking',
+        'Call Activity Details',
+    ),
+)
+
+ABANDONED_CALLS = ExportSchema(
+    name='AbandonedCalls',
+    pattern='AbandonedCalls*.csv',
+    columns=(
+        'Queue', 'Call Time', 'Caller ID', 'Agent', 'Waiting Time',
+        'Polling Attempts', 'Agent State',
+    ),
+    categories=('Queue',),
+    text=('Call Time', 'Waiting Time'),
+)
+
+INBOUND_CALLS = ExportSchema(
+    name='InboundCalls',
+    pattern='InboundCallsLastWeek_*.csv',
+    columns=(
+        'Call Time', 'Caller ID', 'Destination', 'Trunk', 'Trunk number',
+        'Did', 'Status', 'Ringing', 'Talking', 'Total Duration', 'Call Type',
+    ),
+    categories=('Status',),
+    text=('Call Time', 'Ringing', 'Talking', 'Total Duration'),
+)
+
+AGENT_PERFORMANCE = ExportSchema(
+    name='AgentPerformance',
+    pattern='AgentPerformance_*.csv',
+    columns=(
+        'Queue', 'Agent', 'Total Logged In Time', 'Calls Answered',
+        '% Calls Serviced', 'Calls Answered Per Hour', 'Ring Time Total',
+        'Ring Time Mean', 'Talk Time Total', 'Talk Time Mean',
+    ),
+    categories=('Queue',),
+    text=(
+        'Total Logged In Time', 'Ring Time Total', 'Ring Time Mean',
+        'Talk Time Total', 'Talk Time Mean',
+    ),
+)
+
+
+def _read_header(path):
+    """Column names exactly as written (the InboundCalls export pads them with spaces)."""
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        return next(csv.reader(f), [])
+
+
+def _tidy(df, schema, engine):
+    df.columns = [c.strip() for c in df.columns]
+    if engine == 'pyarrow':
+        # pyarrow marks missing strings with None; match the C engine's NaN
+        for c in df.columns[df.dtypes == object]:
+            df[c] = df[c].where(df[c].notna(), np.nan)
+    return df[list(schema.columns)]
+
+
+def _iter_chunks(reader, schema, engine):
+    with reader:
+        for chunk in reader:
+            yield _tidy(chunk, schema, engine)
+
+
+def read_export(path, schema, engine=None, chunksize=None):
+    """
+    Read one 3CX export using its schema.
+    Only schema.columns are parsed; categories become categoricals and
+    text columns stay as strings. Header names are stripped of padding.
+    With chunksize, returns an iterator of frames of that many rows
+    (always on the C engine; pyarrow's reader can't stream).
+    Raises ValueError if the file is missing one of the schema's columns.
+    """
+    engine = engine or DEFAULT_ENGINE
+    if engine == 'pyarrow' and (chunksize or not PYARROW_AVAILABLE):
+        engine = 'c'
+
+    raw_names = {name.strip(): name for name in _read_header(path)}
+    missing = [c for c in schema.columns if c not in raw_names]
+    if missing:
+        raise ValueError(f"{os.path.basename(path)} is not a {schema.name} export, missing columns: {missing}")
+
+    dtype = {raw_names[c]: 'category' for c in schema.categories}
+    dtype.update({raw_names[c]: str for c in schema.text})
+    result = pd.read_csv(
+        path,
+        usecols=[raw_names[c] for c in schema.columns],
+        dtype=dtype,
+        engine=engine,
+        chunksize=chunksize,
+    )
+    if chunksize:
+        return _iter_chunks(result, schema, engine)
+    return _tidy(result, schema, engine)
+
+
+def parse_call_time(values):
+    """Parse 3CX Call Time strings; anything else (e.g. the 'Totals' row) -> NaT."""
+    return pd.to_datetime(values, format=CALL_TIME_FORMAT, errors='coerce')
+
+
+def _ends_with_newline(path):
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell() == 0:
+            return True
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b'\n'
+
+
+def _write_remapped(path, columns, out):
+    """Slow path for header drift: rewrite rows in the combined column order."""
+    text = io.TextIOWrapper(out, encoding='utf-8', newline='', write_through=True)
+    try:
+        with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+            reader = csv.reader(f)
+            header = [c.strip() for c in next(reader, [])]
+            positions = [header.index(c) if c in header else None for c in columns]
+            writer = csv.writer(text, lineterminator='\n')
+            for row in reader:
+                writer.writerow(['' if i is None or i >= len(row) else row[i] for i in positions])
+    finally:
+        text.detach()
+
+
+def concat_raw_exports(paths, out_path):
+    """
+    Concatenate raw exports into one CSV without parsing them.
+    One header is written (no BOM); each file's BOM and header line are
+    dropped and the rest is copied byte for byte in large blocks. Files
+    whose columns differ from the combined header (header drift between
+    3CX versions) are rewritten row by row so the columns still line up,
+    blank where a file doesn't have a column.
+    Returns the number of files written.
+    """
+    headers = {p: [c.strip() for c in _read_header(p)] for p in paths}
+    paths = [p for p in paths if headers[p]]
+    columns = list(dict.fromkeys(c for p in paths for c in headers[p]))
+
+    with open(out_path, 'wb') as out:
+        header_line = io.StringIO()
+        csv.writer(header_line, lineterminator='\n').writerow(columns)
+        out.write(header_line.getvalue().encode('utf-8'))
+
+        for p in paths:
+            if headers[p] != columns:
+                _write_remapped(p, columns, out)
+                continue
+            with open(p, 'rb') as f:
+                f.readline()  # BOM + header
+                shutil.copyfileobj(f, out, COPY_BUFFER_BYTES)
+            if not _ends_with_newline(p):
+                out.write(b'\n')
+    return len(paths)
@@ -0,0 +1,172 @@
+"""
+Rollup Cube
+Precomputed call counts per
+(week_start, customer_type, weekday, hour, outcome), built from the call
+store and kept next to it:
+
+    data/store/cube/cube.parquet
+    data/store/cube/manifest.json   (versions, and the store part counts each week was built from)
+
+outcome is 'answered', 'voicemail' (main-log calls that weren't answered:
+voicemail or other) or 'abandoned' (abandoned log rows). Totals for any
+roll-up of the cells (see rollup) come from the cube alone, without
+touching the raw rows; the weekly backfill (CallDataset.weekly_metrics)
+is built this way.
+
+An abandoned caller is trade if their number had a trade call by the end
+of that week or is in the trade directory (the same rule as
+CallDataset.report_for).
+
+refresh_cube only rebuilds weeks from the first one whose store
+partitions changed since the last build; older weeks are kept as is.
+Every week is rebuilt when the trade directory or CLEANING_VERSION
+changes.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+import call_store
+from cleaning import CLEANING_VERSION
+from ingest_cache import CACHE_FORMAT, load_manifest, read_frame, save_manifest, write_frame
+from phones import clean_phone_column
+from weeks import WEEK, week_start_of
+
+CUBE_VERSION = "2"
+DIMS = ['week_start', 'customer_type', 'weekday', 'hour', 'outcome']
+MEASURES = ['calls']
+
+CALL_COLUMNS = ['call_start', 'customer_type', 'is_answered']
+ABANDONED_COLUMNS = ['Call Time', 'Caller ID']
+
+
+def get_cube_dir(data_dir='data'):
+    return os.path.join(call_store.get_store_dir(data_dir), 'cube')
+
+
+def _cube_path(data_dir):
+    return os.path.join(get_cube_dir(data_dir), f'cube.{CACHE_FORMAT}')
+
+
+def _empty_cube():
+    return pd.DataFrame(columns=DIMS + MEASURES)
+
+
+def _cells(times, customer_type, outcome):
+    """Group one source's rows into cube cells."""
+    rows = pd.DataFrame({
+        'week_start': week_start_of(times).to_numpy(),
+        'customer_type': customer_type,
+        'weekday': times.dt.dayofweek.to_numpy(),
+        'hour': times.dt.hour.to_numpy(),
+        'outcome': outcome,
+    })
+    return rows.groupby(DIMS, sort=False).size().rename('calls').reset_index()
+
+
+def abandoned_is_trade(abandoned, trade_since):
+    """
+    Boolean array: abandoned rows whose caller had a trade call before
+    the end of the row's week. trade_since maps normalised phone ->
+    earliest trade call_start.
+    """
+    since = clean_phone_column(abandoned['Caller ID']).map(trade_since)
+    week_end = week_start_of(abandoned['Call Time']) + WEEK
+    return (pd.to_datetime(since) < week_end).to_numpy()
+
+
+def build_cube(calls, abandoned, trade_since):
+    """Cube for the given call-level and abandoned rows (any weeks)."""
+    parts = []
+    if not calls.empty:
+        parts.append(_cells(
+            calls['call_start'],
+            calls['customer_type'].astype(str).to_numpy(),
+            np.where(calls['is_answered'].to_numpy(dtype=bool), 'answered', 'voicemail'),
+        ))
+    if not abandoned.empty:
+        parts.append(_cells(
+            abandoned['Call Time'],
+            np.where(abandoned_is_trade(abandoned, trade_since), 'trade', 'retail'),
+            'abandoned',
+        ))
+    if not parts:
+        return _empty_cube()
+    cube = pd.concat(parts, ignore_index=True)
+    return cube.sort_values(DIMS).reset_index(drop=True)
+
+
+def _store_state(data_dir):
+    """'YYYY-MM-DD' -> [calls parts, abandoned parts] for every stored week."""
+    state = {}
+    for i, table in enumerate((call_store.CALLS, call_store.ABANDONED)):
+        for week_start, parts in call_store.part_counts(table, data_dir).items():
+            state.setdefault(f'{week_start:%Y-%m-%d}', [0, 0])[i] = parts
+    return state
+
+
+def load_cube(data_dir='data'):
+    """The persisted cube, or an empty one if it hasn't been built."""
+    path = _cube_path(data_dir)
+    if not os.path.exists(path):
+        return _empty_cube()
+    return read_frame(path)
+
+
+def refresh_cube(trade_since, data_dir='data', trade_etag=None):
+    """
+    Bring the persisted cube up to date with the call store and return it.
+    Weeks before the first changed week are reused; that week and every
+    later one are rebuilt from the store (a changed week can make numbers
+    trade for the weeks after it). trade_etag is the trade directory's
+    ETag (see trade_directory.py); when it or CLEANING_VERSION changes
+    every week is rebuilt.
+    """
+    cube_dir = get_cube_dir(data_dir)
+    manifest = load_manifest(cube_dir)
+    current = (
+        manifest.get('version') == CUBE_VERSION and manifest.get('cleaning_version') == CLEANING_VERSION
+        and manifest.get('trade_etag') == trade_etag
+    )
+    built = manifest.get('weeks', {}) if current else {}
+    state = _store_state(data_dir)
+
+    changed = sorted(w for w in state if built.get(w) != state[w])
+    removed = set(built) - set(state)
+    cube = load_cube(data_dir) if built else _empty_cube()
+    if not changed and not removed:
+        print(f"Rollup cube: {len(state)} weeks up to date")
+        return cube
+
+    if removed:
+        cube = cube[~cube['week_start'].isin(pd.to_datetime(sorted(removed)))]
+    if changed:
+        since = pd.Timestamp(changed[0])
+        calls = call_store.read(call_store.CALLS, start=since, columns=CALL_COLUMNS, data_dir=data_dir)
+        abandoned = call_store.read(call_store.ABANDONED, start=since, columns=ABANDONED_COLUMNS, data_dir=data_dir)
+        fresh = build_cube(calls, abandoned, trade_since)
+        parts = [df for df in (cube[cube['week_start'] < since], fresh) if not df.empty]
+        cube = pd.concat(parts, ignore_index=True) if parts else _empty_cube()
+        rebuilt = sum(w >= changed[0] for w in state)
+    else:
+        rebuilt = 0
+
+    os.makedirs(cube_dir, exist_ok=True)
+    path = _cube_path(data_dir)
+    tmp_path = path + '.tmp'
+    write_frame(cube.reset_index(drop=True), tmp_path)
+    os.replace(tmp_path, path)
+    save_manifest(cube_dir, {
+        'version': CUBE_VERSION,
+        'cleaning_version': CLEANING_VERSION,
+        'trade_etag': trade_etag,
+        'weeks': state,
+    })
+    print(f"Rollup cube: rebuilt {rebuilt} of {len(state)} weeks")
+    return cube.reset_index(drop=True)
+
+
+def rollup(cube, by):
+    """Sum the cube cells' measures to the `by` dimensions."""
+    return cube.groupby(by, sort=True)[MEASURES].sum()
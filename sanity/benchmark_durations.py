@@ -0,0 +1,48 @@
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from durations import hms_to_seconds_column, parse_hms_to_seconds
+from call_analytics_utils import hms_to_seconds
+
+
+def benchmark_durations(n=1_000_000):
+    print(f"=== DURATION PARSER BENCHMARK ({n:,} rows) ===")
+
+    rng = np.random.default_rng(42)
+    secs = rng.integers(0, 4 * 3600, n)
+    values = pd.Series([f"{s // 3600:02d}:{s // 60 % 60:02d}:{s % 60:02d}" for s in secs])
+    # Sprinkle in the odd values seen in real exports
+    values.iloc[::997] = np.nan
+    values.iloc[::1009] = 'Totals'
+    values.iloc[::1013] = '100:00:05'
+    values.iloc[::1019] = '05:30'
+
+    start = time.perf_counter()
+    expected = values.apply(parse_hms_to_seconds)
+    t_apply = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = hms_to_seconds_column(values)
+    t_vec = time.perf_counter() - start
+
+    match = (expected.to_numpy() == result.to_numpy()).all()
+    print(f"  .apply(parse_hms_to_seconds): {t_apply:.3f}s")
+    print(f"  hms_to_seconds_column:        {t_vec:.3f}s ({t_apply / t_vec:.1f}x)")
+    print(f"  {'PASS' if match else 'FAIL'}: results identical (dtype {result.dtype})")
+
+    # call_analytics_utils semantics (MM:SS, numeric, unparsable -> NaN)
+    expected_utils = pd.to_numeric(values.apply(hms_to_seconds), errors="coerce")
+    result_utils = hms_to_seconds_column(values, default=None, allow_mmss=True, numeric_as_seconds=True)
+    match_utils = np.allclose(expected_utils.to_numpy(dtype=float), result_utils.to_numpy(), equal_nan=True)
+    print(f"  {'PASS' if match_utils else 'FAIL'}: matches call_analytics_utils.hms_to_seconds")
+
+    return match and match_utils
+
+
+if __name__ == "__main__":
+    benchmark_durations()
@@ -0,0 +1,77 @@
+import glob
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from cleaning import aggregate_to_call_level, clean_call_log
+
+
+def legacy_aggregate(df):
+    """The original lambda-based groupby.agg, kept here as the reference."""
+    def resolve_customer_type(series):
+        vals = set(v for v in series if isinstance(v, str))
+        if "trade" in vals:
+            return "trade"
+        return "retail"
+
+    return (
+        df
+        .groupby("Call ID")
+        .agg(
+            call_start=("Call Time dt", "min"),
+            from_number=("From", "first"),
+            to_number=("To", "first"),
+            directions=("Direction", lambda x: ",".join(sorted(set(x)))),
+            statuses=("Status", lambda x: ",".join(sorted(set(x)))),
+            ringing_total_sec=("Ringing_sec", "sum"),
+            talking_total_sec=("Talking_sec", "sum"),
+            customer_type=("customer_type_leg", resolve_customer_type),
+            call_activity_details=("Call Activity Details", lambda x: " | ".join(sorted(set(x.dropna().astype(str))))),
+        )
+        .reset_index()
+    )
+
+
+def compare(legs, label):
+    start = time.perf_counter()
+    expected = legacy_aggregate(legs)
+    t_old = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = aggregate_to_call_level(legs)[expected.columns]
+    t_new = time.perf_counter() - start
+
+    expected["customer_type"] = expected["customer_type"].astype(object)
+    try:
+        pd.testing.assert_frame_equal(result, expected)
+        print(f"  PASS: {label} ({len(legs):,} legs) legacy {t_old:.2f}s, new {t_new:.2f}s")
+        return True
+    except AssertionError as e:
+        print(f"  FAIL: {label}: {e}")
+        return False
+
+
+def check_aggregation(data_dir='data', synthetic_legs=1_000_000):
+    print("=== CALL-LEVEL AGGREGATION EQUIVALENCE ===")
+    files = sorted(glob.glob(os.path.join(data_dir, 'CallLogLastWeek_*.csv')))
+    legs = [clean_call_log(f) for f in files]
+    ok = all(compare(df, os.path.basename(f)) for df, f in zip(legs, files))
+
+    # Scale test: replicate real legs under fresh Call IDs
+    all_legs = pd.concat(legs, ignore_index=True)
+    copies = -(-synthetic_legs // len(all_legs))
+    big = pd.concat([all_legs] * copies, ignore_index=True).iloc[:synthetic_legs].copy()
+    suffix = np.repeat(np.arange(copies), len(all_legs))[:synthetic_legs].astype(str)
+    big["Call ID"] = big["Call ID"].astype(str) + "-" + suffix
+    ok = compare(big, "synthetic") and ok
+
+    print("\nALL AGGREGATIONS IDENTICAL ✅" if ok else "\nAGGREGATION MISMATCH ❌")
+    return ok
+
+
+if __name__ == "__main__":
+    check_aggregation()
@@ -0,0 +1,92 @@
+import glob
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from business_hours import AFTER_CLOSING, BEFORE_OPENING, OPEN, UNKNOWN, BusinessCalendar, load_calendar
+from call_log_analyzer import analyze_journey, analyze_out_of_hours, load_abandoned_calls
+from cleaning import run_cleaning
+
+
+def legacy_hours(day, hour):
+    """The hardcoded Mon-Fri 8-20, Sat 8-18, Sun 10-16 rule, one row at a time."""
+    if pd.isna(day) or pd.isna(hour):
+        return UNKNOWN
+    opening, closing = (8, 20) if day <= 4 else (8, 18) if day == 5 else (10, 16)
+    if hour < opening:
+        return BEFORE_OPENING
+    if hour >= closing:
+        return AFTER_CLOSING
+    return OPEN
+
+
+def check_business_hours(data_dir='data', synthetic_calls=1_000_000):
+    print("=== BUSINESS HOURS CALENDAR ===")
+    calendar = BusinessCalendar()
+    ok = True
+
+    # Every call and abandoned call gets the same class as the old row-wise rule
+    files = sorted(glob.glob(os.path.join(data_dir, 'CallLogLastWeek_*.csv')))
+    calls = pd.concat([run_cleaning(f).call_level_df for f in files], ignore_index=True)
+    abandoned = load_abandoned_calls(data_dir)
+    times = pd.concat([calls['call_start'], abandoned['Call Time'], pd.Series([pd.NaT])], ignore_index=True)
+    expected = np.array([legacy_hours(d, h) for d, h in zip(times.dt.dayofweek, times.dt.hour)])
+    same = np.array_equal(calendar.classify(times), expected)
+    print(f"  {'PASS' if same else 'FAIL'}: {len(times):,} call times classified as before the old rule "
+          f"({(expected == BEFORE_OPENING).sum():,} before, {(expected == AFTER_CLOSING).sum():,} after opening hours)")
+    ok &= same
+
+    ooh = analyze_out_of_hours(calls, abandoned, calendar)
+    journey = analyze_journey(calls, abandoned, calendar)
+    logged_out = abandoned['Agent State'] == 'Logged Out'
+    same = (ooh['ooh_total'] == int(((expected == BEFORE_OPENING) | (expected == AFTER_CLOSING)).sum())
+            and journey['abd_logged_out_before_hours'] + journey['abd_logged_out_during_hours']
+            + journey['abd_logged_out_after_hours'] == int(logged_out.sum()))
+    print(f"  {'PASS' if same else 'FAIL'}: analyze_out_of_hours {ooh} and analyze_journey's "
+          f"logged-out split add up")
+    ok &= same
+
+    # Scale test: one table lookup vs the row-wise rule
+    big = pd.Series(np.resize(times.dropna().to_numpy(), synthetic_calls))
+    frame = pd.DataFrame({'day_of_week': big.dt.dayofweek, 'hour': big.dt.hour})
+    start = time.perf_counter()
+    slow = frame.apply(lambda row: legacy_hours(row['day_of_week'], row['hour']), axis=1).to_numpy()
+    t_old = time.perf_counter() - start
+    start = time.perf_counter()
+    fast = calendar.classify(big)
+    t_new = time.perf_counter() - start
+    same = np.array_equal(fast, slow)
+    print(f"  {'PASS' if same else 'FAIL'}: {synthetic_calls:,} calls row-wise {t_old:.2f}s, lookup {t_new:.3f}s")
+    ok &= same
+
+    # Overrides: bank holiday closed, short Christmas Eve, Saturday hours changed
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.path.join(tmp, 'business_hours.csv'), 'w') as f:
+            f.write("day,open,close\nSaturday,09:00,17:30\n2025-12-25,,\n2025-12-24,08:00,14:00\n")
+        custom = load_calendar(tmp)
+    probes = pd.to_datetime([
+        '2025-12-25 12:00',  # Thursday, closed
+        '2025-12-24 13:59',  # Wednesday, open until 14:00
+        '2025-12-24 14:00',
+        '2025-12-27 08:30',  # Saturday, opens at 9
+        '2025-12-27 17:29',
+        '2025-12-27 17:30',
+        '2025-12-23 19:59',  # ordinary Tuesday
+    ])
+    got = custom.classify(probes).tolist()
+    want = [AFTER_CLOSING, OPEN, AFTER_CLOSING, BEFORE_OPENING, OPEN, AFTER_CLOSING, OPEN]
+    same = got == want and custom.describe() == 'Mon-Fri 8am-8pm, Sat 9am-5:30pm, Sun 10am-4pm'
+    print(f"  {'PASS' if same else 'FAIL'}: holiday and weekday overrides ({custom.describe()})")
+    ok &= same
+
+    print("\nBUSINESS HOURS MATCH ✅" if ok else "\nBUSINESS HOURS MISMATCH ❌")
+    return ok
+
+
+if __name__ == "__main__":
+    check_business_hours()
@@ -0,0 +1,83 @@
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from call_dataset import CallDataset
+from validate_historical import validate_arithmetic
+from weeks import WEEK, day_end_anchor
+
+KEYS = ['week1_calls', 'week2_calls', 'week1_retail_total', 'week1_trade_total',
+        'week2_retail_total', 'week2_trade_total', 'week1_retail_abandoned',
+        'week1_trade_abandoned', 'week2_retail_abandoned', 'week2_trade_abandoned']
+
+
+def _recount(dataset, as_of):
+    """Week 1/2 counts straight from the frames, by calendar day."""
+    end = day_end_anchor(as_of)
+    trade = dataset.trade_numbers(as_of)
+    calls, abd = dataset.calls, dataset.abandoned
+    abd_trade = dataset.abandoned_phones.isin(trade)
+    counts = {}
+    for week in (1, 2):
+        stop = end - WEEK * (week - 1)
+        start = stop - WEEK
+        main = calls[(calls['call_start'] >= start) & (calls['call_start'] < stop)]
+        in_week = (abd['Call Time'] >= start) & (abd['Call Time'] < stop)
+        retail = int((main['customer_type'] == 'retail').sum())
+        trade_calls = int((main['customer_type'] == 'trade').sum())
+        trade_abd = int((in_week & abd_trade).sum())
+        retail_abd = int(in_week.sum()) - trade_abd
+        counts[f'week{week}_retail_total'] = retail
+        counts[f'week{week}_trade_total'] = trade_calls
+        counts[f'week{week}_retail_abandoned'] = retail_abd
+        counts[f'week{week}_trade_abandoned'] = trade_abd
+        counts[f'week{week}_calls'] = retail + trade_calls + retail_abd + trade_abd
+    return counts
+
+
+def check_call_dataset(data_dir='data'):
+    print("=== SHARED CALL DATASET ===")
+    start = time.perf_counter()
+    dataset = CallDataset.load(data_dir)
+    t_load = time.perf_counter() - start
+    if dataset.calls.empty:
+        print("  No CallLog files found")
+        return False
+    n_calls = len(dataset.calls)
+
+    # This week's report, last week's report and a recount from one load
+    latest = dataset.max_date.normalize()
+    ok = True
+    timings = []
+    for as_of in (None, latest, latest - WEEK):
+        start = time.perf_counter()
+        results = dataset.report_for(as_of)
+        timings.append(time.perf_counter() - start)
+        metrics = results['metrics']
+        label = 'latest call' if as_of is None else f'{as_of.date()}'
+
+        valid, errors = validate_arithmetic(metrics)
+        print(f"  {'PASS' if valid else 'FAIL'}: report for {label} adds up" + (f" {errors}" if errors else ''))
+        ok &= valid
+
+        # Rolling weeks only line up with calendar days for dated reports
+        if as_of is not None:
+            expected = _recount(dataset, as_of)
+            diffs = {k: (metrics[k], expected[k]) for k in KEYS if metrics[k] != expected[k]}
+            print(f"  {'PASS' if not diffs else 'FAIL'}: report for {label} matches a recount "
+                  f"({metrics['week1_calls']} / {metrics['week2_calls']} calls)" + (f" {diffs}" if diffs else ''))
+            ok &= not diffs
+
+    untouched = len(dataset.calls) == n_calls and 'week' not in dataset.calls.columns
+    print(f"  {'PASS' if untouched else 'FAIL'}: reports leave the loaded frames unchanged")
+    ok &= untouched
+
+    print(f"  Load {t_load:.2f}s once, then reports in {', '.join(f'{t:.2f}s' for t in timings)}")
+    return ok
+
+
+if __name__ == "__main__":
+    check_call_dataset()
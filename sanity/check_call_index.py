@@ -0,0 +1,73 @@
+import glob
+import os
+import sys
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+import call_index
+
+
+def check_keys(data_dir='data'):
+    print("=== CALL ID INDEX ===")
+    ok = True
+
+    # UUID Call IDs map to their 128-bit value
+    ids = [str(uuid.uuid4()) for _ in range(10_000)]
+    keys = call_index.call_id_keys(ids)
+    same = all(bytes(k).ljust(16, b'\0') == uuid.UUID(i).bytes for k, i in zip(keys, ids))
+    print(f"  {'PASS' if same else 'FAIL'}: UUID Call IDs parse to their 128-bit value")
+    ok &= same
+
+    # Membership agrees with a plain Python set on the real exports
+    files = sorted(glob.glob(os.path.join(data_dir, 'CallLogLastWeek_*.csv')))
+    seen = set()
+    index = None
+    mismatches = 0
+    for f in files:
+        call_ids = pd.read_csv(f, usecols=['Call ID'], dtype=str)['Call ID'].dropna().unique()
+        keys = call_index.call_id_keys(call_ids)
+        in_index = call_index.contains(index, keys)
+        in_set = np.array([c in seen for c in call_ids], dtype=bool)
+        mismatches += int((in_index != in_set).sum())
+        seen.update(call_ids)
+        index = call_index.add_keys(index, keys)
+    print(f"  {'PASS' if mismatches == 0 else 'FAIL'}: membership matches a set over {len(files)} exports "
+          f"({len(index):,} Call IDs, {index.nbytes / 1e3:.0f} KB)")
+    ok &= mismatches == 0
+    return ok
+
+
+def benchmark_dedup(history_calls=2_000_000, new_calls=20_000):
+    """Dedup one new export against history: index lookup vs concat + drop_duplicates."""
+    print(f"\n=== BENCHMARK: {new_calls:,} new calls vs {history_calls:,} in history ===")
+    rng = np.random.default_rng(0)
+    history = pd.Series([str(uuid.UUID(int=int(x))) for x in rng.integers(0, 2**62, history_calls)])
+    # Half of the new export overlaps the previous week
+    new = pd.concat([
+        history.iloc[-new_calls // 2:],
+        pd.Series([str(uuid.uuid4()) for _ in range(new_calls // 2)]),
+    ], ignore_index=True)
+
+    index = call_index.build_index(call_index.call_id_keys(history))
+
+    start = time.perf_counter()
+    combined = pd.concat([history, new], ignore_index=True)
+    expected = (~combined.duplicated()).iloc[len(history):].to_numpy()
+    t_concat = time.perf_counter() - start
+
+    start = time.perf_counter()
+    fresh = call_index.new_key_mask(index, call_index.call_id_keys(new))
+    t_index = time.perf_counter() - start
+
+    print(f"  concat + duplicated: {t_concat:.3f}s")
+    print(f"  call_index lookup:   {t_index:.3f}s ({t_concat / t_index:.0f}x)")
+    print(f"  {'PASS' if (fresh == expected).all() else 'FAIL'}: same {int(fresh.sum()):,} new calls")
+
+
+if __name__ == "__main__":
+    check_keys()
+    benchmark_dedup()
@@ -0,0 +1,131 @@
+import dataclasses
+import glob
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+import call_store
+from call_log_analyzer import load_abandoned_calls
+from cleaning import run_cleaning
+from ingest_cache import file_hash
+from readers import ABANDONED_CALLS, read_export
+
+
+def check_call_store(data_dir='data'):
+    print("=== PARTITIONED CALL STORE ===")
+    files = sorted(glob.glob(os.path.join(data_dir, 'CallLogLastWeek_*.csv')))
+    if not files:
+        print("  No CallLog files found")
+        return False
+    frames = [run_cleaning(f).call_level_df for f in files]
+    expected = pd.concat(frames, ignore_index=True).drop_duplicates(subset=['Call ID'])
+    expected = expected.drop(columns='week')
+    ok = True
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Append file by file, like weekly runs; overlapping exports add nothing twice
+        added = sum(call_store.append(df, call_store.CALLS, tmp) for df in frames)
+        print(f"  Appended {len(frames)} exports: {added} calls in {len(call_store.list_partitions(call_store.CALLS, tmp))} weekly partitions")
+        if added != len(expected):
+            print(f"  FAIL: expected {len(expected)} unique calls")
+            ok = False
+
+        again = call_store.append(frames[-1], call_store.CALLS, tmp)
+        print(f"  {'PASS' if again == 0 else 'FAIL'}: re-appending an export adds {again} rows")
+        ok &= again == 0
+
+        # A missing key index is rebuilt from the stored rows
+        os.remove(os.path.join(call_store.get_store_dir(tmp), 'calls', call_store.INDEX_NAME))
+        again = call_store.append(frames[0], call_store.CALLS, tmp)
+        print(f"  {'PASS' if again == 0 else 'FAIL'}: after rebuilding the key index, re-appending adds {again} rows")
+        ok &= again == 0
+
+        stored = call_store.read(call_store.CALLS, data_dir=tmp)
+        key = ['Call ID']
+        same = stored.sort_values(key).reset_index(drop=True).equals(
+            expected[stored.columns].sort_values(key).reset_index(drop=True)
+        )
+        print(f"  {'PASS' if same else 'FAIL'}: stored rows round-trip unchanged")
+        ok &= same
+
+        # Date-range read vs. filtering everything in memory
+        end = expected['call_start'].max().normalize() + pd.Timedelta(days=1)
+        start = end - pd.Timedelta(days=14)
+        t = time.perf_counter()
+        window = call_store.read(call_store.CALLS, start, end, data_dir=tmp)
+        t_range = time.perf_counter() - t
+        in_range = expected[(expected['call_start'] >= start) & (expected['call_start'] < end)]
+        same = set(window['Call ID']) == set(in_range['Call ID'])
+        print(f"  {'PASS' if same else 'FAIL'}: {start.date()} to {end.date()} -> {len(window)} calls ({t_range:.3f}s)")
+        ok &= same
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # A crash after writing the parts but before saving the key index:
+        # the rerun writes the rows again, and reads still count them once
+        index_path = os.path.join(call_store.get_store_dir(tmp), 'calls', call_store.INDEX_NAME)
+        call_store.append(frames[0], call_store.CALLS, tmp)
+        shutil.copy(index_path, index_path + '.bak')
+        call_store.append(frames[1], call_store.CALLS, tmp)
+        os.replace(index_path + '.bak', index_path)
+        call_store.append(frames[1], call_store.CALLS, tmp)
+        stored = call_store.read(call_store.CALLS, data_dir=tmp)
+        unique = pd.concat(frames[:2]).drop_duplicates(subset=['Call ID'])
+        same = len(stored) == len(unique) and not stored['Call ID'].duplicated().any()
+        print(f"  {'PASS' if same else 'FAIL'}: rerun after a crash before the index was saved reads {len(stored)} calls once each")
+        ok &= same
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Rows stored by an older cleaning version (missing a column) are
+        # replaced when the current version appends them again
+        old = dataclasses.replace(call_store.CALLS, version='old')
+        call_store.append(expected.drop(columns='queue_visited'), old, tmp)
+        replaced = call_store.append(expected, call_store.CALLS, tmp)
+        stored = call_store.read(call_store.CALLS, data_dir=tmp)
+        versions = set(call_store.partition_versions(call_store.CALLS, tmp).values())
+        same = (
+            replaced == len(expected) and versions == {call_store.CALLS.version}
+            and len(stored) == len(expected) and stored['queue_visited'].notna().all()
+        )
+        print(f"  {'PASS' if same else 'FAIL'}: after a CLEANING_VERSION bump {replaced} stored calls are replaced "
+              f"with the new columns")
+        again = call_store.append(expected, call_store.CALLS, tmp)
+        print(f"  {'PASS' if again == 0 else 'FAIL'}: appending them again under the same version adds {again} rows")
+        ok &= same and again == 0
+
+    return ok
+
+
+def check_abandoned_ingest(data_dir='data'):
+    """load_abandoned_calls only reads exports it hasn't ingested before."""
+    print("\n=== INCREMENTAL ABANDONED INGEST ===")
+    files = sorted(glob.glob(os.path.join(data_dir, ABANDONED_CALLS.pattern)))
+    if len(files) < 2:
+        print("  Need at least two AbandonedCalls files")
+        return False
+
+    full = pd.concat([read_export(f, ABANDONED_CALLS) for f in files], ignore_index=True)
+    full['Caller ID'] = full['Caller ID'].astype(str).str.replace(r'\.0$', '', regex=True)
+    full = full[pd.to_datetime(full['Call Time'], errors='coerce').notna()]
+    expected = len(full.drop_duplicates(subset=['Caller ID', 'Call Time']))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for f in files[1:]:
+            shutil.copy(f, tmp)
+        load_abandoned_calls(tmp)
+        shutil.copy(files[0], tmp)
+        result = load_abandoned_calls(tmp)
+        manifest = call_store.ingested_sources(call_store.ABANDONED, tmp)
+
+    ok = len(result) == expected and len(manifest) == len({file_hash(f) for f in files})
+    print(f"  {'PASS' if ok else 'FAIL'}: {len(result)} rows after adding {os.path.basename(files[0])} (expected {expected})")
+    return ok
+
+
+if __name__ == "__main__":
+    check_call_store()
+    check_abandoned_ingest()
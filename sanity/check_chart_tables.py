@@ -0,0 +1,83 @@
+import contextlib
+import io
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from call_dataset import CallDataset
+from call_log_analyzer import CHART_DAYS, CHART_WEEKS, CUSTOMER_TYPE_LABELS, chart_tables, plot_metrics_from_tables
+from durations import hms_to_seconds_column
+
+
+def legacy_tables(df, abd):
+    """Chart inputs the old way: one boolean mask per week, type and day."""
+    by_type, by_day = [], []
+    abd = abd[abd['week'].isin(CHART_WEEKS)].copy()
+    abd['day_of_week'] = pd.to_datetime(abd['Call Time'], errors='coerce').dt.day_name()
+    abd['wait_sec'] = hms_to_seconds_column(abd['Waiting Time'])
+    main = df[df['week'].isin(CHART_WEEKS)].copy()
+    main['day_of_week'] = main['call_start'].dt.day_name()
+    for week in CHART_WEEKS:
+        week_main = main[main['week'] == week]
+        week_abd = abd[abd['week'] == week]
+        for ctype in CUSTOMER_TYPE_LABELS:
+            rows = week_main[week_main['customer_type'] == ctype]
+            by_type.append([rows['ringing_total_sec'].mean(), rows['talking_total_sec'].mean(), len(rows)])
+        for day in CHART_DAYS:
+            day_abd = week_abd[week_abd['day_of_week'] == day]
+            day_main = week_main[week_main['day_of_week'] == day]
+            waits = day_abd['wait_sec'].agg(['min', 'mean', 'max']).fillna(0) if len(day_abd) else [0, 0, 0]
+            by_day.append([len(day_abd), *waits, len(day_main), day_main['is_answered'].sum()])
+    return np.array(by_type, dtype=float), np.array(by_day, dtype=float)
+
+
+def compare(df, abd, label):
+    start = time.perf_counter()
+    old_type, old_day = legacy_tables(df, abd)
+    t_old = time.perf_counter() - start
+
+    start = time.perf_counter()
+    tables = chart_tables(df, abd)
+    t_new = time.perf_counter() - start
+
+    same = (np.allclose(tables['by_type'].to_numpy(float), old_type, equal_nan=True)
+            and np.allclose(tables['by_day'].to_numpy(float), old_day))
+    print(f"  {'PASS' if same else 'FAIL'}: {label} ({len(df):,} calls, {len(abd):,} abandoned) "
+          f"masks {t_old:.3f}s, groupby {t_new:.3f}s")
+    return same, tables
+
+
+def check_chart_tables(data_dir='data', scale=20):
+    print("=== CHART TABLES ===")
+    dataset = CallDataset.load(data_dir)
+    if dataset.calls.empty:
+        print("  No CallLog files found")
+        return False
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = dataset.report_for()
+    df, abd = results['raw_data_all_weeks'], results['abandoned_all_weeks']
+    ok, tables = compare(df, abd, 'weekly report')
+
+    # The data cards come from the same tables as the charts
+    metrics = results['metrics']
+    derived = plot_metrics_from_tables(tables)
+    diffs = {k: (v, metrics[k]) for k, v in derived.items() if metrics[k] != v}
+    print(f"  {'PASS' if not diffs else 'FAIL'}: {len(derived)} data card metrics match the chart tables"
+          + (f" {diffs}" if diffs else ''))
+    ok &= not diffs
+
+    # Scale test: the weeks repeated so every week/day group grows
+    big_df = pd.concat([df] * scale, ignore_index=True)
+    big_abd = pd.concat([abd] * scale, ignore_index=True)
+    same, _ = compare(big_df, big_abd, f'x{scale}')
+    ok &= same
+    return ok
+
+
+if __name__ == "__main__":
+    check_chart_tables()
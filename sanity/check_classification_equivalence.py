@@ -0,0 +1,48 @@
+import glob
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from cleaning import classify_customer_column, classify_customer_from_activity
+
+
+def check_equivalence(data_dir='data'):
+    print("=== CUSTOMER TYPE CLASSIFIER EQUIVALENCE ===")
+    files = sorted(glob.glob(os.path.join(data_dir, 'CallLogLastWeek_*.csv')))
+    failures = 0
+    t_old = t_new = 0.0
+    legs = 0
+
+    for f in files:
+        activity = pd.read_csv(f, usecols=['Call Activity Details'])['Call Activity Details']
+        legs += len(activity)
+
+        start = time.perf_counter()
+        expected = activity.apply(classify_customer_from_activity)
+        t_old += time.perf_counter() - start
+
+        start = time.perf_counter()
+        result = classify_customer_column(activity)
+        t_new += time.perf_counter() - start
+
+        result = result.astype(object).where(result.notna(), None)
+        mismatches = (result.fillna('<none>') != expected.fillna('<none>')).sum()
+        if mismatches:
+            print(f"  FAIL: {os.path.basename(f)} -> {mismatches} legs differ")
+            failures += 1
+        else:
+            print(f"  PASS: {os.path.basename(f)} ({len(activity)} legs)")
+
+    print(f"\n{legs:,} legs: .apply {t_old:.3f}s, column classifier {t_new:.3f}s")
+    if failures == 0:
+        print("\nALL FILES IDENTICAL ✅")
+    else:
+        print(f"\n{failures} FILES DIFFER ❌")
+    return failures == 0
+
+
+if __name__ == "__main__":
+    check_equivalence()
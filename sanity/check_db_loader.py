@@ -0,0 +1,105 @@
+import contextlib
+import io
+import os
+import sqlite3
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+import db_loader
+from call_dataset import CallDataset
+
+
+class CopyRecorder:
+    """Collects what _copy_rows would send to PostgreSQL's COPY FROM STDIN."""
+
+    def __init__(self):
+        self.buffers = []
+
+    def copy_expert(self, sql, buffer):
+        self.buffers.append((sql, buffer.getvalue()))
+
+
+def _count(conn, table):
+    return conn.execute(f'SELECT COUNT(*) FROM {db_loader.quote(table)}').fetchone()[0]
+
+
+def check_db_loader(data_dir='data', year_of_calls=110_000):
+    print("=== DATABASE BULK LOADER ===")
+    with contextlib.redirect_stdout(io.StringIO()):
+        dataset = CallDataset.load(data_dir)
+        calls = dataset.report_for()['raw_data_all_weeks']
+    if calls.empty:
+        print("  No CallLog files found")
+        return False
+    ok = True
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, 'calls.db'))
+
+        # First load creates the keyed table; a re-run only updates
+        first = db_loader.bulk_upsert(conn, calls, 'call_logs', ['Call ID'])
+        again = db_loader.bulk_upsert(conn, calls, 'call_logs', ['Call ID'])
+        conn.commit()
+        same = (first['inserted'] == len(calls) and again['updated'] == len(calls)
+                and again['inserted'] == 0 and _count(conn, 'call_logs') == len(calls))
+        print(f"  {'PASS' if same else 'FAIL'}: {len(calls):,} calls loaded in {first['seconds']:.2f}s, "
+              f"reloading updates them in place ({again['inserted']} new, {again['updated']:,} updated)")
+        ok &= same
+
+        # The next week's export: a few corrections plus new calls, history kept
+        latest = calls.nlargest(100, 'call_start').copy()
+        latest['customer_type'] = 'trade'
+        new = calls.head(50).copy()
+        new['Call ID'] = new['Call ID'] + '-next'
+        stats = db_loader.bulk_upsert(conn, pd.concat([latest, new]), 'call_logs', ['Call ID'])
+        conn.commit()
+        stored = pd.read_sql('SELECT "Call ID", customer_type FROM call_logs', conn).set_index('Call ID')['customer_type']
+        same = (stats['inserted'] == 50 and stats['updated'] == 100
+                and len(stored) == len(calls) + 50
+                and (stored.loc[latest['Call ID']] == 'trade').all())
+        print(f"  {'PASS' if same else 'FAIL'}: incremental load keeps history "
+              f"({stats['inserted']} new, {stats['updated']} corrected, {len(stored):,} stored)")
+        ok &= same
+
+        # Columns added since the table was created are added to it
+        extra = calls.head(10).assign(reviewed=True)
+        db_loader.bulk_upsert(conn, extra, 'call_logs', ['Call ID'])
+        columns = [d[0] for d in conn.execute('SELECT * FROM call_logs LIMIT 0').description]
+        same = 'reviewed' in columns and _count(conn, 'call_logs') == len(calls) + 50
+        print(f"  {'PASS' if same else 'FAIL'}: a new frame column is added to the table")
+        ok &= same
+
+        # About a year of calls
+        copies = -(-year_of_calls // len(calls))
+        year = pd.concat([calls] * copies, ignore_index=True).iloc[:year_of_calls].copy()
+        year['Call ID'] = year['Call ID'] + '-' + np.repeat(np.arange(copies), len(calls))[:year_of_calls].astype(str)
+        stats = db_loader.bulk_upsert(conn, year, 'call_logs_year', ['Call ID'])
+        conn.commit()
+        same = stats['inserted'] == year_of_calls
+        print(f"  {'PASS' if same else 'FAIL'}: {year_of_calls:,} calls (a year) loaded in {stats['seconds']:.2f}s "
+              f"({year_of_calls / stats['seconds']:,.0f} rows/s)")
+        ok &= same
+        conn.close()
+
+    # COPY buffers (PostgreSQL path) hold every row and read back as CSV
+    recorder = CopyRecorder()
+    db_loader._copy_rows(recorder, calls, '_stage_call_logs')
+    parsed = pd.concat(
+        [pd.read_csv(io.StringIO(text), header=None, names=list(calls.columns), na_values=['\\N'],
+                     keep_default_na=False) for _, text in recorder.buffers],
+        ignore_index=True,
+    )
+    same = (len(parsed) == len(calls)
+            and parsed['Call ID'].tolist() == calls['Call ID'].tolist()
+            and (pd.to_datetime(parsed['call_start']) == calls['call_start'].to_numpy()).all())
+    print(f"  {'PASS' if same else 'FAIL'}: COPY sends {len(recorder.buffers)} CSV buffer(s) with every row")
+    ok &= same
+    return ok
+
+
+if __name__ == "__main__":
+    check_db_loader()
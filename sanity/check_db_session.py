@@ -0,0 +1,117 @@
+import contextlib
+import io
+import os
+import sqlite3
+import sys
+import tempfile
+from functools import partial
+
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+import db_sync
+import weekly_data_manager
+from call_dataset import CallDataset
+from call_log_analyzer import save_to_database
+from db_session import UnitOfWork
+from store_snapshot import SNAPSHOT_TABLE, get_previous_report_comparison, store_snapshot
+
+
+class SQLiteConnections:
+    """Connection factory for UnitOfWork that counts the connections opened."""
+
+    def __init__(self, path):
+        self.path = path
+        self.opened = 0
+
+    def __call__(self):
+        self.opened += 1
+        return contextlib.closing(sqlite3.connect(self.path))
+
+
+def _tables(path):
+    with contextlib.closing(sqlite3.connect(path)) as conn:
+        names = [r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+        return {name: conn.execute(f'SELECT COUNT(*) FROM "{name}"').fetchone()[0] for name in names}
+
+
+def _queue_report(run, results, metrics_row):
+    save_to_database(results['raw_data_all_weeks'], results['abandoned_all_weeks'], run=run)
+    run.add(weekly_data_manager.DB_TABLE, partial(weekly_data_manager.store_week, metrics=metrics_row))
+    run.add(SNAPSHOT_TABLE, partial(store_snapshot, metrics=results['metrics']))
+
+
+def check_db_session(data_dir='data'):
+    print("=== DATABASE UNIT OF WORK ===")
+    with contextlib.redirect_stdout(io.StringIO()):
+        dataset = CallDataset.load(data_dir)
+        results = dataset.report_for()
+    if not results:
+        print("  No CallLog files found")
+        return False
+    metrics = results['metrics']
+    metrics_row = {
+        'start_date': metrics['this_week_start'], 'end_date': metrics['this_week_end'],
+        'total': metrics['week1_calls'], 'retail': metrics['week1_retail_total'],
+        'trade': metrics['week1_trade_total'],
+        'abandoned': metrics['week1_retail_abandoned'] + metrics['week1_trade_abandoned'],
+        'abandoned_retail': metrics['week1_retail_abandoned'], 'abandoned_trade': metrics['week1_trade_abandoned'],
+    }
+    ok = True
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'report.db')
+        connections = SQLiteConnections(path)
+
+        # A report run: all writes queued, then one connection and one commit
+        run = UnitOfWork(connect=connections)
+        _queue_report(run, results, metrics_row)
+        before = _tables(path)
+        log = io.StringIO()
+        with contextlib.redirect_stdout(log):
+            committed = run.commit()
+        stored = _tables(path)
+        expected = {
+            'call_logs': len(results['raw_data_all_weeks']),
+            'abandoned_calls': len(results['abandoned_all_weeks']),
+            'weekly_metrics': 1,
+            SNAPSHOT_TABLE: 2,
+            db_sync.WATERMARKS: 2,
+        }
+        same = committed and not before and connections.opened == 1 and stored == expected
+        print(f"  {'PASS' if same else 'FAIL'}: one connection, one commit for "
+              f"{', '.join(f'{k} ({v:,})' for k, v in stored.items())}")
+        print("    " + log.getvalue().strip().splitlines()[-1])
+        ok &= same
+
+        # A failing write rolls back the whole run, including the call sync
+        later = results['raw_data_all_weeks'].copy()
+        later['call_start'] += pd.Timedelta(days=14)
+        later['Call ID'] = later['Call ID'] + '-later'
+        run = UnitOfWork(connect=connections)
+        save_to_database(later, run=run)
+        run.add('broken', lambda conn: conn.execute('INSERT INTO missing_table VALUES (1)'))
+        with contextlib.redirect_stdout(io.StringIO()):
+            committed = run.commit()
+        with contextlib.closing(sqlite3.connect(path)) as conn:
+            watermark = db_sync.get_watermark(conn.cursor(), db_sync.CALL_LOGS)
+        same = (not committed and _tables(path) == stored
+                and watermark == results['raw_data_all_weeks']['call_start'].max())
+        print(f"  {'PASS' if same else 'FAIL'}: a failed write leaves every table and the watermark unchanged")
+        ok &= same
+
+        # Reads share a connection too
+        with contextlib.closing(sqlite3.connect(path)) as conn:
+            run = UnitOfWork(connect=connections)
+            run.add(SNAPSHOT_TABLE, partial(store_snapshot, metrics=metrics, report_date='2000-01-02'))
+            with contextlib.redirect_stdout(io.StringIO()):
+                run.commit()
+            previous = get_previous_report_comparison(conn)
+        same = previous is not None and int(previous['total_calls'].iloc[0]) == metrics['week1_calls']
+        print(f"  {'PASS' if same else 'FAIL'}: previous report's This Week read back from the snapshots")
+        ok &= same
+    return ok
+
+
+if __name__ == "__main__":
+    check_db_session()
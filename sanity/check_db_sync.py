@@ -0,0 +1,89 @@
+import contextlib
+import io
+import os
+import sqlite3
+import sys
+import tempfile
+
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+import db_sync
+from call_dataset import CallDataset
+
+
+def _stored(conn, table, columns='*'):
+    return pd.read_sql(f'SELECT {columns} FROM {table.name}', conn)
+
+
+def check_db_sync(data_dir='data'):
+    print("=== INCREMENTAL DATABASE SYNC ===")
+    with contextlib.redirect_stdout(io.StringIO()):
+        dataset = CallDataset.load(data_dir)
+        results = dataset.report_for()
+    calls = results.get('raw_data_all_weeks', pd.DataFrame())
+    abandoned = results.get('abandoned_all_weeks', pd.DataFrame())
+    if calls.empty:
+        print("  No CallLog files found")
+        return False
+    ok = True
+    table = db_sync.CALL_LOGS
+    latest_week = calls['call_start'] >= calls['call_start'].max().normalize() - pd.Timedelta(days=6)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, 'calls.db'))
+
+        # History up to last week, then a run with the newest week added
+        first = db_sync.sync_table(conn, calls[~latest_week], table)
+        weekly = db_sync.sync_table(conn, calls, table)
+        conn.commit()
+        stored = _stored(conn, table, '"Call ID", call_start')
+        same = (first['shipped'] == (~latest_week).sum()
+                and weekly['inserted'] == latest_week.sum() and weekly['updated'] == 0
+                and weekly['skipped'] == (~latest_week).sum()
+                and len(stored) == len(calls) and stored['Call ID'].is_unique
+                and weekly['watermark'] == calls['call_start'].max())
+        print(f"  {'PASS' if same else 'FAIL'}: weekly run ships {weekly['shipped']:,} of {len(calls):,} rows "
+              f"(the newest week), skips {weekly['skipped']:,}; watermark {weekly['watermark']}")
+        ok &= same
+
+        # Nothing changed: nothing shipped
+        rerun = db_sync.sync_table(conn, calls, table)
+        same = rerun['shipped'] == 0 and rerun['skipped'] == len(calls)
+        print(f"  {'PASS' if same else 'FAIL'}: re-running ships {rerun['shipped']} rows")
+        ok &= same
+
+        # A late correction inside the lookback is shipped; an older one waits for full=True
+        corrected = calls.copy()
+        recent = corrected.index[corrected['call_start'] >= rerun['watermark'] - pd.Timedelta(days=2)][0]
+        old = corrected.index[corrected['call_start'] < rerun['watermark'] - db_sync.LOOKBACK][0]
+        corrected.loc[[recent, old], 'customer_type'] = 'corrected'
+        late = db_sync.sync_table(conn, corrected, table)
+        full = db_sync.sync_table(conn, corrected, table, full=True)
+        conn.commit()
+        stored = _stored(conn, table, '"Call ID", customer_type').set_index('Call ID')['customer_type']
+        same = (late['updated'] == 1 and late['inserted'] == 0 and full['updated'] == 1
+                and (stored.loc[corrected.loc[[recent, old], 'Call ID']] == 'corrected').all()
+                and len(stored) == len(calls))
+        print(f"  {'PASS' if same else 'FAIL'}: a correction within {db_sync.LOOKBACK.days} days is shipped "
+              f"({late['updated']} updated), an older one with full=True ({full['updated']} updated)")
+        ok &= same
+
+        # Abandoned calls, keyed on Caller ID + Call Time; 'week' isn't stored
+        if not abandoned.empty:
+            stats = db_sync.sync_table(conn, abandoned, db_sync.ABANDONED_CALLS)
+            again = db_sync.sync_table(conn, abandoned, db_sync.ABANDONED_CALLS)
+            conn.commit()
+            stored = _stored(conn, db_sync.ABANDONED_CALLS)
+            same = (stats['inserted'] == len(abandoned) and again['shipped'] == 0
+                    and len(stored) == len(abandoned) and 'week' not in stored.columns
+                    and 'week' not in _stored(conn, table, '*').columns)
+            print(f"  {'PASS' if same else 'FAIL'}: {stats['inserted']:,} abandoned calls synced, "
+                  f"re-sync ships {again['shipped']}; report-relative 'week' not stored")
+            ok &= same
+        conn.close()
+    return ok
+
+
+if __name__ == "__main__":
+    check_db_sync()
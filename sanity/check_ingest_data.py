@@ -0,0 +1,106 @@
+import contextlib
+import io
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'archive'))
+import ingest_data
+from call_dataset import CallDataset
+from phones import clean_phone_column
+
+
+def _row_by_row(path, trade_numbers):
+    """The old ingest_call_logs row building (apply + iterrows), as the reference."""
+    df = pd.read_csv(path)
+    df['clean_from'] = clean_phone_column(df['from_number'])
+
+    def resolve_type(row):
+        if row['clean_from'] in trade_numbers:
+            return 'trade'
+        if str(row['customer_type']).lower() == 'trade':
+            return 'trade'
+        return 'retail'
+
+    df['final_customer_type'] = df.apply(resolve_type, axis=1)
+    rows = []
+    for _, row in df.iterrows():
+        rows.append((
+            str(row['Call ID']),
+            int(row['week']) if pd.notna(row['week']) else 0,
+            int(row['ringing_total_sec']) if pd.notna(row['ringing_total_sec']) else 0,
+            int(row['talking_total_sec']) if pd.notna(row['talking_total_sec']) else 0,
+            row['final_customer_type'],
+            bool(row['is_answered']),
+            bool(row['is_abandoned']),
+        ))
+    return pd.DataFrame(rows, columns=['call_id', 'week', 'ringing_sec', 'talking_sec',
+                                       'customer_type', 'is_answered', 'is_abandoned'])
+
+
+def check_ingest(data_dir='data'):
+    print("=== ARCHIVE INGEST (archive/ingest_data.py) ===")
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = CallDataset.load(data_dir).report_for()
+    if not results:
+        print("  No CallLog files found")
+        return False
+    calls, abandoned = results['raw_data_all_weeks'], results['abandoned_all_weeks']
+    # Every other retail caller's number is in the client list
+    retail = clean_phone_column(calls.loc[calls['customer_type'] == 'retail', 'from_number'])
+    trade_numbers = set(retail.iloc[::2]) - {'', 'anonymous'}
+    ok = True
+
+    with tempfile.TemporaryDirectory() as tmp:
+        calls_csv = os.path.join(tmp, 'call_logs_cleaned.csv')
+        abandoned_csv = os.path.join(tmp, 'abandoned_logs_cleaned.csv')
+        calls.to_csv(calls_csv, index=False)
+        abandoned.to_csv(abandoned_csv, index=False)
+        conn = sqlite3.connect(os.path.join(tmp, 'ingest.db'))
+
+        log = io.StringIO()
+        with contextlib.redirect_stdout(log):
+            ingest_data.create_tables(conn)
+            start = time.perf_counter()
+            ingest_data.ingest_call_logs(conn, trade_numbers, calls_csv)
+            t_new = time.perf_counter() - start
+            ingest_data.ingest_abandoned_logs(conn, trade_numbers, abandoned_csv)
+        start = time.perf_counter()
+        expected = _row_by_row(calls_csv, trade_numbers)
+        t_old = time.perf_counter() - start
+
+        stored = pd.read_sql(f'SELECT {", ".join(expected.columns)} FROM call_logs', conn)
+        stored[['is_answered', 'is_abandoned']] = stored[['is_answered', 'is_abandoned']].astype(bool)
+        stored = stored.set_index('call_id').loc[expected['call_id']].reset_index()
+        same = stored.equals(expected)
+        print(f"  {'PASS' if same else 'FAIL'}: {len(stored):,} call_logs rows match the row-by-row build "
+              f"({(expected['customer_type'] == 'trade').sum():,} trade)")
+        print(f"    row-by-row build {t_old:.2f}s vs vectorized prepare + bulk load {t_new:.2f}s")
+        ok &= same
+
+        stored = pd.read_sql('SELECT caller_id, customer_type FROM abandoned_calls', conn)
+        phones = clean_phone_column(abandoned['Caller ID'])
+        trade = phones.isin(trade_numbers) | abandoned['customer_type'].eq('trade')
+        same = len(stored) == len(abandoned) and (stored['customer_type'] == 'trade').sum() == trade.sum()
+        print(f"  {'PASS' if same else 'FAIL'}: {len(stored):,} abandoned_calls rows, "
+              f"{trade.sum():,} trade by client list or log")
+        ok &= same
+
+        # Re-ingesting (e.g. after a classification fix) updates in place
+        with contextlib.redirect_stdout(log):
+            stats = ingest_data.ingest_call_logs(conn, set(), calls_csv)
+        same = stats['updated'] == len(calls) and stats['inserted'] == 0
+        print(f"  {'PASS' if same else 'FAIL'}: re-ingest updates {stats['updated']:,} rows in place")
+        print("    " + "\n    ".join(line for line in log.getvalue().splitlines() if 'rows/s' in line))
+        ok &= same
+        conn.close()
+    return ok
+
+
+if __name__ == "__main__":
+    check_ingest()
@@ -0,0 +1,86 @@
+import glob
+import os
+import re
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from cleaning import JOURNEY_COLUMNS, extract_journey_events, run_cleaning
+
+
+def legacy_terminator(details):
+    """The per-row terminator rule analyze_journey used to apply."""
+    if 'Ended by Voice Agent' in details:
+        return 'System'
+    m = re.search(r'Ended by ([^:|]+)', details)
+    if m:
+        terminator = m.group(1).strip()
+        if any(char.isdigit() for char in terminator) and len(terminator) > 5:
+            return 'Customer'
+        return 'Agent'
+    return 'Unknown'
+
+
+def legacy_events(details):
+    """Four scans of the text: three str.contains and the terminator apply."""
+    details = details.fillna('')
+    return pd.DataFrame({
+        'queue_visited': details.str.contains('Queue', case=False),
+        'ooo_ivr_hit': details.str.contains('Out of office', case=False),
+        'voice_agent_hit': details.str.contains('Voice Agent', case=False),
+        'terminator_type': details.apply(legacy_terminator),
+    })
+
+
+def compare(details, label):
+    start = time.perf_counter()
+    expected = legacy_events(details)
+    t_old = time.perf_counter() - start
+
+    start = time.perf_counter()
+    events = extract_journey_events(details)
+    t_new = time.perf_counter() - start
+
+    try:
+        pd.testing.assert_frame_equal(events[expected.columns], expected, check_dtype=False)
+        print(f"  PASS: {label} ({len(details):,} calls) four scans {t_old:.2f}s, one pass {t_new:.2f}s")
+        return True
+    except AssertionError as e:
+        print(f"  FAIL: {label}: {e}")
+        return False
+
+
+def check_journey_events(data_dir='data', synthetic_calls=500_000):
+    print("=== JOURNEY EVENT EXTRACTION ===")
+    files = sorted(glob.glob(os.path.join(data_dir, 'CallLogLastWeek_*.csv')))
+    calls = [run_cleaning(f).call_level_df for f in files]
+    ok = all(compare(df['call_activity_details'], os.path.basename(f)) for df, f in zip(calls, files))
+
+    # Cleaned frames carry the columns, and a voice agent ending wins over an earlier terminator
+    ok &= all(set(JOURNEY_COLUMNS).issubset(df.columns) for df in calls)
+    tricky = pd.Series([
+        'Inbound: 07700900123 | Ended by 07700900123: Ended by Voice Agent',
+        'QUEUE Sales → Ended by Smith, Jo | out of office',
+        'Ended by Voice Agent',
+        None,
+    ])
+    ok = compare(tricky, 'edge cases') and ok
+    got = extract_journey_events(tricky)['terminator'].tolist()
+    same = got == ['07700900123', 'Smith, Jo', 'Voice Agent', None]
+    print(f"  {'PASS' if same else 'FAIL'}: terminator identities {got}")
+    ok &= same
+
+    # Scale test: the real activity strings repeated
+    details = pd.concat([df['call_activity_details'] for df in calls], ignore_index=True)
+    big = pd.Series(np.resize(details.to_numpy(), synthetic_calls))
+    ok = compare(big, 'synthetic') and ok
+
+    print("\nJOURNEY EVENTS MATCH ✅" if ok else "\nJOURNEY EVENT MISMATCH ❌")
+    return ok
+
+
+if __name__ == "__main__":
+    check_journey_events()
@@ -0,0 +1,96 @@
+import contextlib
+import io
+import os
+import re
+import sys
+
+import numpy as np
+import plotly.graph_objects as go
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+import call_log_analyzer
+import plot_payload
+from call_dataset import CallDataset
+
+_FIELD = re.compile(r"%\{(customdata\[(\d+)\]|x|y)\}")
+
+
+def hover_texts(trace):
+    """Each point's hover text, filled in the way plotly does for plain %{...} fields."""
+    template = trace.hovertemplate
+    data = trace.customdata
+    xs, ys = list(trace.x), list(trace.y)
+    texts = []
+    for i in range(len(xs)):
+        def value(m):
+            if m.group(1) == 'x':
+                return str(xs[i])
+            if m.group(1) == 'y':
+                return f"{float(ys[i]):g}"
+            return str(data[i][int(m.group(2))])
+        texts.append(_FIELD.sub(value, template))
+    return texts
+
+
+def check_plot_payload(data_dir='data'):
+    print("=== PLOT PAYLOAD ===")
+    figures = []
+    original_to_html = call_log_analyzer.figure_to_html
+
+    def capture(fig, **kwargs):
+        figures.append(fig)
+        return original_to_html(fig, **kwargs)
+
+    call_log_analyzer.figure_to_html = capture
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            dataset = CallDataset.load(data_dir)
+            results = dataset.report_for()
+    finally:
+        call_log_analyzer.figure_to_html = original_to_html
+    if not figures:
+        print("  No report figure built")
+        return False
+
+    fig = figures[0]
+    compact = plot_payload.compact_figure(fig)
+    ok = True
+
+    # Same points, bar heights to display precision, and hover text
+    same = len(compact.data) == len(fig.data) and all(
+        list(a.x) == list(b.x)
+        and np.allclose(np.asarray(a.y, float), np.asarray(b.y, float), atol=0.005)
+        and hover_texts(a) == hover_texts(b)
+        and (a.text == b.text or set(a.text) == {b.text})
+        for a, b in zip(fig.data, compact.data)
+    )
+    print(f"  {'PASS' if same else 'FAIL'}: {len(fig.data)} traces keep their values and hover text")
+    ok &= same
+
+    payload = results['plots']['payload']
+    smaller = payload['json_bytes'] < payload['original_json_bytes']
+    print(f"  {'PASS' if smaller else 'FAIL'}: report figure JSON {payload['original_json_bytes']:,} -> "
+          f"{payload['json_bytes']:,} bytes (HTML {payload['html_bytes']:,} bytes)")
+    ok &= smaller
+
+    # A larger per-hour chart: long numeric arrays go out as typed arrays
+    hours = np.arange(24 * 7)
+    counts = np.random.default_rng(0).integers(0, 400, hours.size)
+    waits = counts * 1.2345678
+    big = go.Figure(go.Bar(
+        x=hours, y=waits,
+        customdata=np.array(list(zip(counts, ['This Week'] * hours.size))),
+        hovertemplate="%{customdata[1]}<br>Hour %{x}: %{customdata[0]} calls<extra></extra>",
+    ))
+    _, sizes = plot_payload.figure_to_html(big, full_html=False, include_plotlyjs=False)
+    packed = plot_payload.compact_figure(big)
+    typed = packed.data[0].x.dtype == np.uint8 and packed.data[0].customdata.dtype == np.uint16
+    same = typed and hover_texts(big.data[0]) == hover_texts(packed.data[0])
+    print(f"  {'PASS' if same else 'FAIL'}: {hours.size}-bar chart {sizes['original_json_bytes']:,} -> "
+          f"{sizes['json_bytes']:,} bytes, hover text unchanged")
+    ok &= same
+    return ok
+
+
+if __name__ == "__main__":
+    check_plot_payload()
@@ -0,0 +1,74 @@
+import glob
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from readers import (
+    ABANDONED_CALLS, AGENT_PERFORMANCE, CALL_LOG, INBOUND_CALLS,
+    PYARROW_AVAILABLE, read_export,
+)
+
+SCHEMAS = [CALL_LOG, ABANDONED_CALLS, INBOUND_CALLS, AGENT_PERFORMANCE]
+
+
+def _as_text(df):
+    return df.astype(object).where(df.notna(), None).astype(str)
+
+
+def check_schemas(data_dir='data'):
+    print("=== EXPORT READER SCHEMAS ===")
+    engines = ['c', 'pyarrow'] if PYARROW_AVAILABLE else ['c']
+    failures = 0
+
+    for schema in SCHEMAS:
+        files = sorted(glob.glob(os.path.join(data_dir, schema.pattern)))
+        for f in files:
+            full = pd.read_csv(f)
+            full.columns = [c.strip() for c in full.columns]
+            expected = _as_text(full[list(schema.columns)])
+            for engine in engines:
+                result = _as_text(read_export(f, schema, engine=engine))
+                if not result.equals(expected):
+                    print(f"  FAIL: {os.path.basename(f)} [{engine}] differs from plain read_csv")
+                    failures += 1
+        print(f"  {schema.name}: {len(files)} files checked")
+
+    if failures == 0:
+        print("  PASS: schema reads match plain read_csv on every kept column")
+    return failures == 0
+
+
+def benchmark_transcriptions(data_dir='data', transcript_chars=2000):
+    """CallLog export with filled-in Transcription/Summary columns, as 3CX writes them when AI is on."""
+    files = sorted(glob.glob(os.path.join(data_dir, CALL_LOG.pattern)))
+    if not files:
+        return
+    print(f"\n=== BENCHMARK: CallLog with {transcript_chars}-char transcriptions ===")
+    df = pd.read_csv(files[0], dtype=str)
+    df['Transcription'] = 'lorem ipsum ' * (transcript_chars // 12)
+    df['Summary'] = 'summary text ' * 20
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'CallLogLastWeek_big.csv')
+        df.to_csv(path, index=False)
+        print(f"  File size: {os.path.getsize(path) / 1e6:.1f} MB, {len(df):,} rows")
+
+        start = time.perf_counter()
+        plain = pd.read_csv(path)
+        t_plain = time.perf_counter() - start
+        print(f"  read_csv (all columns):  {t_plain:.3f}s, {plain.memory_usage(deep=True).sum() / 1e6:.1f} MB")
+
+        for engine in (['c', 'pyarrow'] if PYARROW_AVAILABLE else ['c']):
+            start = time.perf_counter()
+            pruned = read_export(path, CALL_LOG, engine=engine)
+            t = time.perf_counter() - start
+            print(f"  read_export [{engine:7}]:   {t:.3f}s, {pruned.memory_usage(deep=True).sum() / 1e6:.1f} MB ({t_plain / t:.1f}x)")
+
+
+if __name__ == "__main__":
+    check_schemas()
+    benchmark_transcriptions()
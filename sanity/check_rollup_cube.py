@@ -0,0 +1,114 @@
+import contextlib
+import glob
+import io
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+import call_store
+import rollup_cube
+from call_dataset import CallDataset
+from cleaning import run_cleaning
+from ingest_cache import load_manifest, save_manifest
+
+
+def _direct(dataset):
+    """Per (week_start, customer_type, outcome) counts straight from the rows."""
+    calls = dataset.calls
+    main = pd.DataFrame({
+        'week_start': calls['week_start'],
+        'customer_type': calls['customer_type'],
+        'outcome': np.where(calls['is_answered'], 'answered', 'voicemail'),
+    })
+    abd = dataset.abandoned
+    abandoned = pd.DataFrame({
+        'week_start': abd['week_start'],
+        'customer_type': np.where(rollup_cube.abandoned_is_trade(abd, dataset.trade_since), 'trade', 'retail'),
+        'outcome': 'abandoned',
+    })
+    rows = pd.concat([main, abandoned], ignore_index=True)
+    return rows.groupby(['week_start', 'customer_type', 'outcome']).size().rename('calls').to_frame()
+
+
+def check_cube(data_dir='data'):
+    print("=== ROLLUP CUBE ===")
+    dataset = CallDataset.load(data_dir)
+    if dataset.calls.empty:
+        print("  No CallLog files found")
+        return False
+    ok = True
+
+    # Roll-ups of the cube agree with grouping the raw rows
+    expected = _direct(dataset)
+    got = rollup_cube.rollup(dataset.cube, ['week_start', 'customer_type', 'outcome'])[expected.columns]
+    same = got.index.equals(expected.index) and got['calls'].astype('int64').equals(expected['calls'])
+    print(f"  {'PASS' if same else 'FAIL'}: {len(dataset.cube):,} cells roll up to the raw counts "
+          f"({len(dataset.calls) + len(dataset.abandoned):,} rows)")
+    ok &= same
+
+    # Chart counts for a calendar-week report, from the cube alone
+    sunday = dataset.max_date.normalize() - pd.Timedelta(days=(dataset.max_date.weekday() + 1) % 7)
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = dataset.report_for(sunday)
+    raw = results['raw_data']
+    week1 = raw[(raw['week'] == 1) & raw['customer_type'].isin(['retail', 'trade'])]
+    cube = dataset.cube[dataset.cube['week_start'] == sunday - pd.Timedelta(days=6)]
+    by_type = rollup_cube.rollup(cube[cube['outcome'] != 'abandoned'], ['customer_type'])['calls']
+    same = all(by_type.get(t, 0) == (week1['customer_type'] == t).sum() for t in ('retail', 'trade'))
+    by_day = rollup_cube.rollup(cube[cube['outcome'] == 'abandoned'], ['weekday'])['calls']
+    abd = results['abandoned_logs']
+    abd_days = abd.loc[abd['week'] == 1, 'Call Time'].dt.dayofweek.value_counts().sort_index()
+    same &= by_day.equals(abd_days.rename_axis('weekday').rename('calls').astype(by_day.dtype))
+    print(f"  {'PASS' if same else 'FAIL'}: week ending {sunday.date()}: calls by type and "
+          f"abandoned-by-day chart values match the report")
+    ok &= same
+
+    # Appending exports one at a time only rebuilds the weeks they touch
+    files = sorted(glob.glob(os.path.join(data_dir, 'CallLogLastWeek_*.csv')))
+    frames = sorted((run_cleaning(f).call_level_df for f in files), key=lambda df: df['call_start'].max())
+    with tempfile.TemporaryDirectory() as tmp:
+        call_store.append(dataset.abandoned, call_store.ABANDONED, tmp)
+        log = io.StringIO()
+        start = time.perf_counter()
+        for df in frames:
+            call_store.append(df, call_store.CALLS, tmp)
+            with contextlib.redirect_stdout(log):
+                incremental = rollup_cube.refresh_cube(dataset.trade_since, tmp)
+        t_refresh = (time.perf_counter() - start) / len(frames)
+        full = rollup_cube.build_cube(
+            call_store.read(call_store.CALLS, columns=rollup_cube.CALL_COLUMNS, data_dir=tmp),
+            call_store.read(call_store.ABANDONED, columns=rollup_cube.ABANDONED_COLUMNS, data_dir=tmp),
+            dataset.trade_since,
+        )
+    same = incremental.sort_values(rollup_cube.DIMS).reset_index(drop=True).equals(full)
+    print(f"  {'PASS' if same else 'FAIL'}: week-by-week refreshes give the same cube as one full build "
+          f"({t_refresh:.3f}s per refresh)")
+    print("    " + "\n    ".join(line for line in log.getvalue().splitlines()[-3:]))
+    ok &= same
+
+    # A cube built by an older cleaning version is rebuilt in full
+    with tempfile.TemporaryDirectory() as tmp:
+        call_store.append(dataset.abandoned, call_store.ABANDONED, tmp)
+        for df in frames:
+            call_store.append(df, call_store.CALLS, tmp)
+        with contextlib.redirect_stdout(io.StringIO()):
+            rollup_cube.refresh_cube(dataset.trade_since, tmp)
+        cube_dir = rollup_cube.get_cube_dir(tmp)
+        save_manifest(cube_dir, dict(load_manifest(cube_dir), cleaning_version='old'))
+        log = io.StringIO()
+        with contextlib.redirect_stdout(log):
+            rollup_cube.refresh_cube(dataset.trade_since, tmp)
+        weeks = len(call_store.list_partitions(call_store.CALLS, tmp))
+    same = f"rebuilt {weeks} of {weeks} weeks" in log.getvalue()
+    print(f"  {'PASS' if same else 'FAIL'}: a CLEANING_VERSION change rebuilds every week ({log.getvalue().strip()})")
+    ok &= same
+    return ok
+
+
+if __name__ == "__main__":
+    check_cube()
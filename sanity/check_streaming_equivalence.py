@@ -0,0 +1,104 @@
+import glob
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+import call_store
+from cleaning import run_cleaning, run_cleaning_chunked
+
+
+def _peak_mb(fn, *args, **kwargs):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, peak / 1e6, seconds
+
+
+def check_streaming(data_dir='data', chunk_sizes=(250, 5000, 100_000)):
+    print("=== STREAMING CLEANER EQUIVALENCE ===")
+    files = sorted(glob.glob(os.path.join(data_dir, 'CallLogLastWeek_*.csv')))
+    failures = 0
+
+    for f in files:
+        expected = run_cleaning(f).call_level_df
+        for chunksize in chunk_sizes:
+            result = run_cleaning_chunked(f, chunksize=chunksize)
+            try:
+                pd.testing.assert_frame_equal(result, expected)
+            except AssertionError as e:
+                print(f"  FAIL: {os.path.basename(f)} (chunksize={chunksize}): {e}")
+                failures += 1
+        print(f"  Checked {os.path.basename(f)} ({len(expected)} calls)")
+
+    if failures == 0:
+        print(f"  PASS: chunked output identical for chunk sizes {chunk_sizes}")
+    return failures == 0
+
+
+def _streamed_to_store(path, chunksize):
+    """Calls of path streamed into a temporary call store, read back in Call ID order."""
+    with tempfile.TemporaryDirectory() as tmp:
+        call_store.append_call_log(path, tmp, chunksize=chunksize)
+        stored = call_store.read(call_store.CALLS, data_dir=tmp)
+    return stored.sort_values('Call ID').reset_index(drop=True)
+
+
+def _same_calls(stored, expected):
+    expected = expected.drop(columns='week').reset_index(drop=True)
+    return list(stored.columns) == list(expected.columns) and stored.equals(expected)
+
+
+def check_scattered_legs(data_dir='data'):
+    """Shuffled legs break the adjacency assumption; the result must still match."""
+    print("\n=== SCATTERED LEGS ===")
+    files = sorted(glob.glob(os.path.join(data_dir, 'CallLogLastWeek_*.csv')))
+    if not files:
+        return True
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'CallLogLastWeek_shuffled.csv')
+        pd.read_csv(files[0], dtype=str).sample(frac=1, random_state=0).to_csv(path, index=False)
+        expected = run_cleaning(path).call_level_df
+        result = run_cleaning_chunked(path, chunksize=500)
+        stored = _streamed_to_store(path, chunksize=500)
+    ok = result.equals(expected)
+    print(f"  {'PASS' if ok else 'FAIL'}: shuffled export gives identical output (split calls merged from their parts)")
+    same = _same_calls(stored, expected)
+    print(f"  {'PASS' if same else 'FAIL'}: streamed into the call store part by part, it stores the same calls")
+    return ok and same
+
+
+def benchmark_memory(data_dir='data', copies=12, chunksize=20_000):
+    """Quarter-sized export built from the weekly files: compare peak memory."""
+    files = sorted(glob.glob(os.path.join(data_dir, 'CallLogLastWeek_*.csv')))[:copies]
+    if not files:
+        return
+    print(f"\n=== BENCHMARK: {len(files)} weekly exports in one file ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'CallLogLastWeek_quarter.csv')
+        pd.concat([pd.read_csv(f, dtype=str) for f in files]).to_csv(path, index=False)
+
+        expected, mb_mem, t_mem = _peak_mb(lambda p: run_cleaning(p).call_level_df, path)
+        result, mb_stream, t_stream = _peak_mb(run_cleaning_chunked, path, chunksize=chunksize)
+        with tempfile.TemporaryDirectory() as store:
+            _, mb_store, t_store = _peak_mb(call_store.append_call_log, path, store, chunksize=chunksize)
+            stored = call_store.read(call_store.CALLS, data_dir=store).sort_values('Call ID').reset_index(drop=True)
+
+    print(f"  In memory:           peak {mb_mem:7.1f} MB, {t_mem:.2f}s")
+    print(f"  Chunked ({chunksize:,} rows): peak {mb_stream:7.1f} MB, {t_stream:.2f}s")
+    print(f"  Into the call store: peak {mb_store:7.1f} MB, {t_store:.2f}s")
+    print(f"  {'PASS' if result.equals(expected) else 'FAIL'}: identical output ({len(result):,} calls)")
+    print(f"  {'PASS' if _same_calls(stored, expected) else 'FAIL'}: the call store holds the same calls")
+
+
+if __name__ == "__main__":
+    check_streaming()
+    check_scattered_legs()
+    benchmark_memory()
@@ -0,0 +1,124 @@
+import contextlib
+import io
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+import trade_directory
+from call_dataset import CallDataset
+from phones import clean_phone_column
+
+
+class SQLiteClientList(trade_directory.ClientListSource):
+    """clientlist in SQLite, whose checksum is a group_concat of the rows (no md5 there)."""
+
+    def etag(self):
+        columns = ', '.join(self._columns())
+        row = self.conn.execute(f"SELECT COUNT(*), group_concat({' || '.join(self._columns())}) "
+                                f"FROM (SELECT {columns} FROM clientlist ORDER BY {columns})").fetchone()
+        return f'{row[0]}:{hash(row[1])}'
+
+
+def _load(*args, **kwargs):
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):
+        directory = trade_directory.load_trade_directory(*args, **kwargs)
+    return directory, log.getvalue()
+
+
+def check_trade_directory(data_dir='data'):
+    print("=== TRADE DIRECTORY ===")
+    csv_path = os.path.join(data_dir, 'trade_customer_numbers.csv')
+    if not os.path.exists(csv_path):
+        print("  No trade_customer_numbers.csv found")
+        return False
+    ok = True
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Same numbers and names as reading the CSV into a dict
+        shutil.copy(csv_path, tmp)
+        listed = pd.read_csv(csv_path)
+        expected = dict(zip(clean_phone_column(listed['phone_number']), listed['customer_name']))
+        directory, _ = _load(tmp)
+        same = dict(zip(directory.entries['phone'], directory.entries['customer_name'])) == expected
+        print(f"  {'PASS' if same else 'FAIL'}: {len(directory)} numbers and names from the CSV")
+        ok &= same
+
+        # Snapshot reuse: within the TTL nothing is read; after it, only the ETag
+        _, within_ttl = _load(tmp, ttl=3600)
+        _, unchanged = _load(tmp)
+        with open(os.path.join(tmp, 'trade_customer_numbers.csv'), 'a', encoding='utf-8') as f:
+            f.write('0871234567,NEW TRADE CUSTOMER\n')
+        stale, _ = _load(tmp, ttl=3600)
+        fresh, changed = _load(tmp)
+        same = ('local snapshot' in within_ttl and 'unchanged' in unchanged and 'refreshed' in changed
+                and not stale.is_trade(['871234567'])[0] and fresh.is_trade(['871234567'])[0])
+        print(f"  {'PASS' if same else 'FAIL'}: snapshot reused within the TTL, re-read only when the ETag changes")
+        ok &= same
+
+        # clientlist source: fetched once, then only checksummed; unreachable -> last snapshot
+        conn = sqlite3.connect(os.path.join(tmp, 'clients.db'))
+        conn.execute('CREATE TABLE clientlist (account_telephone_number TEXT, sales_telephone_number TEXT, '
+                     'mobile_number TEXT)')
+        conn.executemany('INSERT INTO clientlist VALUES (?, ?, ?)',
+                         [('014642444', '0', '+353871111111'), ('018708700', None, '0871111111')])
+        source = SQLiteClientList(conn, ttl=0)
+        first, log1 = _load(tmp, source)
+        _, log2 = _load(tmp, source)
+        conn.execute("INSERT INTO clientlist VALUES ('014522420', NULL, NULL)")
+        third, log3 = _load(tmp, source)
+        same = (len(first) == 3 and 'Fetching' in log1 and 'Fetching' not in log2
+                and 'Fetching' in log3 and len(third) == 4)
+        print(f"  {'PASS' if same else 'FAIL'}: clientlist fetched once ({len(first)} numbers), "
+              f"re-fetched after a change ({len(third)})")
+        ok &= same
+
+        # The CSV (reports) and clientlist (ingest) keep separate snapshots in the same data folder
+        hits = []
+        for _ in range(2):
+            _, csv_log = _load(tmp)
+            _, clientlist_log = _load(tmp, trade_directory.ClientListSource(conn))
+            hits += ['unchanged' in csv_log, 'local snapshot' in clientlist_log and 'Fetching' not in clientlist_log]
+        conn.close()
+        _load(tmp)
+        offline, log4 = _load(tmp, source)
+        same = all(hits) and 'using the local snapshot' in log4 and len(offline) == 4
+        print(f"  {'PASS' if same else 'FAIL'}: loading the CSV and clientlist alternately hits each cache "
+              f"({sum(hits)}/{len(hits)}); clientlist snapshot used when unreachable")
+        ok &= same
+
+    # Report wiring: abandoned trade calls and names come from the directory
+    with contextlib.redirect_stdout(io.StringIO()):
+        dataset = CallDataset.load(data_dir)
+        results = dataset.report_for()
+    directory = dataset.trade_directory
+    listed_trade = dataset.trade_since.reindex(directory.index).notna().all()
+    found = directory.lookup(dataset.abandoned_phones)
+    names = dataset.abandoned_phones.map(expected)
+    same = (listed_trade and found['customer_name'].equals(names.where(names.notna(), None).astype(object))
+            and sum(map(len, results['abandoned_trade_customers'].values())) > 0)
+    print(f"  {'PASS' if same else 'FAIL'}: directory numbers count as trade, "
+          f"{found['is_trade'].sum():,} abandoned calls looked up by name")
+    ok &= same
+
+    # One vectorized lookup vs a dict lookup per number
+    phones = pd.Series(np.resize(dataset.call_phones.to_numpy(), 1_000_000))
+    start = time.perf_counter()
+    directory.lookup(phones)
+    t_index = time.perf_counter() - start
+    start = time.perf_counter()
+    [expected.get(p) for p in phones]
+    t_dict = time.perf_counter() - start
+    print(f"    1M lookups: vectorized {t_index:.2f}s vs per-number dict {t_dict:.2f}s")
+    return ok
+
+
+if __name__ == "__main__":
+    check_trade_directory()
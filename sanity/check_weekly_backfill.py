@@ -0,0 +1,78 @@
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+import weekly_data_manager
+from call_dataset import CallDataset
+
+# weekly_data.csv column -> week 1 metric in the report dict
+REPORT_KEYS = {
+    'total_calls': 'week1_calls',
+    'retail_calls': 'week1_retail_total',
+    'trade_calls': 'week1_trade_total',
+    'retail_abandoned': 'week1_retail_abandoned',
+    'trade_abandoned': 'week1_trade_abandoned',
+}
+
+
+def check_weekly_backfill(data_dir='data'):
+    print("=== WEEKLY STORE BACKFILL ===")
+    dataset = CallDataset.load(data_dir)
+    if dataset.calls.empty:
+        print("  No CallLog files found")
+        return False
+
+    start = time.perf_counter()
+    weeks = dataset.weekly_metrics()
+    t_batch = time.perf_counter() - start
+
+    # The batch must agree with a full report run for every week-ending Sunday
+    mismatches = []
+    start = time.perf_counter()
+    for week in weeks.to_dict('records'):
+        with contextlib.redirect_stdout(io.StringIO()):
+            metrics = dataset.report_for(week['week_end'])['metrics']
+        diffs = {col: (week[col], metrics[key]) for col, key in REPORT_KEYS.items() if week[col] != metrics[key]}
+        if diffs:
+            mismatches.append((week['week_end'], diffs))
+    t_reports = time.perf_counter() - start
+
+    ok = not mismatches
+    print(f"  {'PASS' if ok else 'FAIL'}: {len(weeks)} weeks match report_for(<Sunday>) "
+          f"({weeks['week_start'].iloc[0]} to {weeks['week_end'].iloc[-1]})")
+    for week_end, diffs in mismatches:
+        print(f"    {week_end}: {diffs}")
+    print(f"  One pass {t_batch:.3f}s vs {len(weeks)} report runs {t_reports:.2f}s")
+
+    # A range only returns the weeks ending inside it
+    ranged = dataset.weekly_metrics('2026-01-01', '2026-01-31')
+    expected = weeks[(weeks['week_end'] >= '2026-01-01') & (weeks['week_end'] <= '2026-01-31')]
+    same = ranged.reset_index(drop=True).equals(expected.reset_index(drop=True))
+    print(f"  {'PASS' if same else 'FAIL'}: January range gives {len(ranged)} weeks")
+    ok &= same
+
+    # Saving twice updates rows in place instead of adding duplicates
+    csv_path = weekly_data_manager.CSV_PATH
+    with tempfile.TemporaryDirectory() as tmp:
+        weekly_data_manager.CSV_PATH = os.path.join(tmp, 'weekly_data.csv')
+        try:
+            weekly_data_manager.save_weeks(weeks)
+            weekly_data_manager.save_weeks(weeks.tail(3))
+            stored = pd.DataFrame(weekly_data_manager.get_all_weeks())
+            last = weekly_data_manager.load_week_data(weeks['week_start'].iloc[-1], weeks['week_end'].iloc[-1])
+        finally:
+            weekly_data_manager.CSV_PATH = csv_path
+    same = len(stored) == len(weeks) and int(last['total_calls']) == int(weeks['total_calls'].iloc[-1])
+    print(f"  {'PASS' if same else 'FAIL'}: re-saving updates the stored weeks ({len(stored)} rows)")
+    ok &= same
+    return ok
+
+
+if __name__ == "__main__":
+    check_weekly_backfill()
@@ -1,20 +1,18 @@
 import pandas as pd
 import datetime
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+import phones
+from phones import clean_phone_column, clean_phone_for_match
+from weeks import assign_weeks, day_end_anchor, monday_week_anchor
 
 def test_logic():
     print("=== CORE LOGIC UNIT TESTS ===")
     
     # 1. Test Phone Cleaning
     print("\n[Test 1] Phone Number Cleaning")
-    def clean_phone_for_match(phone):
-        s = str(phone).strip()
-        s = s.replace(' ', '').replace('-', '').replace('.', '').replace('(', '').replace(')', '')
-        if s.startswith('+353'): s = s[4:]
-        elif s.startswith('00353'): s = s[5:]
-        elif s.startswith('353'): s = s[3:]
-        if s.startswith('0'): s = s[1:]
-        return s
-
     test_cases = [
         ('+353 87 123 4567', '871234567'),
         ('087-123-4567', '871234567'),
@@ -32,6 +30,30 @@ def test_logic():
         else:
             print(f"  FAIL: {input_val} -> {result} (Expected: {expected})")
             failures += 1
+
+    # Column API must give the same keys as the scalar one
+    column_results = clean_phone_column(pd.Series([i for i, _ in test_cases])).tolist()
+    if column_results == [e for _, e in test_cases]:
+        print("  PASS: clean_phone_column matches clean_phone_for_match")
+    else:
+        print(f"  FAIL: clean_phone_column -> {column_results}")
+        failures += 1
+
+    # Crossing the key cache limit between two calls must not lose the
+    # keys of values cached by the first one
+    limit = phones._KEY_CACHE_LIMIT
+    phones._KEY_CACHE.clear()
+    phones._KEY_CACHE_LIMIT = 5
+    try:
+        clean_phone_column(pd.Series(['0871', '0872', '0873']))
+        column_results = clean_phone_column(pd.Series(['0871', '0874', '0875', '0876'])).tolist()
+    finally:
+        phones._KEY_CACHE_LIMIT = limit
+    if column_results == ['871', '874', '875', '876']:
+        print("  PASS: cached keys survive the key cache being cleared")
+    else:
+        print(f"  FAIL: after the key cache was cleared -> {column_results}")
+        failures += 1
             
     # 2. Test Week Assignment Logic
     print("\n[Test 2] Week Assignment")
@@ -69,6 +91,38 @@ def test_logic():
             print(f"  FAIL: {dt_input} -> Week {result_week} (Expected: {expected_week})")
             failures += 1
 
+    # 3. Test Shared Week Engine (weeks.py)
+    print("\n[Test 3] Shared Week Engine (rolling, calendar-day, Monday)")
+    engine_cases = [
+        # Rolling: anchored at the max timestamp, (start, end] - same cases as Test 2
+        ("rolling", max_date, 'right', date_cases),
+        # Calendar days: the 7 whole days ending 2026-02-01, [start, end)
+        ("calendar", day_end_anchor("2026-02-01"), 'left', [
+            ("2026-02-01 23:59:59", 1),
+            ("2026-01-26 00:00:00", 1),
+            ("2026-01-25 23:59:59", 2),
+            ("2026-01-19 00:00:00", 2),
+            ("2026-01-18 23:59:59", 3),
+            ("2026-02-02 00:00:00", 3),  # After the as-of date
+        ]),
+        # Monday weeks: max date Wednesday 2026-02-04, [start, end)
+        ("monday", monday_week_anchor(pd.Timestamp("2026-02-04")), 'left', [
+            ("2026-02-02 00:00:00", 1),
+            ("2026-02-01 23:59:59", 2),
+            ("2026-01-26 00:00:00", 2),
+            ("2026-01-25 23:59:59", 3),
+        ]),
+    ]
+
+    for name, anchor, closed, cases in engine_cases:
+        results = assign_weeks(pd.to_datetime([d for d, _ in cases]), anchor, closed=closed)
+        for (dt_input, expected_week), result_week in zip(cases, results):
+            if result_week == expected_week:
+                print(f"  PASS: [{name}] {dt_input} -> Week {result_week}")
+            else:
+                print(f"  FAIL: [{name}] {dt_input} -> Week {result_week} (Expected: {expected_week})")
+                failures += 1
+
     if failures == 0:
         print("\nALL TESTS PASSED ✅")
     else:
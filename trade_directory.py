@@ -0,0 +1,216 @@
+"""
+Trade Directory
+Normalised phone -> (is_trade, customer_name) for known trade customers,
+from a local snapshot of the client list:
+
+    directory = load_trade_directory('data')
+    found = directory.lookup(clean_phone_column(abandoned['Caller ID']))
+    found['is_trade'], found['customer_name']
+
+The source is data/trade_customer_numbers.csv (CsvSource, the default)
+or the clientlist table (ClientListSource). Its entries are normalised
+once (phones.clean_phone_column) and snapshotted in
+data/.cache/trade_directory/<source>/ (one folder per source, named by a
+hash of its key) with a manifest of the source, its ETag and when it was
+last checked, so the report's CSV and the ingest's clientlist each keep
+their own snapshot. Within the source's TTL the snapshot is used
+as is; after that the source's ETag (the CSV's content hash, or a
+checksum the database computes over clientlist) is compared, and the
+entries are only re-read when it changed. If the source can't be
+reached, the last snapshot is used.
+
+Lookups go through a hashed pandas Index, so a whole column is looked
+up at once, O(1) per number.
+"""
+import hashlib
+import os
+import time
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+from ingest_cache import CACHE_FORMAT, file_hash, get_cache_dir, load_manifest, read_frame, save_manifest, write_frame
+from phones import clean_phone_column
+
+DIRECTORY_VERSION = "1"
+# Numbers that never identify a customer
+NOT_A_CUSTOMER = ['', 'anonymous']
+
+
+@dataclass(frozen=True)
+class CsvSource:
+    """phone_number,customer_name rows of a CSV (checked on every load: hashing it is cheap)."""
+    path: str
+    ttl: float = 0
+
+    @property
+    def key(self):
+        return f'csv:{os.path.abspath(self.path)}'
+
+    def etag(self):
+        return file_hash(self.path) if os.path.exists(self.path) else None
+
+    def fetch(self):
+        df = pd.read_csv(self.path, dtype=str)
+        if 'phone_number' not in df.columns or 'customer_name' not in df.columns:
+            raise ValueError(f"{self.path} needs phone_number and customer_name columns")
+        return df['phone_number'], df['customer_name']
+
+
+@dataclass(frozen=True)
+class ClientListSource:
+    """Phone columns of the clientlist table, re-checked once a day."""
+    conn: object
+    phone_columns: tuple = ('account_telephone_number', 'sales_telephone_number', 'mobile_number')
+    name_column: str = None
+    ttl: float = 24 * 3600
+
+    @property
+    def key(self):
+        return f"clientlist:{','.join(self.phone_columns)}:{self.name_column}"
+
+    def _columns(self):
+        return list(self.phone_columns) + ([self.name_column] if self.name_column else [])
+
+    def etag(self):
+        """Row count and an md5 of the rows, computed by PostgreSQL (one row comes back)."""
+        columns = ', '.join(self._columns())
+        cursor = self.conn.cursor()
+        cursor.execute(
+            f"SELECT COUNT(*), md5(string_agg(concat_ws('|', {columns}), ',' ORDER BY {columns})) FROM clientlist"
+        )
+        count, digest = cursor.fetchone()
+        cursor.close()
+        return f'{count}:{digest}'
+
+    def fetch(self):
+        print("Fetching client list from database...")
+        df = pd.read_sql(f"SELECT {', '.join(self._columns())} FROM clientlist", self.conn)
+        phones = df[list(self.phone_columns)].melt()['value']
+        names = (
+            pd.concat([df[self.name_column]] * len(self.phone_columns), ignore_index=True)
+            if self.name_column else pd.Series(None, index=phones.index, dtype=object)
+        )
+        return phones, names
+
+
+def _entries(phones, names):
+    """Unique normalised phones with the last name listed for each."""
+    entries = pd.DataFrame({
+        'phone': clean_phone_column(pd.Series(phones).reset_index(drop=True)),
+        'customer_name': pd.Series(names).reset_index(drop=True).astype(object),
+    })
+    entries = entries[~entries['phone'].isin(NOT_A_CUSTOMER)]
+    entries['customer_name'] = entries['customer_name'].where(entries['customer_name'].notna(), None)
+    return entries.drop_duplicates('phone', keep='last').reset_index(drop=True)
+
+
+@dataclass
+class TradeDirectory:
+    # Unique normalised phones and their customer names (None if unknown)
+    entries: pd.DataFrame
+    etag: str = None
+    index: pd.Index = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.index = pd.Index(self.entries['phone'])
+
+    def __len__(self):
+        return len(self.entries)
+
+    def positions(self, phones):
+        """Row of each normalised phone in entries, -1 if it isn't listed."""
+        return self.index.get_indexer(pd.Series(phones, dtype=object))
+
+    def is_trade(self, phones):
+        """Boolean array: normalised phones that belong to a trade customer."""
+        return self.positions(phones) >= 0
+
+    def lookup(self, phones):
+        """is_trade and customer_name for each normalised phone, aligned with phones."""
+        phones = pd.Series(phones, dtype=object)
+        pos = self.positions(phones)
+        names = self.entries['customer_name'].to_numpy(dtype=object)[pos]
+        names[pos < 0] = None
+        return pd.DataFrame({'is_trade': pos >= 0, 'customer_name': names}, index=phones.index)
+
+
+def get_directory_dir(data_dir='data', source=None):
+    """The trade directory cache folder, or the given source's folder in it."""
+    root = os.path.join(get_cache_dir(data_dir), 'trade_directory')
+    if source is None:
+        return root
+    return os.path.join(root, hashlib.sha256(source.key.encode('utf-8')).hexdigest()[:16])
+
+
+def _snapshot_path(directory_dir):
+    return os.path.join(directory_dir, f'directory.{CACHE_FORMAT}')
+
+
+def load_trade_directory(data_dir='data', source=None, ttl=None, refresh=False):
+    """
+    The trade directory for source (default: data_dir's
+    trade_customer_numbers.csv), from the local snapshot unless the TTL
+    (default: the source's) has passed and the source's ETag changed.
+    refresh=True checks the ETag regardless of the TTL.
+    """
+    source = source or CsvSource(os.path.join(data_dir, 'trade_customer_numbers.csv'))
+    ttl = source.ttl if ttl is None else ttl
+    directory_dir = get_directory_dir(data_dir, source)
+    path = _snapshot_path(directory_dir)
+    manifest = load_manifest(directory_dir)
+    cached = (
+        manifest.get('version') == DIRECTORY_VERSION and manifest.get('source') == source.key
+        and os.path.exists(path)
+    )
+    now = time.time()
+
+    if cached and not refresh and now - manifest['checked_at'] < ttl:
+        print(f"Trade directory: {manifest['entries']} numbers from the local snapshot")
+        return TradeDirectory(read_frame(path), manifest['etag'])
+
+    try:
+        etag = source.etag()
+    except Exception as e:
+        if cached:
+            print(f"Trade directory: could not check {source.key} ({e}), using the local snapshot")
+            return TradeDirectory(read_frame(path), manifest['etag'])
+        print(f"Could not load trade directory: {e}")
+        return TradeDirectory(_entries([], []))
+    if etag is None:
+        return TradeDirectory(_entries([], []))
+
+    if cached and etag == manifest['etag']:
+        entries = read_frame(path)
+        status = 'unchanged'
+    else:
+        try:
+            entries = _entries(*source.fetch())
+        except Exception as e:
+            print(f"Could not load trade directory: {e}")
+            return TradeDirectory(read_frame(path), manifest['etag']) if cached else TradeDirectory(_entries([], []))
+        os.makedirs(directory_dir, exist_ok=True)
+        tmp_path = path + '.tmp'
+        write_frame(entries, tmp_path)
+        os.replace(tmp_path, path)
+        status = 'refreshed'
+
+    save_manifest(directory_dir, {
+        'version': DIRECTORY_VERSION,
+        'source': source.key,
+        'etag': etag,
+        'entries': len(entries),
+        'checked_at': now,
+    })
+    print(f"Trade directory: {len(entries)} numbers ({status} from {source.key})")
+    return TradeDirectory(entries, etag)
+
+
+def listed_since(trade_since, directory):
+    """
+    trade_since (normalised phone -> earliest trade call) with every
+    directory number added as trade from the start, so anything keyed on
+    trade_since (abandoned classification, the rollup cube) counts them.
+    """
+    listed = pd.Series(pd.Timestamp.min, index=directory.index, dtype=trade_since.dtype)
+    return pd.concat([trade_since, listed]).groupby(level=0).min()
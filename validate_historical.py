@@ -163,9 +163,10 @@ def validate_date_ranges(metrics):
     
     return (len(errors) == 0, errors)
 
-def generate_verification_report(metrics):
+def generate_verification_report(metrics, plot_payload=None):
     """
     Generate a detailed markdown verification report.
+    plot_payload is the chart size summary from plot_payload.figure_to_html.
     """
     report = []
     report.append("# Report Verification Summary")
@@ -288,7 +289,17 @@ def generate_verification_report(metrics):
         report.append("✅ **Consistent** (Matches historical records for this period)")
 
     report.append("")
-    report.append("## 6. Final Result")
+    report.append("## 6. Chart Payload")
+    if plot_payload:
+        saved = 1 - plot_payload['json_bytes'] / plot_payload['original_json_bytes']
+        report.append(f"- **Chart data (JSON):** {plot_payload['json_bytes']:,} bytes "
+                      f"(from {plot_payload['original_json_bytes']:,} before compaction, {saved:.0%} smaller)")
+        report.append(f"- **Embedded chart HTML:** {plot_payload['html_bytes']:,} bytes")
+    else:
+        report.append("- Not measured")
+
+    report.append("")
+    report.append("## 7. Final Result")
     if not errors:
         report.append("### ✅ VERIFICATION SUCCESSFUL")
         report.append("The report is internally consistent.")
@@ -303,4 +314,4 @@ def validate_report(results):
     Run all validation checks on report results and return Markdown report.
     """
     metrics = results['metrics']
-    return generate_verification_report(metrics)
+    return generate_verification_report(metrics, results.get('plots', {}).get('payload'))
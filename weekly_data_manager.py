@@ -3,8 +3,12 @@ import os
 from datetime import datetime
 import pandas as pd
 
+from db_loader import bulk_upsert
+
 DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
 CSV_PATH = os.path.join(DATA_DIR, 'weekly_data.csv')
+# Database copy of the weekly rows (see store_week)
+DB_TABLE = 'weekly_metrics'
 
 # Define CSV columns
 COLUMNS = [
@@ -86,9 +90,23 @@ def save_week_data(metrics):
     rows = [r for r in rows if not (r['week_start'] == start_date and r['week_end'] == end_date)]
     
     # Prepare new row
-    new_row = {
-        'week_start': start_date,
-        'week_end': end_date,
+    rows.append(week_row(metrics))
+    
+    # Sort by date (optional but nice)
+    # rows.sort(key=lambda x: datetime.strptime(x['week_start'], '%d/%m/%Y') if x['week_start'] else datetime.min)
+
+    with open(CSV_PATH, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+    
+    print(f"Saved weekly data for {start_date} - {end_date} to CSV.")
+
+def week_row(metrics):
+    """The stored row (COLUMNS) for a save_week_data metrics dict."""
+    return {
+        'week_start': metrics.get('start_date'),
+        'week_end': metrics.get('end_date'),
         'total_calls': metrics.get('total', 0),
         'retail_calls': metrics.get('retail', 0),
         'trade_calls': metrics.get('trade', 0),
@@ -97,18 +115,43 @@ def save_week_data(metrics):
         'trade_abandoned': metrics.get('abandoned_trade', 0),
         'report_generated_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     }
-    
-    rows.append(new_row)
-    
-    # Sort by date (optional but nice)
-    # rows.sort(key=lambda x: datetime.strptime(x['week_start'], '%d/%m/%Y') if x['week_start'] else datetime.min)
+
+def store_week(conn, metrics):
+    """
+    Upsert the week into the weekly_metrics database table on conn (the
+    report run's unit of work, see db_session.py; the caller commits).
+    """
+    bulk_upsert(conn, pd.DataFrame([week_row(metrics)]), DB_TABLE, ['week_start', 'week_end'])
+    print(f"Saved weekly data for {metrics.get('start_date')} - {metrics.get('end_date')} to '{DB_TABLE}'.")
+
+def save_weeks(weeks):
+    """
+    Save or update many weeks at once (e.g. a backfill): one read and one
+    write of the CSV instead of one per week.
+    weeks is a DataFrame (or list of dicts) with the COLUMNS names,
+    report_generated_date optional.
+    """
+    initialize_db()
+    new_rows = pd.DataFrame(weeks)
+    if new_rows.empty:
+        return 0
+    if 'report_generated_date' not in new_rows.columns:
+        new_rows['report_generated_date'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    new_rows = new_rows[COLUMNS].astype(str)
+
+    existing = pd.read_csv(CSV_PATH, dtype=str)
+    replaced = existing.set_index(['week_start', 'week_end']).index.isin(
+        new_rows.set_index(['week_start', 'week_end']).index
+    )
+    rows = pd.concat([existing[~replaced], new_rows], ignore_index=True).fillna('')
 
     with open(CSV_PATH, 'w', newline='', encoding='utf-8') as f:
         writer = csv.DictWriter(f, fieldnames=COLUMNS)
         writer.writeheader()
-        writer.writerows(rows)
-    
-    print(f"Saved weekly data for {start_date} - {end_date} to CSV.")
+        writer.writerows(rows.to_dict('records'))
+
+    print(f"Saved weekly data for {len(new_rows)} weeks to CSV ({int(replaced.sum())} updated).")
+    return len(new_rows)
 
 def get_all_weeks():
     """Return all stored weeks."""
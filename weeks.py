@@ -0,0 +1,72 @@
+"""
+Week Bucketing
+One vectorized engine for assigning week numbers to timestamps.
+
+Weeks are counted back from an anchor: week 1 ends at the anchor, week 2
+ends 7 days before it, and so on. Anything outside the requested weeks
+(older, later than the anchor, or NaT) gets n_weeks + 1.
+
+The boundary rules used across the pipeline:
+- Rolling (cleaning, analyze_calls): anchor = max call timestamp,
+  closed='right' -> week k is (anchor - 7k days, anchor - 7(k-1) days].
+- Calendar days (generate_last_week_report): anchor = day_end_anchor(date),
+  closed='left' -> week 1 is the 7 whole days ending on that date.
+- Monday weeks (call_analytics_utils.add_week_label): anchor =
+  monday_week_anchor(max date), closed='left' -> Monday-to-Monday weeks.
+"""
+import numpy as np
+import pandas as pd
+
+WEEK = pd.Timedelta(days=7)
+
+
+def week_boundaries(anchor, n_weeks=2):
+    """Ascending week edges: anchor - n_weeks*7d, ..., anchor - 7d, anchor."""
+    anchor = pd.Timestamp(anchor)
+    return pd.DatetimeIndex([anchor - WEEK * k for k in range(n_weeks, -1, -1)])
+
+
+def assign_weeks(times, anchor, n_weeks=2, closed='right'):
+    """
+    Assign week numbers 1..n_weeks (1 = most recent) to a column of
+    timestamps in a single searchsorted call; n_weeks + 1 for the rest.
+
+    closed='right': intervals are (start, end] (start exclusive).
+    closed='left':  intervals are [start, end) (end exclusive).
+    """
+    values = pd.to_datetime(pd.Series(times), errors='coerce').to_numpy(dtype='datetime64[ns]')
+    edges = week_boundaries(anchor, n_weeks).to_numpy(dtype='datetime64[ns]')
+
+    side = 'left' if closed == 'right' else 'right'
+    pos = np.searchsorted(edges, values, side=side)
+
+    # pos == i means the value sits in the interval ending at edges[i]
+    inside = (pos >= 1) & (pos <= n_weeks) & ~np.isnat(values)
+    weeks = np.full(len(values), n_weeks + 1, dtype=np.int64)
+    weeks[inside] = n_weeks + 1 - pos[inside]
+    return weeks
+
+
+def day_end_anchor(as_of):
+    """Anchor so week 1 covers the 7 calendar days ending on as_of."""
+    return pd.Timestamp(as_of).normalize() + pd.Timedelta(days=1)
+
+
+def monday_week_anchor(max_date):
+    """
+    Anchor for Monday-to-Monday weeks: the Monday after the week that
+    contains max_date, or max_date's Monday if max_date is a Monday
+    (so a lone Monday doesn't become its own week).
+    """
+    max_date = pd.Timestamp(max_date)
+    days_since_monday = max_date.weekday()
+    most_recent_monday = max_date - pd.Timedelta(days=days_since_monday)
+    if days_since_monday == 0:
+        return most_recent_monday
+    return most_recent_monday + WEEK
+
+
+def week_start_of(times):
+    """Midnight on the Monday of each timestamp's calendar week."""
+    times = pd.Series(times)
+    return times.dt.normalize() - pd.to_timedelta(times.dt.dayofweek, unit='D')